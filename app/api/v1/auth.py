@@ -1,8 +1,13 @@
+import asyncio
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import jwt
 from app.schemas.auth import UserCreate, UserPublic, Token, LoginRequest
+from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS, metrics
 from app.core.security import get_password_hash, verify_password, create_access_token, decode_token
+from app.core.user_cache import CurrentUser, user_cache
 from app.db.session import SessionLocal
 from app.models.user import User
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -48,16 +53,40 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
 
 
-    token = create_access_token(subject=user.id)
+    # The claims let get_current_user resolve the user without a database round trip.
+    claims = {"email": user.email, "name": user.full_name, "active": user.is_active}
+    token = create_access_token(subject=user.id, claims=claims)
     return Token(access_token=token)
 
 
+def _load_user(user_id: int) -> CurrentUser | None:
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user is None:
+            return None
+        return CurrentUser(id=user.id, email=user.email, full_name=user.full_name, is_active=user.is_active)
+    finally:
+        db.close()
+
 
 
-def get_current_user(
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+) -> CurrentUser:
+    started = time.perf_counter()
+    outcome = "rejected"
+    try:
+        user = await _resolve_user(credentials)
+        outcome = "success"
+        return user
+    finally:
+        # Domain and method are not known yet; auth is recorded on its own.
+        metrics.observe(STAGE_SECONDS, time.perf_counter() - started, stage="auth", domain="", method="", outcome=outcome)
+
+
+async def _resolve_user(credentials: HTTPAuthorizationCredentials | None) -> CurrentUser:
     if not credentials or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="Missing bearer token")
 
@@ -72,16 +101,26 @@ def get_current_user(
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Token invalid")
 
-    user = db.get(User, int(sub))
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user_id = int(sub)
+    user = user_cache.get(user_id)
+    if user is None:
+        if settings.AUTH_TRUST_TOKEN_CLAIMS and "active" in payload and user_cache.claims_trusted(user_id, payload.get("iat")):
+            user = CurrentUser(
+                id=user_id, email=payload.get("email", ""), full_name=payload.get("name"), is_active=bool(payload["active"])
+            )
+        else:
+            # Older tokens without claims, or the user was invalidated since the token was issued.
+            user = await asyncio.to_thread(_load_user, user_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+        user_cache.put(user)
     if not user.is_active:
         raise HTTPException(status_code=403, detail="User disabled")
     return user
 
 
 @router.get("/me", response_model=UserPublic)
-def read_me(current_user: User = Depends(get_current_user)):
+async def read_me(current_user: CurrentUser = Depends(get_current_user)):
     return UserPublic(
     id=current_user.id,
     email=current_user.email,
@@ -1,85 +1,351 @@
 from __future__ import annotations
 import time
-from typing import List
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, List, Tuple
 import logging
 import asyncio
+import threading
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from app.api.v1.auth import get_current_user
 from app.core.config import settings
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.metrics import StageTimer, metrics
 from app.schemas.chat import ChatRequest, ChatResponse, Citation
 from app.rag.classifier import DomainClassifier
-from app.rag.vectorstore import PolicyVectorStore
+from app.rag.embeddings import get_embedding_service
+from app.rag.batching import RetrievalBatcher
+from app.rag.answer_cache import AnswerCache
+from app.rag.vectorstore import PolicyVectorStore, RetrievedChunk
+from app.rag.context import PackedContext
 from app.rag.generator import AnswerGenerator
+from app.rag.reranker import CrossEncoderReranker
 
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 logger = logging.getLogger("app.chat")
 
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 _classifier: DomainClassifier | None = None
 _generator: AnswerGenerator | None = None
 _store: PolicyVectorStore | None = None
+_batcher: RetrievalBatcher | None = None
+_answer_cache: AnswerCache | None = None
+_llm_limiter: AdmissionController | None = None
+_stream_limiter: AdmissionController | None = None
+_reranker: CrossEncoderReranker | None = None
+_index_version: str | None = None
+_reload_lock = threading.Lock()
+# Guards the first construction of the heavy singletons, which warm-up threads and early
+# requests can race for. Reentrant because the classifier builds the store.
+_init_lock = threading.RLock()
 
 
 def _get_classifier() -> DomainClassifier:
     global _classifier
     if _classifier is None:
-        _classifier = DomainClassifier()
+        with _init_lock:
+            if _classifier is None:
+                _classifier = DomainClassifier(store=_get_store())
     return _classifier
 
 
 def _get_generator() -> AnswerGenerator:
     global _generator
     if _generator is None:
-        _generator = AnswerGenerator()
+        with _init_lock:
+            if _generator is None:
+                _generator = AnswerGenerator()
     return _generator
 
 
 def _get_store() -> PolicyVectorStore:
-    global _store
+    global _store, _index_version
     if _store is None:
-        _store = PolicyVectorStore()
+        with _init_lock:
+            if _store is None:
+                store = PolicyVectorStore()
+                _index_version = store.opened_version
+                _store = store
     return _store
 
 
+def _get_batcher() -> RetrievalBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = RetrievalBatcher(
+            get_embedding_service(),
+            _get_store(),
+            max_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            enabled=settings.BATCHING_ENABLED,
+        )
+    return _batcher
+
+
+def _get_reranker() -> CrossEncoderReranker | None:
+    global _reranker
+    if not settings.RERANK_ENABLED:
+        return None
+    if _reranker is None:
+        with _init_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
+
+
+def _get_answer_cache() -> AnswerCache | None:
+    global _answer_cache
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            max_bytes=int(settings.ANSWER_CACHE_MAX_MB * 1024 * 1024),
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+        )
+    return _answer_cache
+
+
+def _new_llm_limiter(limit: int) -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=limit,
+        max_queue=settings.LLM_MAX_QUEUE,
+        queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        retry_after=settings.LLM_RETRY_AFTER_SECONDS,
+    )
+
+
+def _gen_batched() -> bool:
+    return settings.LLM_BACKEND == "transformers" and settings.GEN_BATCHING_ENABLED
+
+
+def _get_llm_limiter() -> AdmissionController:
+    global _llm_limiter
+    if _llm_limiter is None:
+        if settings.LLM_BACKEND == "transformers":
+            limit = settings.LLM_MAX_CONCURRENCY_TRANSFORMERS
+            if settings.GEN_BATCHING_ENABLED:
+                # Batches run one at a time, so each model slot can serve a full batch.
+                limit *= settings.GEN_BATCH_MAX_SIZE
+        else:
+            limit = settings.LLM_MAX_CONCURRENCY_OLLAMA
+        _llm_limiter = _new_llm_limiter(limit)
+    return _llm_limiter
+
+
+def _get_stream_limiter() -> AdmissionController:
+    # Streams bypass the generation batcher: each runs its own model.generate thread, so
+    # with in-process batching they get a separate limiter with the unscaled limit.
+    # Otherwise both paths share one limiter.
+    global _stream_limiter
+    if not _gen_batched():
+        return _get_llm_limiter()
+    if _stream_limiter is None:
+        _stream_limiter = _new_llm_limiter(settings.LLM_MAX_CONCURRENCY_TRANSFORMERS)
+    return _stream_limiter
+
+
+async def _acquire_llm_slot(timer: StageTimer | None = None, stream: bool = False) -> AdmissionController:
+    limiter = _get_stream_limiter() if stream else _get_llm_limiter()
+    try:
+        await limiter.acquire()
+    except AdmissionRejected as e:
+        if timer is not None:
+            timer.outcome = "shed"
+        logger.warning({"status": "shed", "reason": e.reason, "queue_depth": limiter.queue_depth})
+        raise HTTPException(
+            status_code=503,
+            detail="LLM busy, please retry",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return limiter
+
+
+async def warm_up() -> Dict[str, Any]:
+    # Builds and exercises every component before the first request: a dummy encode, a
+    # dummy query, a token count for context packing and a one-token generation. Independent parts load in parallel threads.
+    # Returns per-component seconds and any errors.
+    started = time.perf_counter()
+    seconds: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+
+    async def timed(name: str, fn):
+        t = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(fn)
+        except Exception as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+            logger.warning("%s warm-up failed", name, exc_info=True)
+            return None
+        seconds[name] = round(time.perf_counter() - t, 3)
+        return result
+
+    def open_store() -> PolicyVectorStore:
+        store = _get_store()
+        if settings.HYBRID_SEARCH_ENABLED:
+            store.lexical_index()
+        return store
+
+    llm = asyncio.ensure_future(timed("llm", lambda: _get_generator().warmup())) if settings.LLM_WARMUP_ENABLED else None
+    q_emb, store, _ = await asyncio.gather(
+        timed("embeddings", lambda: get_embedding_service().encode_one("warm up")),
+        timed("vector_store", open_store),
+        timed("tokenizer", lambda: _get_generator().count_tokens(["warm up"])),
+    )
+    if store is not None:
+        await timed("classifier", _get_classifier)
+        if q_emb is not None:
+            await timed("retrieval", lambda: store.search_many([q_emb], 1, queries=["warm up"]))
+    if settings.RERANK_ENABLED:
+        dummy = [RetrievedChunk("warm up", {}, 0.0)]
+        await timed("reranker", lambda: _get_reranker().score("warm up", dummy))
+    if llm is not None:
+        await llm
+    return {"seconds": round(time.perf_counter() - started, 3), "components": seconds, "errors": errors}
+
+
+def _check_index(version: str) -> None:
+    # _index_version is the version the store and classifier were built from.
+    if version != _index_version and not _reload_lock.locked():
+        asyncio.get_running_loop().run_in_executor(None, _reload_index, version)
+
+
+def _reload_index(version: str) -> None:
+    # The corpus was re-indexed by the ingest CLI or the policy watcher: reopen Chroma and
+    # rebuild the domain set in the background. The embedding model and LLM stay loaded.
+    global _store, _classifier, _index_version
+    if not _reload_lock.acquire(blocking=False):
+        return
+    try:
+        if version == _index_version:
+            return
+        store = _get_store().reopen()
+        classifier = DomainClassifier(store=store) if _classifier is not None else None
+        _store = store
+        if _batcher is not None:
+            _batcher.store = store
+        if classifier is not None:
+            _classifier = classifier
+        _index_version = store.opened_version
+        logger.info({"status": "index reloaded", "version": _index_version})
+    except Exception:
+        logger.exception({"status": "index reload failed", "version": version})
+    finally:
+        _reload_lock.release()
+
+
+def _domain_clarification(domains: List[str]) -> str:
+    if set(domains) == {"HR", "IT"}:
+        return "Is your question about HR policy (leave, payroll, benefits) or IT policy (accounts, devices, security)?"
+    return f"Which policy area is your question about: {', '.join(domains)}?"
+
+
 def _redact(text: str, max_len: int = 500) -> str:
     t = (text or "").strip()
     return (t[:max_len] + "…") if len(t) > max_len else t
 
 
-@router.post("/", response_model=ChatResponse)
-async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user)):
-    q = (req.question or "").strip()
+@dataclass
+class _Retrieved:
+    q: str
+    t0: float
+    domain: str
+    conf: float
+    method: str
+    route: str
+    q_emb: np.ndarray
+    version: str | None
+    results: List[RetrievedChunk]
+    top: List[RetrievedChunk]
+    rerank_ms: float | None = None
+
+
+def _vote_domain(results: List[RetrievedChunk]) -> Tuple[str, float]:
+    # Score-weighted vote over the domains of an unfiltered search; returns (domain, share).
+    weights: Dict[str, float] = {}
+    for r in results:
+        d = r.metadata.get("domain", "")
+        weights[d] = weights.get(d, 0.0) + max(r.score, 0.0)
+    domain = max(weights, key=weights.get)
+    total = sum(weights.values())
+    return domain, (weights[domain] / total if total > 0 else 0.0)
+
+
+def _validate(question: str) -> str:
+    q = (question or "").strip()
     if not (1 <= len(q) <= 500):
         raise HTTPException(status_code=422, detail="question must be 1–500 characters")
-    t0 = time.time()
+    return q
+
+
+async def _retrieve(q: str, t0: float, timer: StageTimer | None = None) -> ChatResponse | _Retrieved:
+    timer = timer or StageTimer()
+    cache = _get_answer_cache()
+    version = _get_store().content_version()
+    _check_index(version)
+    hit = cache.get(q, version=version) if cache else None
+    if hit:
+        timer.domain, timer.outcome = hit[0].get("domain", ""), "cached"
+        return ChatResponse(**hit[0], latency_ms=int((time.time() - t0) * 1000), cached=True)
 
     clf = _get_classifier()
-    domain, conf, method = clf.classify(req.question)
+    batcher = _get_batcher()
+    try:
+        with timer.stage("embed"):
+            q_emb = await batcher.embed(q)
+    except Exception:
+        raise HTTPException(status_code=503, detail="embedding model unavailable")
+
+    hit = cache.get(q, q_emb, version=version) if cache else None
+    if hit:
+        timer.domain, timer.outcome = hit[0].get("domain", ""), "cached"
+        return ChatResponse(**hit[0], latency_ms=int((time.time() - t0) * 1000), cached=True)
 
-    if conf < 0.55:
+    with timer.stage("classify"):
+        domain, conf, method = clf.classify(q, q_emb)
+    timer.domain, timer.method = domain, method
+    # Uncertain or borderline: search every domain at once and let the hits pick the domain,
+    # instead of asking the user or filtering on a guess.
+    route = "retrieval" if settings.ROUTE_BY_RETRIEVAL and conf < settings.ROUTE_BY_RETRIEVAL_BELOW else "classifier"
+
+    if conf < 0.55 and route == "classifier":
+        timer.outcome = "clarification"
         return ChatResponse(
             domain=domain,
             confidence=conf,
             answer=None,
             needs_clarification=True,
-            clarification="Is your question about HR policy (leave, payroll, benefits) or IT policy (accounts, devices, security)?",
+            clarification=_domain_clarification(clf.domains),
             citations=[],
             retrieval_scores=[],
             latency_ms=int((time.time() - t0) * 1000),
         )
 
-    store = _get_store()
     try:
-        results = await asyncio.wait_for(
-            asyncio.to_thread(store.search, q, 6, domain=domain),
-            timeout=settings.VECTOR_TIMEOUT_SECONDS,
-        )
-    except Exception:
-        raise HTTPException(status_code=503, detail="vector store unavailable")
+        with timer.stage("search"):
+            results = await asyncio.wait_for(
+                batcher.search(q_emb, 6, domain=domain if route == "classifier" else None, query=q),
+                timeout=settings.VECTOR_TIMEOUT_SECONDS,
+            )
     except asyncio.TimeoutError:
+        timer.outcome = "timeout"
         raise HTTPException(status_code=503, detail="vector store timeout")
+    except Exception:
+        raise HTTPException(status_code=503, detail="vector store unavailable")
+
+    if results and route == "retrieval":
+        domain, conf = _vote_domain(results)
+        results = [r for r in results if r.metadata.get("domain", "") == domain]
+        timer.domain = domain
 
     if not results:
+        timer.outcome = "clarification"
         return ChatResponse(
             domain=domain,
             confidence=conf,
@@ -93,6 +359,7 @@ async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user
 
     top_score = max(r.score for r in results)
     if top_score < 0.3:
+        timer.outcome = "clarification"
         return ChatResponse(
             domain=domain,
             confidence=conf,
@@ -105,7 +372,14 @@ async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user
         )
 
     sorted_res = sorted(results, key=lambda r: r.score, reverse=True)
-    best_score = sorted_res[0].score if sorted_res else 0.0
+    rerank_ms = None
+    reranker = _get_reranker()
+    if reranker:
+        started = time.perf_counter()
+        sorted_res = await reranker.rerank(q, sorted_res, settings.RERANK_BUDGET_MS)
+        rerank_ms = (time.perf_counter() - started) * 1000
+        timer.add("rerank", rerank_ms / 1000)
+    dedup_started = time.perf_counter()
     seen = set()
     dedup = []
     for r in sorted_res:
@@ -119,21 +393,16 @@ async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user
         dedup.append(r)
         if len(dedup) >= 3:
             break
-    top = dedup
-    context_blocks = [r.content for r in top]
+    timer.add("dedup", time.perf_counter() - dedup_started)
+
+    return _Retrieved(
+        q=q, t0=t0, domain=domain, conf=conf, method=method, route=route, q_emb=q_emb,
+        version=version, results=results, top=dedup, rerank_ms=rerank_ms,
+    )
 
-    gen = _get_generator()
-    try:
-        answer = await asyncio.wait_for(
-            asyncio.to_thread(gen.generate, q, context_blocks),
-            timeout=settings.LLM_TIMEOUT_SECONDS,
-        )
-    except Exception:
-        raise HTTPException(status_code=503, detail="LLM temporarily unavailable")
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=503, detail="LLM timeout")
 
-    citations: List[Citation] = [
+def _citations(top: List[RetrievedChunk]) -> List[Citation]:
+    return [
         Citation(
             source=r.metadata.get("source", ""),
             heading=r.metadata.get("heading", ""),
@@ -142,9 +411,11 @@ async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user
         for r in top
     ]
 
-    qtext = req.question or ""
-    input_char_count = len(qtext)
-    input_token_count = len(qtext.split())
+
+def _finish(ret: _Retrieved, answer: str, request: Request, packed: PackedContext) -> ChatResponse:
+    q = ret.q
+    input_char_count = len(q)
+    input_token_count = len(q.split())
     out_char_count = len(answer) if answer else 0
     out_token_count = len(answer.split()) if answer else 0
 
@@ -154,28 +425,231 @@ async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user
                 "question": _redact(q, 300),
                 "answer": _redact(answer, 800),
                 "request_id": getattr(request.state, "request_id", None),
-                "latency_ms": int((time.time() - t0) * 1000),
-                "domain": domain,
-                "confidence": round(conf, 3),
-                "top_score": round(best_score, 4),
+                "latency_ms": int((time.time() - ret.t0) * 1000),
+                "domain": ret.domain,
+                "confidence": round(ret.conf, 3),
+                "route": ret.route,
+                "top_score": round(max(r.score for r in ret.results), 4),
                 "retrieved_k": 6,
-                "final_top_k": len(top),
+                "final_top_k": len(ret.top),
+                "rerank_ms": None if ret.rerank_ms is None else round(ret.rerank_ms, 1),
+                "prompt_tokens": packed.prompt_tokens,
+                "context_sentences_dropped": packed.sentences_dropped,
                 "status": "success",
             }
         )
     except Exception:
         pass
 
-    return ChatResponse(
-        domain=domain,
-        confidence=round(conf, 3),
+    payload = dict(
+        domain=ret.domain,
+        confidence=round(ret.conf, 3),
         answer=answer,
-        citations=citations,
-        retrieval_scores=[round(r.score, 4) for r in results],
-        latency_ms=int((time.time() - t0) * 1000),
+        citations=_citations(ret.top),
+        retrieval_scores=[round(r.score, 4) for r in ret.results],
+        route=ret.route,
         input_token_count=input_token_count,
         input_char_count=input_char_count,
         output_token_count=out_token_count,
         output_char_count=out_char_count,
+        prompt_token_count=packed.prompt_tokens,
+    )
+    cache = _get_answer_cache()
+    if cache and answer:
+        cache.put(q, payload, embedding=ret.q_emb, version=ret.version)
+
+    return ChatResponse(**payload, latency_ms=int((time.time() - ret.t0) * 1000))
+
+
+@router.post("/", response_model=ChatResponse)
+async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user)):
+    q = _validate(req.question)
+    t0 = time.time()
+    timer = StageTimer()
+    try:
+        ret = await _retrieve(q, t0, timer)
+        if isinstance(ret, ChatResponse):
+            return ret
+        gen = _get_generator()
+        with timer.stage("prompt_build"):
+            # Tokenizes every candidate sentence; kept off the event loop like retrieval.
+            packed = await asyncio.to_thread(gen.pack_context, q, [r.content for r in ret.top])
+        with timer.stage("llm_queue"):
+            limiter = await _acquire_llm_slot(timer)
+        try:
+            with timer.stage("generate"):
+                answer = await _until_disconnect(
+                    gen.agenerate(q, packed.blocks), request, settings.LLM_TIMEOUT_SECONDS
+                )
+        except HTTPException as e:
+            if e.status_code == 499:
+                timer.outcome = "cancelled"
+            raise
+        except asyncio.TimeoutError:
+            timer.outcome = "timeout"
+            raise HTTPException(status_code=503, detail="LLM timeout")
+        except Exception:
+            raise HTTPException(status_code=503, detail="LLM temporarily unavailable")
+        finally:
+            limiter.release()
+
+        timer.outcome = "success"
+        return _finish(ret, answer, request, packed)
+    finally:
+        timer.finish()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _until_disconnect(coro: Awaitable[Any], request: Request, timeout: float) -> Any:
+    # Awaits coro, cancelling it on timeout or when the client goes away.
+    task = asyncio.ensure_future(coro)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            done, _ = await asyncio.wait({task}, timeout=min(remaining, 0.5))
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(status_code=499, detail="client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@router.post("/stream")
+async def chat_stream(req: ChatRequest, request: Request, user=Depends(get_current_user)):
+    q = _validate(req.question)
+    t0 = time.time()
+    timer = StageTimer()
+    try:
+        ret = await _retrieve(q, t0, timer)
+        if isinstance(ret, ChatResponse):
+            async def single():
+                yield _sse("done", ret.model_dump())
+            timer.finish()
+            return StreamingResponse(single(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+        gen = _get_generator()
+        with timer.stage("prompt_build"):
+            packed = await asyncio.to_thread(gen.pack_context, q, [r.content for r in ret.top])
+        with timer.stage("llm_queue"):
+            limiter = await _acquire_llm_slot(timer, stream=True)
+    except BaseException:
+        timer.finish()
+        raise
+    released = False
+
+    def release_slot():
+        # Runs from the stream's finally and as a background task, so the slot is
+        # returned even if the client disconnects before the stream starts.
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+        timer.finish()
+
+    async def events():
+        parts: List[str] = []
+        deadline = time.monotonic() + settings.LLM_TIMEOUT_SECONDS
+        started = time.perf_counter()
+        tokens = gen.astream(q, packed.blocks)
+        try:
+            yield _sse("meta", {
+                "domain": ret.domain,
+                "confidence": round(ret.conf, 3),
+                "citations": [c.model_dump() for c in _citations(ret.top)],
+                "retrieval_scores": [round(r.score, 4) for r in ret.results],
+                "route": ret.route,
+            })
+            while True:
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), timeout=max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    break
+                if not parts:
+                    timer.add("ttft", time.perf_counter() - started)
+                parts.append(token)
+                yield _sse("token", {"text": token})
+            timer.outcome = "success"
+        except asyncio.TimeoutError:
+            timer.outcome = "timeout"
+            yield _sse("error", {"detail": "LLM timeout"})
+            return
+        except Exception:
+            yield _sse("error", {"detail": "LLM temporarily unavailable"})
+            return
+        except BaseException:
+            # Client went away mid-stream.
+            timer.outcome = "cancelled"
+            raise
+        finally:
+            timer.add("generate", time.perf_counter() - started)
+            await tokens.aclose()
+            release_slot()
+        resp = _finish(ret, "".join(parts).strip(), request, packed)
+        yield _sse("done", resp.model_dump())
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers=_SSE_HEADERS, background=BackgroundTask(release_slot)
     )
 
+
+@router.get("/stats")
+async def chat_stats(user=Depends(get_current_user)):
+    cache = _get_answer_cache()
+    return {
+        "batching": _get_batcher().stats(),
+        "answer_cache": cache.stats() if cache else None,
+        "llm_admission": _get_llm_limiter().stats(),
+        "llm_stream_admission": _get_stream_limiter().stats() if _gen_batched() else None,
+        "rerank": _reranker.stats() if _reranker else None,
+    }
+
+
+def _component_metrics():
+    # Counters the components keep themselves, exported as they are at scrape time.
+    # Singletons that have not been created yet are skipped rather than built here.
+    if _llm_limiter is not None:
+        s = _llm_limiter.stats()
+        yield "rag_llm_active", "gauge", "Generations holding an LLM slot.", [("", {}, s["active"])]
+        yield "rag_llm_queue_depth", "gauge", "Requests waiting for an LLM slot.", [("", {}, s["queue_depth"])]
+        yield "rag_llm_rejected_total", "counter", "Requests shed by LLM admission control.", [
+            ("", {"reason": "queue_full"}, s["rejected_queue_full"]),
+            ("", {"reason": "queue_timeout"}, s["rejected_timeout"]),
+        ]
+    if _stream_limiter is not None:
+        s = _stream_limiter.stats()
+        yield "rag_llm_stream_active", "gauge", "Streaming generations holding a slot (batched transformers only).", [
+            ("", {}, s["active"])
+        ]
+        yield "rag_llm_stream_queue_depth", "gauge", "Streaming requests waiting for a slot.", [("", {}, s["queue_depth"])]
+    if _answer_cache is not None:
+        s = _answer_cache.stats()
+        yield "rag_answer_cache_entries", "gauge", "Entries in the answer cache.", [("", {}, s["entries"])]
+        yield "rag_answer_cache_lookups_total", "counter", "Answer cache lookups by result.", [
+            ("", {"result": "exact"}, s["hits_exact"]),
+            ("", {"result": "semantic"}, s["hits_semantic"]),
+            ("", {"result": "miss"}, s["misses"]),
+        ]
+    if _batcher is not None:
+        s = _batcher.stats()
+        yield "rag_batches_total", "counter", "Micro-batches run.", [
+            ("", {"batcher": name}, s[name]["batches"]) for name in ("embed", "search")
+        ]
+        yield "rag_batch_items_total", "counter", "Requests served by micro-batches.", [
+            ("", {"batcher": name}, s[name]["items"]) for name in ("embed", "search")
+        ]
+    if _reranker is not None:
+        s = _reranker.stats()
+        yield "rag_rerank_fallbacks_total", "counter", "Reranks that fell back to retrieval order.", [
+            ("", {}, s["fallbacks"])
+        ]
+
+
+metrics.add_collector(_component_metrics)
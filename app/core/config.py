@@ -7,10 +7,25 @@ class Settings(BaseSettings):
     SECRET_KEY: str = Field(..., description="JWT secret key")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     ALGORITHM: str = "HS256"
+    # Tokens carry email, name and active flag; resolved users are cached per worker.
+    AUTH_TRUST_TOKEN_CLAIMS: bool = True
+    AUTH_USER_CACHE_TTL_SECONDS: float = 60
     DATABASE_URL: str = "sqlite:///./app.db"
     CORS_ORIGINS: str = "http://localhost:3000"
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # "onnx"/"onnx-int8" run an exported copy of EMBEDDING_MODEL on ONNX Runtime without torch;
+    # export ahead of time with `python -m app.rag.onnx_embeddings`, otherwise the first load does it.
+    EMBEDDING_BACKEND: Literal["torch", "onnx", "onnx-int8"] = "torch"
+    EMBEDDING_ONNX_DIR: str = "models/onnx"
+    # ONNX Runtime intra-op threads per process; 0 picks min(4, CPU count).
+    EMBEDDING_THREADS: int = 0
     CHROMA_DIR: str = "./.chroma"
+    # "numpy" keeps vectors in a memory-mapped matrix under CHROMA_DIR with exact search;
+    # switching backends needs one `python -m app.rag.ingest` run to fill the new store.
+    VECTOR_BACKEND: Literal["chroma", "numpy"] = "chroma"
+    # float16 halves the file and page cache, but converting rows back to float32 slows each query.
+    VECTOR_DTYPE: Literal["float32", "float16"] = "float32"
+    POLICY_DIR: str = "data"
     LLM_BACKEND: Literal["ollama", "transformers"] = Field(
         "ollama",
         validation_alias=AliasChoices("LLM_BACKEND", "llm_backend"),
@@ -27,6 +42,11 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("OLLAMA_HOST", "ollama_host"),
         description="Ollama server base URL",
     )
+    OLLAMA_MAX_CONNECTIONS: int = Field(
+        32,
+        validation_alias=AliasChoices("OLLAMA_MAX_CONNECTIONS", "ollama_max_connections"),
+        description="Size of the pooled HTTP connection set to OLLAMA_HOST",
+    )
 
     HF_MODEL: str = Field(
         "TinyLlama/TinyLlama-1.1B-Chat-v1.0",
@@ -40,10 +60,78 @@ class Settings(BaseSettings):
         0.2,
         validation_alias=AliasChoices("TEMPERATURE", "temperature"),
     )
+    GEN_BATCHING_ENABLED: bool = True
+    GEN_BATCH_MAX_SIZE: int = 8
+    GEN_BATCH_MAX_WAIT_MS: float = 20.0
+
+    # Prompt budget in the LLM's tokens: system prompt, packed context sentences and question.
+    LLM_INPUT_TOKEN_BUDGET: int = 512
+    # Hugging Face tokenizer matching OLLAMA_MODEL; empty counts with the embedding tokenizer.
+    LLM_TOKENIZER: str = ""
+    # Reuse the system prompt's KV cache (transformers) and keep the Ollama model loaded.
+    PREFIX_CACHE_ENABLED: bool = True
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    # Load the model and prime the system prompt at startup instead of on the first request.
+    LLM_WARMUP_ENABLED: bool = True
+    # Load embeddings, Chroma and the classifier at startup, in parallel with the LLM; /ready is 503 until done.
+    STARTUP_WARMUP_ENABLED: bool = True
+    # Per-stage latency histograms and request counters in Prometheus text format at /metrics.
+    METRICS_ENABLED: bool = True
 
     VECTOR_TIMEOUT_SECONDS: int = 5
     LLM_TIMEOUT_SECONDS: int = 90
 
+    # Generation admission control; the in-process transformers model should not oversubscribe CPU cores.
+    LLM_MAX_CONCURRENCY_OLLAMA: int = 8
+    LLM_MAX_CONCURRENCY_TRANSFORMERS: int = 1
+    LLM_MAX_QUEUE: int = 32
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 20
+    LLM_RETRY_AFTER_SECONDS: int = 5
+
+    # JSON of {"DOMAIN": {"keyword or phrase": weight}}; empty uses app/rag/domain_keywords.json.
+    DOMAIN_KEYWORDS_FILE: str = ""
+    # Nearest ingested chunks that vote on a question's domain.
+    CLASSIFIER_TOP_K: int = 10
+
+    # Below this classifier confidence, search all domains and take the domain from the hits.
+    ROUTE_BY_RETRIEVAL: bool = False
+    ROUTE_BY_RETRIEVAL_BELOW: float = 0.7
+
+    # Hybrid retrieval: BM25 over the same chunks, fused with the vector hits by reciprocal rank.
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATES: int = 20  # per ranking, before fusion
+    HYBRID_RRF_K: int = 60
+
+    # Optional cross-encoder pass over the retrieved chunks before the top 3 are picked.
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_MAX_LENGTH: int = 256
+    RERANK_BUDGET_MS: float = 150  # past this, keep the retrieval order
+    RERANK_CACHE_ENTRIES: int = 4096
+
+    BATCHING_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 16
+    BATCH_MAX_WAIT_MS: float = 5.0
+
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_MAX_MB: float = 32
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_SIMILARITY: float = 0.92
+
+    # Chunk windows in embedding-model tokens; all-MiniLM-L6-v2 truncates at 256.
+    CHUNK_MAX_TOKENS: int = 200
+    CHUNK_OVERLAP_TOKENS: int = 40
+
+    # Bulk ingestion; 0 workers means one per CPU core.
+    INGEST_WORKERS: int = 0
+    INGEST_EMBED_BATCH_SIZE: int = 64
+    INGEST_UPSERT_BATCH_SIZE: int = 1024
+
+    # Re-index POLICY_DIR on change from inside the API process; enable in one process only.
+    POLICY_WATCH_ENABLED: bool = False
+    POLICY_WATCH_DEBOUNCE_MS: int = 1500
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 if not os.path.exists(".env"):
@@ -0,0 +1,191 @@
+from __future__ import annotations
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+# Seconds; spans a cached answer (~1 ms) to a slow CPU generation.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = "rag_stage_seconds"
+REQUEST_SECONDS = "rag_request_seconds"
+REQUESTS_TOTAL = "rag_requests_total"
+
+
+class _Shard:
+    def __init__(self):
+        # Histogram values are bucket counts followed by the running sum.
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+
+
+class MetricsRegistry:
+    # Each thread writes to its own shard without taking a lock; a scrape sums the shards.
+    # The only lock is taken once per thread, when its shard is created, and by scrapes.
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self._meta[name] = (kind, text)
+
+    def add_collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+        # fn yields (name, kind, help, samples) at scrape time, for stats kept elsewhere.
+        self._collectors.append(fn)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        hists = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        hist = hists.get(key)
+        if hist is None:
+            hist = hists[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        hist[bisect.bisect_left(self.buckets, seconds)] += 1
+        hist[-1] += seconds
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0.0) + value
+
+    def histogram(self, name: str, **labels: str) -> Dict[str, float]:
+        # Merged count and sum for one label set; handy in tests and benchmarks.
+        hist = self._merged()[0].get((name, tuple(sorted(labels.items()))))
+        if hist is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": sum(hist[:-1]), "sum": hist[-1]}
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self._merged()[1].get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.histograms.clear()
+                shard.counters.clear()
+
+    def _merged(self) -> Tuple[Dict[Tuple[str, Labels], List[float]], Dict[Tuple[str, Labels], float]]:
+        hists: Dict[Tuple[str, Labels], List[float]] = {}
+        counters: Dict[Tuple[str, Labels], float] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # list() copies are atomic under the GIL; a writer may land just before or after.
+            for key, hist in list(shard.histograms.items()):
+                acc = hists.setdefault(key, [0] * len(hist[:-1]) + [0.0])
+                for i, v in enumerate(list(hist)):
+                    acc[i] += v
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0.0) + value
+        return hists, counters
+
+    def render(self) -> str:
+        hists, counters = self._merged()
+        lines: List[str] = []
+        for name in sorted({k[0] for k in hists}):
+            self._header(lines, name, "histogram")
+            for (n, labels), hist in sorted(hists.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), hist[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_value(hist[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        for name in sorted({k[0] for k in counters}):
+            self._header(lines, name, "counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {_value(value)}")
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception:
+                continue
+            for name, kind, text, samples in families:
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for suffix, labels, value in samples:
+                    lines.append(f"{name}{suffix}{_labels(tuple(sorted(labels.items())))} {_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, kind: str) -> None:
+        kind, text = self._meta.get(name, (kind, name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class StageTimer:
+    # Per-request stage timings. Nothing is shared until finish() records them, so
+    # timing a stage costs two perf_counter calls and a dict write.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.domain = ""
+        self.method = ""
+        self.outcome = "error"
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def finish(self, registry: MetricsRegistry | None = None, outcome: str | None = None) -> None:
+        # Idempotent: streaming responses finish from the generator and the background task.
+        if self._finished:
+            return
+        self._finished = True
+        if outcome is not None:
+            self.outcome = outcome
+        registry = registry or metrics
+        labels = {"domain": self.domain, "method": self.method, "outcome": self.outcome}
+        for name, seconds in self.stages.items():
+            registry.observe(STAGE_SECONDS, seconds, stage=name, **labels)
+        registry.observe(REQUEST_SECONDS, time.perf_counter() - self.started, **labels)
+        registry.inc(REQUESTS_TOTAL, **labels)
+
+
+metrics = MetricsRegistry()
+metrics.describe(STAGE_SECONDS, "histogram", "Time spent in each stage of a chat request.")
+metrics.describe(REQUEST_SECONDS, "histogram", "End-to-end chat request time.")
+metrics.describe(REQUESTS_TOTAL, "counter", "Chat requests by domain, classifier method and outcome.")
@@ -13,10 +13,13 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def create_access_token(subject: str | int, expires_minutes: Optional[int] = None) -> str:
+def create_access_token(
+    subject: str | int, expires_minutes: Optional[int] = None, claims: Optional[dict[str, Any]] = None
+) -> str:
     expire_delta = expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES
-    expire = datetime.now(timezone.utc) + timedelta(minutes=expire_delta)
-    to_encode: dict[str, Any] = {"sub": str(subject), "exp": expire}
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=expire_delta)
+    to_encode: dict[str, Any] = {**(claims or {}), "sub": str(subject), "iat": now, "exp": expire}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
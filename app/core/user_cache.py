@@ -0,0 +1,84 @@
+from __future__ import annotations
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    email: str
+    full_name: str | None
+    is_active: bool
+
+
+class UserCache:
+    # Per-worker TTL cache of resolved users. Reads take no lock; a dict lookup is atomic.
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[CurrentUser, float]] = {}
+        self._invalidated: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> CurrentUser | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, user: CurrentUser) -> None:
+        with self._lock:
+            self._entries.pop(user.id, None)
+            while len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user.id] = (user, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, user_id: int) -> None:
+        # Tokens issued before this moment no longer vouch for the user; the next request
+        # for them reads the database.
+        now = time.time()
+        with self._lock:
+            self._entries.pop(user_id, None)
+            # Older marks are moot: tokens issued before them are past the claims window anyway.
+            for uid, at in list(self._invalidated.items()):
+                if at < now - self.ttl_seconds:
+                    del self._invalidated[uid]
+            self._invalidated.pop(user_id, None)
+            while len(self._invalidated) >= self.max_entries:
+                self._invalidated.pop(next(iter(self._invalidated)))
+            self._invalidated[user_id] = now
+            self.invalidations += 1
+
+    def claims_trusted(self, user_id: int, issued_at: Any) -> bool:
+        # Claims are a snapshot taken at login, so they are only as good as a cache entry of
+        # the same age: past the TTL the user is read from the database. A change made in
+        # the database thus reaches every worker within the TTL, not at token expiry.
+        if not isinstance(issued_at, (int, float)) or issued_at < time.time() - self.ttl_seconds:
+            return False
+        invalidated = self._invalidated.get(user_id)
+        return invalidated is None or issued_at > invalidated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache(ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(user_id: int) -> None:
+    # Runs on every User row update (see app.models.user); other workers catch up within the TTL.
+    user_cache.invalidate(user_id)
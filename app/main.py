@@ -1,13 +1,54 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.core.config import get_allowed_origins
+from app.core.config import get_allowed_origins, settings
 from app.api.v1 import auth_router, chat_router
 from app.core.logging_config import setup_rotating_file_logger
 
+
+logger = logging.getLogger("app.main")
+
+
+async def _warm_up(app: FastAPI) -> None:
+    from app.api.v1.chat import warm_up
+
+    report = await warm_up()
+    app.state.startup = report
+    # A failed LLM warm-up (e.g. Ollama still starting) leaves the worker ready; retrieval can
+    # still answer and the first generation loads the model. Anything else keeps it unready.
+    app.state.ready = not (set(report["errors"]) - {"llm"})
+    logger.info({"event": "startup", "ready": app.state.ready, **report})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The server accepts connections at once; /ready turns 200 when warm-up finishes.
+    app.state.ready = not settings.STARTUP_WARMUP_ENABLED
+    app.state.startup = None
+    warmup = asyncio.create_task(_warm_up(app)) if settings.STARTUP_WARMUP_ENABLED else None
+    stop = asyncio.Event()
+    watcher = None
+    if settings.POLICY_WATCH_ENABLED:
+        from app.rag.watcher import watch_policies
+        watcher = asyncio.create_task(watch_policies(stop))
+    yield
+    stop.set()
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    if watcher is not None:
+        try:
+            await asyncio.wait_for(watcher, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+
+
 app = FastAPI(
     title="Rubix Chat API",
+    lifespan=lifespan,
     swagger_ui_parameters={"persistAuthorization": True},
 )
 
@@ -25,12 +66,31 @@ app.add_middleware(
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(chat_router, prefix="/api/v1")
 
-app.mount("/", StaticFiles(directory="static", html=True), name="static")
+if settings.METRICS_ENABLED:
+    from app.core.metrics import metrics
+
+    # Registered before the static mount, which would otherwise shadow it.
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
+
+# Probes are registered before the static mount, which would otherwise shadow them.
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+
+@app.get("/ready")
+async def ready(request: Request):
+    startup = request.app.state.startup
+    if request.app.state.ready:
+        return {"status": "ready", "startup": startup}
+    status = "warming_up" if startup is None else "failed"
+    return JSONResponse(status_code=503, content={"status": status, "startup": startup})
+
+app.mount("/", StaticFiles(directory="static", html=True), name="static")
+
 @app.middleware("http")
 async def add_request_id(request: Request, call_next):
     request.state.request_id = id(request)
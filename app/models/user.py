@@ -1,6 +1,7 @@
 from datetime import datetime
-from sqlalchemy import String, Boolean, DateTime
+from sqlalchemy import String, Boolean, DateTime, event
 from sqlalchemy.orm import Mapped, mapped_column
+from app.core.user_cache import invalidate_user
 from app.db.base import Base
 
 
@@ -11,4 +12,10 @@ class User(Base):
     full_name: Mapped[str | None] = mapped_column(String(200), nullable=True)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow)
\ No newline at end of file
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow)
+
+
+@event.listens_for(User, "after_update")
+def _drop_cached_user(mapper, connection, target: User) -> None:
+    # Disabling a user or changing their name/email takes effect at once in this worker.
+    invalidate_user(target.id)
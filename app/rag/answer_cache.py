@@ -0,0 +1,173 @@
+from __future__ import annotations
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+
+
+@dataclass
+class CachedAnswer:
+    key: str
+    embedding: Optional[np.ndarray]
+    payload: Dict[str, Any]
+    created_at: float
+    size: int
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.92,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._bytes = 0
+        self._version: str | None = None
+        self._lock = threading.Lock()
+        self._matrix: np.ndarray | None = None
+        self._matrix_keys: List[str] = []
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        q = _PUNCT_RE.sub(" ", (question or "").lower())
+        return _WS_RE.sub(" ", q).strip()
+
+    def get(
+        self, question: str, embedding: np.ndarray | None = None, version: str | None = None
+    ) -> Tuple[Dict[str, Any], str] | None:
+        key = self.normalize(question)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry, now):
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+                return entry.payload, "exact"
+            if embedding is not None:
+                match = self._nearest(np.asarray(embedding, dtype=np.float32), now)
+                if match is not None:
+                    self._entries.move_to_end(match.key)
+                    self.hits_semantic += 1
+                    return match.payload, "semantic"
+                self.misses += 1
+            return None
+
+    def put(
+        self,
+        question: str,
+        payload: Dict[str, Any],
+        embedding: np.ndarray | None = None,
+        version: str | None = None,
+    ) -> None:
+        key = self.normalize(question)
+        if not key:
+            return
+        emb = None if embedding is None else np.asarray(embedding, dtype=np.float32)
+        entry = CachedAnswer(
+            key=key,
+            embedding=emb,
+            payload=payload,
+            created_at=time.monotonic(),
+            size=self._estimate_size(key, payload, emb),
+        )
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        self._matrix = None
+        self._matrix_keys = []
+
+    def _check_version(self, version: str | None) -> None:
+        if version is None or version == self._version:
+            return
+        if self._version is not None or self._entries:
+            self.invalidations += 1
+            self._clear_locked()
+        self._version = version
+
+    def _fresh(self, entry: CachedAnswer, now: float) -> bool:
+        if now - entry.created_at <= self.ttl_seconds:
+            return True
+        self._entries.pop(entry.key, None)
+        self._bytes -= entry.size
+        self._matrix = None
+        return False
+
+    def _nearest(self, emb: np.ndarray, now: float) -> CachedAnswer | None:
+        if self._matrix is None:
+            keys = [k for k, e in self._entries.items() if e.embedding is not None]
+            self._matrix_keys = keys
+            self._matrix = (
+                np.stack([self._entries[k].embedding for k in keys]) if keys else np.zeros((0, emb.shape[0]), np.float32)
+            )
+        if not self._matrix_keys:
+            return None
+        sims = self._matrix @ emb
+        best = int(np.argmax(sims))
+        if float(sims[best]) < self.similarity_threshold:
+            return None
+        entry = self._entries.get(self._matrix_keys[best])
+        if entry is None or not self._fresh(entry, now):
+            return None
+        return entry
+
+    @staticmethod
+    def _estimate_size(key: str, payload: Dict[str, Any], emb: np.ndarray | None) -> int:
+        size = sys.getsizeof(key) + (emb.nbytes if emb is not None else 0)
+        for value in payload.values():
+            if isinstance(value, list):
+                size += sum(sys.getsizeof(str(v)) for v in value)
+            else:
+                size += sys.getsizeof(value)
+        return size
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generic, List, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.rag.embeddings import EmbeddingService
+    from app.rag.vectorstore import PolicyVectorStore, RetrievedChunk
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BatchStats:
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.size_histogram: Dict[int, int] = defaultdict(int)
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def record(self, size: int, waits_ms: Sequence[float], run_ms: float) -> None:
+        self.batches += 1
+        self.items += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.size_histogram[size] += 1
+        self.total_wait_ms += sum(waits_ms)
+        self.max_wait_ms = max(self.max_wait_ms, max(waits_ms, default=0.0))
+        self.total_run_ms += run_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "batch_size_histogram": dict(sorted(self.size_histogram.items())),
+            "avg_queue_wait_ms": round(self.total_wait_ms / self.items, 3) if self.items else 0.0,
+            "max_queue_wait_ms": round(self.max_wait_ms, 3),
+            "avg_batch_run_ms": round(self.total_run_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+# Flushes when max_size items are queued or the first one has waited max_wait_ms.
+# Batches run one at a time; requests arriving meanwhile form the next batch.
+class MicroBatcher(Generic[T, R]):
+    def __init__(self, batch_fn: Callable[[List[T]], List[R]], max_size: int = 16, max_wait_ms: float = 5.0):
+        self.batch_fn = batch_fn
+        self.max_size = max(1, max_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.stats = BatchStats()
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def submit(self, item: T) -> R:
+        queue = self._ensure_worker()
+        fut = asyncio.get_running_loop().create_future()
+        queue.put_nowait((item, fut, time.perf_counter()))
+        return await fut
+
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[T, asyncio.Future, float]]:
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await self._collect(queue)
+            live = [(item, fut, ts) for item, fut, ts in batch if not fut.done()]
+            if not live:
+                continue
+            started = time.perf_counter()
+            waits_ms = [(started - ts) * 1000 for _, _, ts in live]
+            try:
+                results = await asyncio.to_thread(self.batch_fn, [item for item, _, _ in live])
+            except Exception as e:
+                for _, fut, _ in live:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            finally:
+                self.stats.record(len(live), waits_ms, (time.perf_counter() - started) * 1000)
+            for (_, fut, _), res in zip(live, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+
+SearchRequest = Tuple[np.ndarray, int, "str | None", "str | None"]
+
+
+class RetrievalBatcher:
+    def __init__(
+        self,
+        embedder: EmbeddingService,
+        store: PolicyVectorStore,
+        max_size: int = 16,
+        max_wait_ms: float = 5.0,
+        enabled: bool = True,
+    ):
+        self.embedder = embedder
+        self.store = store
+        self.enabled = enabled
+        self.embed_batcher: MicroBatcher[str, np.ndarray] = MicroBatcher(self._embed_batch, max_size, max_wait_ms)
+        self.search_batcher: MicroBatcher[SearchRequest, List[RetrievedChunk]] = MicroBatcher(
+            self._search_batch, max_size, max_wait_ms
+        )
+
+    async def embed(self, text: str) -> np.ndarray:
+        if not self.enabled:
+            return await asyncio.to_thread(self.embedder.encode_one, text)
+        return await self.embed_batcher.submit(text)
+
+    async def search(
+        self, embedding: np.ndarray, k: int = 5, domain: str | None = None, query: str | None = None
+    ) -> List[RetrievedChunk]:
+        if not self.enabled:
+            results = await asyncio.to_thread(self.store.search_many, [embedding], k, domain, [query])
+            return results[0]
+        return await self.search_batcher.submit((embedding, k, domain, query))
+
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        return list(self.embedder.encode(texts))
+
+    def _search_batch(self, requests: List[SearchRequest]) -> List[List[RetrievedChunk]]:
+        # Chroma applies one `where` filter per query call, so group by (k, domain).
+        groups: Dict[Tuple[int, str | None], List[int]] = defaultdict(list)
+        for i, (_, k, domain, _) in enumerate(requests):
+            groups[(k, domain)].append(i)
+        out: List[List[RetrievedChunk]] = [[] for _ in requests]
+        for (k, domain), idxs in groups.items():
+            results = self.store.search_many(
+                [requests[i][0] for i in idxs], k, domain=domain, queries=[requests[i][3] for i in idxs]
+            )
+            for i, res in zip(idxs, results):
+                out[i] = res
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.embed_batcher.max_size,
+            "max_wait_ms": self.embed_batcher.max_wait * 1000,
+            "embed": self.embed_batcher.stats.snapshot(),
+            "search": self.search_batcher.stats.snapshot(),
+        }
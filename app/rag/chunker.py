@@ -1,33 +1,42 @@
 from __future__ import annotations
 import re
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict, Sequence, Tuple
+
+# Anchored on a literal "\n#" so the regex engine can skip ahead instead of testing every line.
+# [^\S\n] is \s without the newline, so the separator never crosses into the next line.
+_HEADING = re.compile(r"\n(#{1,6})[^\S\n]+([^\n]*)")
+# Unit boundaries: after a sentence, at a blank line, or before a list item.
+_BOUNDARY = re.compile(r"(?<=[.!?])[ \t]+(?=\S)|\n[ \t]*\n\s*|\n(?=[ \t]*(?:[-*+]|\d+[.)])[ \t])")
+
+TokenCounter = Callable[[Sequence[str]], List[int]]
+
+
+def _sections(text: str) -> Iterator[Tuple[str, str, int, int]]:
+    # One scan over the headings; yields (heading, heading_path, start, end) spans into text.
+    stack: List[Tuple[int, str]] = []
+    heading, path, start = "", "", 0
+    for m in _HEADING.finditer("\n" + text):
+        pos = m.start()  # offset of the "#" in text, thanks to the prepended newline
+        if pos > start:
+            yield heading, path, start, pos
+        level, heading = len(m.group(1)), m.group(2).strip()
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, heading))
+        path = " > ".join(h for _, h in stack)
+        start = pos
+    if start < len(text):
+        yield heading, path, start, len(text)
 
 
 def split_markdown(text: str, max_chars: int = 1000, overlap: int = 150) -> List[Dict]:
 
     text = text.replace("\r\n", "\n").strip()
     parts: List[Dict] = []
-    current_heading = ""
-    buffer: List[str] = []
-
-    for line in text.split("\n"):
-        m = re.match(r"^(#{1,6})\s+(.*)$", line)
-        if m:
-            if buffer:
-                section_text = "\n".join(buffer).strip()
-                if section_text:
-                    parts.extend(_window(section_text, current_heading, max_chars, overlap))
-                buffer = []
-            current_heading = m.group(2).strip()
-            buffer.append(line)
-        else:
-            buffer.append(line)
-
-    if buffer:
-        section_text = "\n".join(buffer).strip()
+    for heading, _, start, end in _sections(text):
+        section_text = text[start:end].strip()
         if section_text:
-            parts.extend(_window(section_text, current_heading, max_chars, overlap))
-
+            parts.extend(_window(section_text, heading, max_chars, overlap))
     return parts
 
 
@@ -44,4 +53,84 @@ def _window(section: str, heading: str, max_chars: int, overlap: int) -> List[Di
         if end == len(section):
             break
         start = max(0, end - overlap)
-    return chunks
\ No newline at end of file
+    return chunks
+
+
+def _units(section: str) -> List[Tuple[int, int]]:
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    for m in _BOUNDARY.finditer(section):
+        if m.start() > start:
+            spans.append((start, m.start()))
+        start = m.end()
+    if start < len(section):
+        spans.append((start, len(section)))
+    return spans
+
+
+def split_sentences(text: str) -> List[str]:
+    return [text[a:b].strip() for a, b in _units(text) if text[a:b].strip()]
+
+
+def _split_long(section: str, span: Tuple[int, int], tokens: int, max_tokens: int) -> List[Tuple[int, int]]:
+    # A single sentence over budget: cut at whitespace, sized by its chars-per-token ratio.
+    start, end = span
+    step = max(1, int((end - start) * max_tokens / tokens * 0.9))
+    out: List[Tuple[int, int]] = []
+    while end - start > step:
+        cut = section.rfind(" ", start + 1, start + step)
+        cut = cut if cut > start else start + step
+        out.append((start, cut))
+        start = cut + 1 if section[cut] == " " else cut
+    out.append((start, end))
+    return out
+
+
+def _token_windows(
+    section: str, count_tokens: TokenCounter, max_tokens: int, overlap_tokens: int
+) -> List[Tuple[int, int]]:
+    spans = _units(section)
+    counts = count_tokens([section[s:e] for s, e in spans])
+    if any(c > max_tokens for c in counts):
+        fixed: List[Tuple[int, int]] = []
+        for span, c in zip(spans, counts):
+            fixed.extend(_split_long(section, span, c, max_tokens) if c > max_tokens else [span])
+        spans = fixed
+        counts = count_tokens([section[s:e] for s, e in spans])
+
+    windows: List[Tuple[int, int]] = []
+    i, n = 0, len(spans)
+    while i < n:
+        j, total = i, 0
+        while j < n and (j == i or total + counts[j] <= max_tokens):
+            total += counts[j]
+            j += 1
+        windows.append((spans[i][0], spans[j - 1][1]))
+        if j == n:
+            break
+        # Step back over whole sentences that fit in the overlap budget.
+        k, carried = j, 0
+        while k - 1 > i and carried + counts[k - 1] <= overlap_tokens:
+            k -= 1
+            carried += counts[k]
+        i = k
+    return windows
+
+
+def chunk_markdown(
+    text: str,
+    count_tokens: TokenCounter,
+    max_tokens: int = 200,
+    overlap_tokens: int = 40,
+) -> List[Dict]:
+    # Token-sized windows that start and end on sentence, paragraph or list-item boundaries.
+    text = text.replace("\r\n", "\n").strip()
+    parts: List[Dict] = []
+    for heading, path, start, end in _sections(text):
+        section = text[start:end].strip()
+        if not section:
+            continue
+        for s, e in _token_windows(section, count_tokens, max_tokens, overlap_tokens):
+            parts.append({"content": section[s:e], "heading": heading, "heading_path": path})
+    return parts
+
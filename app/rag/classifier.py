@@ -1,57 +1,142 @@
 from __future__ import annotations
-from typing import Tuple
+import json
+import os
+from typing import Dict, List, Tuple, TYPE_CHECKING
 from pathlib import Path
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
 from app.core.config import settings
+from app.rag.discovery import discover_policies
+from app.rag.embeddings import get_embedding_service
+from app.rag.keywords import KeywordMatcher, load_domain_keywords
 
+if TYPE_CHECKING:
+    from app.rag.vectorstore import PolicyVectorStore
 
-HR_KEYWORDS = {
-    "leave", "annual", "vacation", "holiday", "payroll", "salary", "benefit",
-    "probation", "timesheet", "overtime", "sick", "per diem", "expense",
-    "remote", "onsite", "attendance", "policy"
-}
 
+_VOTE_TEMPERATURE = 0.05
 
-IT_KEYWORDS = {
-    "vpn", "password", "account", "email", "laptop", "device", "hardware",
-    "software", "access", "network", "security", "mfa", "2fa", "ticket",
-    "backup", "antivirus", "data"
-}
+ChunkMatrix = Tuple[List[str], np.ndarray, np.ndarray]
+
+
+def _cache_base(store: PolicyVectorStore) -> Path:
+    return store.version_path.with_name(f"{store.collection_name}.classifier")
+
+
+def load_chunk_matrix(store: PolicyVectorStore) -> ChunkMatrix | None:
+    # (domains, row end offset per domain, embeddings sorted by domain). Cached next to the
+    # index per content version and memory-mapped, so workers share the pages.
+    version = store.content_version() or "unversioned"
+    base = _cache_base(store)
+    meta_path = Path(f"{base}.json")
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") == version:
+            matrix = np.load(f"{base}.{version}.npy", mmap_mode="r")
+            return meta["domains"], np.asarray(meta["ends"], dtype=np.int64), matrix
+    except (OSError, ValueError, KeyError):
+        pass
+
+    metas, matrix = store.get_embeddings()
+    if not metas:
+        return None
+    labels = np.array([m.get("domain", "") for m in metas])
+    order = np.argsort(labels, kind="stable")
+    domains, counts = np.unique(labels, return_counts=True)
+    matrix = np.ascontiguousarray(matrix[order])
+    ends = np.cumsum(counts)
+
+    # Workers starting together may all export the same version; per-process temp names keep
+    # them from renaming each other's files, and a failed write only skips the disk cache.
+    tmp = Path(f"{base}.{version}.tmp-{os.getpid()}.npy")
+    tmp_meta = Path(f"{base}.json.tmp-{os.getpid()}")
+    try:
+        np.save(tmp, matrix)
+        tmp.replace(f"{base}.{version}.npy")
+        tmp_meta.write_text(json.dumps({"version": version, "domains": domains.tolist(), "ends": ends.tolist()}), encoding="utf-8")
+        tmp_meta.replace(meta_path)
+    except OSError:
+        for path in (tmp, tmp_meta):
+            path.unlink(missing_ok=True)
+        return domains.tolist(), ends, matrix
+    for old in base.parent.glob(f"{base.name}.*.npy"):
+        if old.name != f"{base.name}.{version}.npy" and ".tmp-" not in old.name:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return domains.tolist(), ends, matrix
 
 
 class DomainClassifier:
-    def __init__(self):
-        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
-        hr_text = Path("data/hr_policy.md").read_text(encoding="utf-8")
-        it_text = Path("data/it_policy.md").read_text(encoding="utf-8")
-        self.hr_emb = self.model.encode(hr_text, convert_to_tensor=True, normalize_embeddings=True)
-        self.it_emb = self.model.encode(it_text, convert_to_tensor=True, normalize_embeddings=True)
-
-    def _keyword_score(self, q: str) -> Tuple[int, int]:
-        ql = q.lower()
-        hr_hits = sum(1 for w in HR_KEYWORDS if w in ql)
-        it_hits = sum(1 for w in IT_KEYWORDS if w in ql)
-        return hr_hits, it_hits
-
-    def classify(self, q: str) -> Tuple[str, float, str]:
-        hr_hits, it_hits = self._keyword_score(q)
-        if hr_hits or it_hits:
-            if hr_hits > it_hits:
-                conf = min(0.9, 0.6 + 0.1 * (hr_hits - it_hits))
-                return "HR", conf, "keywords"
-            elif it_hits > hr_hits:
-                conf = min(0.9, 0.6 + 0.1 * (it_hits - hr_hits))
-                return "IT", conf, "keywords"
-
-        q_emb = self.model.encode(q, convert_to_tensor=True, normalize_embeddings=True)
-        sim_hr = float(util.cos_sim(q_emb, self.hr_emb).item())
-        sim_it = float(util.cos_sim(q_emb, self.it_emb).item())
-        if sim_hr >= sim_it:
-            domain = "HR"
-            diff = sim_hr - sim_it
-        else:
-            domain = "IT"
-            diff = sim_it - sim_hr
-        conf = max(0.5, min(0.95, 0.5 + diff))
-        return domain, conf, "embeddings"
\ No newline at end of file
+    def __init__(self, policies: List[Dict[str, str]] | None = None, store: PolicyVectorStore | None = None):
+        self.embedder = get_embedding_service()
+        self.keywords = KeywordMatcher(load_domain_keywords())
+        self.top_k = settings.CLASSIFIER_TOP_K
+        self.chunk_embs: np.ndarray | None = None
+        self.chunk_ends: np.ndarray | None = None
+        if policies is None and store is not None:
+            loaded = load_chunk_matrix(store)
+            if loaded is not None:
+                self.domains, self.chunk_ends, self.chunk_embs = loaded
+                starts = np.concatenate(([0], self.chunk_ends[:-1]))
+                self.domain_embs = np.vstack([
+                    _normalize(np.mean(self.chunk_embs[a:b], axis=0))
+                    for a, b in zip(starts, self.chunk_ends)
+                ])
+                return
+
+        # Whole-document centroids: explicit file lists, or nothing ingested yet.
+        if policies is None:
+            policies = discover_policies()
+        by_domain: Dict[str, List[str]] = {}
+        for item in policies:
+            by_domain.setdefault(item["domain"], []).append(Path(item["path"]).read_text(encoding="utf-8"))
+        self.domains = sorted(by_domain)
+        centroids = [_normalize(np.mean(self.embedder.encode(by_domain[d]), axis=0)) for d in self.domains]
+        self.domain_embs = np.vstack(centroids) if centroids else np.zeros((0, 0), dtype=np.float32)
+
+    def _keyword_score(self, q: str) -> Dict[str, float]:
+        scores = self.keywords.score(q)
+        return {d: scores.get(d, 0.0) for d in self.domains}
+
+    def classify(self, q: str, q_emb: np.ndarray | None = None) -> Tuple[str, float, str]:
+        if not self.domains:
+            return "", 0.0, "none"
+        if len(self.domains) == 1:
+            return self.domains[0], 0.95, "single-domain"
+
+        hits = sorted(self._keyword_score(q).items(), key=lambda kv: kv[1], reverse=True)
+        if hits and hits[0][1] and hits[0][1] > hits[1][1]:
+            conf = min(0.9, 0.6 + 0.1 * (hits[0][1] - hits[1][1]))
+            return hits[0][0], conf, "keywords"
+
+        if q_emb is None:
+            q_emb = self.embedder.encode_one(q)
+        return self.classify_embedding(q_emb)
+
+    def classify_embedding(self, q_emb: np.ndarray) -> Tuple[str, float, str]:
+        q_emb = np.asarray(q_emb, dtype=np.float32)
+        centroid_sims = self.domain_embs @ q_emb
+        if self.chunk_embs is None or len(self.chunk_embs) == 0:
+            order = np.argsort(-centroid_sims, kind="stable")
+            diff = float(centroid_sims[order[0]] - centroid_sims[order[1]])
+            conf = max(0.5, min(0.95, 0.5 + diff))
+            return self.domains[int(order[0])], conf, "embeddings"
+
+        # Vote of the k nearest chunks, softmax-weighted against the best match so that a few
+        # weak neighbours from a large domain cannot outvote a close one; centroids break ties.
+        sims = self.chunk_embs @ q_emb
+        k = min(self.top_k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        labels = np.searchsorted(self.chunk_ends, top, side="right")
+        weights = np.exp((sims[top] - sims[top].max()) / _VOTE_TEMPERATURE)
+        votes = np.bincount(labels, weights=weights, minlength=len(self.domains))
+        order = np.lexsort((-centroid_sims, -votes))
+        total = float(votes.sum())
+        margin = float(votes[order[0]] - votes[order[1]]) / total if total > 0 else 0.0
+        conf = max(0.5, min(0.95, 0.5 + margin / 2))
+        return self.domains[int(order[0])], conf, "chunks"
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    return (v / (np.linalg.norm(v) or 1.0)).astype(np.float32)
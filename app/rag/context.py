@@ -0,0 +1,61 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from app.rag.chunker import TokenCounter, split_sentences
+from app.rag.lexical import tokenize
+
+
+@dataclass
+class PackedContext:
+    blocks: List[str]
+    prompt_tokens: int
+    sentences_kept: int
+    sentences_dropped: int
+
+
+def _split_block(block: str) -> Tuple[List[str], List[str]]:
+    # (heading lines, sentences); headings are kept with any sentence picked from the block.
+    headings: List[str] = []
+    body: List[str] = []
+    for line in block.strip().split("\n"):
+        (headings if line.lstrip().startswith("#") and not body else body).append(line)
+    return headings, split_sentences("\n".join(body))
+
+
+def pack_context(question: str, blocks: List[str], count_tokens: TokenCounter, max_tokens: int) -> Tuple[List[str], int, int]:
+    # Fills max_tokens with the sentences that share the most terms with the question;
+    # ties go to the better-ranked block, then to the earlier sentence. Picked sentences
+    # keep their original order. Returns (blocks, sentences kept, sentences dropped).
+    terms = set(tokenize(question))
+    split = [_split_block(b) for b in blocks]
+    texts = [s for _, sentences in split for s in sentences] + ["\n".join(h) for h, _ in split]
+    lengths = count_tokens(texts) if texts else []
+    n_sentences = sum(len(sentences) for _, sentences in split)
+    heading_tokens = lengths[n_sentences:]
+
+    candidates = []
+    pos = 0
+    for rank, (_, sentences) in enumerate(split):
+        for i, sentence in enumerate(sentences):
+            overlap = len(terms.intersection(tokenize(sentence)))
+            candidates.append((-overlap, rank, i, lengths[pos]))
+            pos += 1
+    candidates.sort()
+
+    picked = [set() for _ in split]
+    used = 0
+    for _, rank, i, n in candidates:
+        cost = n + (heading_tokens[rank] if not picked[rank] else 0)
+        if used + cost > max_tokens:
+            continue
+        picked[rank].add(i)
+        used += cost
+
+    out: List[str] = []
+    for (headings, sentences), keep in zip(split, picked):
+        if keep:
+            body = " ".join(s for i, s in enumerate(sentences) if i in keep)
+            out.append("\n".join(headings + [body]))
+    kept = sum(len(k) for k in picked)
+    return out, kept, n_sentences - kept
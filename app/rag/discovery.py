@@ -0,0 +1,39 @@
+from __future__ import annotations
+import pathlib
+from typing import Dict, List
+from app.core.config import settings
+
+
+LEGACY_SUFFIX = "_policy.md"
+
+
+def discover_policies(root: str | None = None) -> List[Dict[str, str]]:
+    # data/<DOMAIN>/**/*.md, plus the older flat data/<domain>_policy.md layout.
+    base = pathlib.Path(root or settings.POLICY_DIR)
+    found: List[Dict[str, str]] = []
+    if not base.is_dir():
+        return found
+
+    for domain_dir in sorted(p for p in base.iterdir() if p.is_dir() and not p.name.startswith(".")):
+        domain = domain_dir.name.upper()
+        for path in sorted(domain_dir.rglob("*.md")):
+            rel = path.relative_to(domain_dir)
+            found.append({
+                "domain": domain,
+                "path": path.as_posix(),
+                "source": path.relative_to(base).as_posix(),
+                "slug": rel.with_suffix("").as_posix().replace("/", "-"),
+            })
+
+    for path in sorted(base.glob(f"*{LEGACY_SUFFIX}")):
+        found.append({
+            "domain": path.name[: -len(LEGACY_SUFFIX)].upper(),
+            "path": path.as_posix(),
+            "source": path.name,
+            "slug": path.stem,
+        })
+    return found
+
+
+def discover_domains(root: str | None = None) -> List[str]:
+    return sorted({p["domain"] for p in discover_policies(root)})
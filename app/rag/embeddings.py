@@ -0,0 +1,106 @@
+from __future__ import annotations
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Sequence
+
+import numpy as np
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+    from app.rag.onnx_embeddings import OnnxEncoder
+
+
+class EmbeddingService:
+    def __init__(self, model_name: str | None = None, backend: str | None = None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        self._model: SentenceTransformer | OnnxEncoder | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> SentenceTransformer | OnnxEncoder:
+        # Imported here so the ONNX backends never load torch.
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    if self.backend == "torch":
+                        from sentence_transformers import SentenceTransformer
+                        self._model = SentenceTransformer(self.model_name)
+                    else:
+                        from app.rag.onnx_embeddings import load_onnx_encoder
+                        self._model = load_onnx_encoder(self.model_name, quantized=self.backend == "onnx-int8")
+        return self._model
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if self.backend != "torch":
+            return self.model.encode(texts)
+        vecs = self.model.encode(
+            list(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return np.asarray(vecs, dtype=np.float32)
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+
+_service: EmbeddingService | None = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
+
+
+_counters: Dict[str, Callable[[Sequence[str]], List[int]]] = {}
+
+
+def _tokenizer_file(name: str) -> Path | None:
+    # tokenizer.json from a local model directory, the ONNX export or the hub cache.
+    from app.rag.onnx_embeddings import onnx_dir
+
+    for path in (Path(name) / "tokenizer.json", onnx_dir(name) / "tokenizer.json"):
+        if path.is_file():
+            return path
+    try:
+        from huggingface_hub import hf_hub_download
+        return Path(hf_hub_download(name, "tokenizer.json"))
+    except Exception:
+        return None
+
+
+def get_token_counter(model_name: str | None = None) -> Callable[[Sequence[str]], List[int]]:
+    # Loads only the tokenizer, through the `tokenizers` library: transformers would import
+    # torch, which the ONNX backends and the chunking worker processes otherwise never load.
+    name = model_name or settings.EMBEDDING_MODEL
+    if name not in _counters:
+        path = _tokenizer_file(name)
+        if path is not None:
+            from tokenizers import Tokenizer
+            tok = Tokenizer.from_file(str(path))
+            tok.no_truncation()
+            tok.no_padding()
+
+            def count(texts: Sequence[str]) -> List[int]:
+                if not texts:
+                    return []
+                return [len(e.ids) for e in tok.encode_batch(list(texts), add_special_tokens=False)]
+        else:
+            # Models that only ship a slow (sentencepiece/vocab) tokenizer.
+            from transformers import AutoTokenizer
+            slow = AutoTokenizer.from_pretrained(name)
+
+            def count(texts: Sequence[str]) -> List[int]:
+                if not texts:
+                    return []
+                return [len(ids) for ids in slow(list(texts), add_special_tokens=False)["input_ids"]]
+
+        _counters[name] = count
+    return _counters[name]
@@ -1,43 +1,283 @@
 from __future__ import annotations
+import argparse
+import json
+import os
 import pathlib
 import hashlib
-from typing import List, Dict
-from app.rag.chunker import split_markdown
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.rag.chunker import chunk_markdown
+from app.rag.discovery import discover_policies
+from app.rag.embeddings import get_token_counter
+from app.rag.lexical import load_lexical_index
 from app.rag.vectorstore import PolicyVectorStore
 
 
-POLICIES = [
-    {"domain": "HR", "path": "data/hr_policy.md"},
-    {"domain": "IT", "path": "data/it_policy.md"},
-]
+MANIFEST_NAME = "ingest_manifest.json"
+
+
+@dataclass
+class IngestReport:
+    files_added: int = 0
+    files_updated: int = 0
+    files_deleted: int = 0
+    files_skipped: int = 0
+    chunks_added: int = 0
+    chunks_deleted: int = 0
+    chunks_unchanged: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.chunks_added or self.chunks_deleted or self.files_deleted)
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks_added / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"files: {self.files_added} added, {self.files_updated} updated, "
+            f"{self.files_deleted} deleted, {self.files_skipped} skipped; "
+            f"chunks: {self.chunks_added} added, {self.chunks_deleted} deleted, {self.chunks_unchanged} unchanged; "
+            f"{self.elapsed_seconds:.1f}s, {self.chunks_per_sec:.1f} chunks/sec"
+        )
+
+
+def _manifest_path() -> pathlib.Path:
+    # One manifest per backend: a freshly selected store starts empty and must not be skipped.
+    name = MANIFEST_NAME if settings.VECTOR_BACKEND == "chroma" else f"ingest_manifest.{settings.VECTOR_BACKEND}.json"
+    return pathlib.Path(settings.CHROMA_DIR) / name
+
+
+def load_manifest() -> Dict[str, Any]:
+    try:
+        return json.loads(_manifest_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
 
-def ingest() -> None:   
-    store = PolicyVectorStore()
 
+def save_manifest(manifest: Dict[str, Any]) -> None:
+    path = _manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def chunk_file(domain: str, source: str, slug: str, text: str) -> Tuple[List[str], List[str], List[Dict]]:
     ids: List[str] = []
     docs: List[str] = []
     metas: List[Dict] = []
+    seen = set()
+    chunks = chunk_markdown(
+        text,
+        get_token_counter(),
+        max_tokens=settings.CHUNK_MAX_TOKENS,
+        overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+    )
+    for ch in chunks:
+        to_hash = f"{ch['heading_path']}\n{ch['content']}"
+        h = hashlib.sha256(to_hash.encode("utf-8")).hexdigest()[:12]
+        chunk_id = f"{domain}-{slug}-{h}"
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        ids.append(chunk_id)
+        docs.append(ch["content"])
+        metas.append({
+            "domain": domain,
+            "source": source,
+            "heading": ch.get("heading") or "",
+            "heading_path": ch.get("heading_path") or "",
+        })
+    return ids, docs, metas
+
+
+Prepared = Tuple[str, Optional[Tuple[List[str], List[str], List[Dict]]]]
+
+
+def prepare_file(domain: str, path: str, source: str, slug: str, known_digest: str | None = None) -> Prepared:
+    # Runs in a worker process: hash the file and chunk it only if it changed.
+    raw = pathlib.Path(path).read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if digest == known_digest:
+        return digest, None
+    return digest, chunk_file(domain, source, slug, raw.decode("utf-8"))
+
+
+def _prepare_all(jobs: List[Tuple], workers: int) -> Iterator[Prepared]:
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield prepare_file(*job)
+        return
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(prepare_file, *zip(*jobs), chunksize=chunksize)
+
 
-    for item in POLICIES:
+class _BatchWriter:
+    # Buffers new chunks, embeds them in fixed-size batches with the shared model and
+    # upserts them with their vectors, so memory stays bounded by one upsert batch.
+    def __init__(self, store: PolicyVectorStore, embed_batch: int, upsert_batch: int, on_flush: Callable[[], None]):
+        self.store = store
+        self.embed_batch = max(1, embed_batch)
+        self.upsert_batch = max(1, min(upsert_batch, store.max_batch_size))
+        self.on_flush = on_flush
+        self.ids: List[str] = []
+        self.docs: List[str] = []
+        self.metas: List[Dict] = []
+
+    def add(self, ids: List[str], docs: List[str], metas: List[Dict]) -> None:
+        self.ids.extend(ids)
+        self.docs.extend(docs)
+        self.metas.extend(metas)
+        while len(self.ids) >= self.upsert_batch:
+            self._write(self.upsert_batch)
+
+    def flush(self) -> None:
+        if self.ids:
+            self._write(len(self.ids))
+
+    def _write(self, n: int) -> None:
+        ids, docs, metas = self.ids[:n], self.docs[:n], self.metas[:n]
+        del self.ids[:n], self.docs[:n], self.metas[:n]
+        vectors = np.vstack([
+            self.store.embedder.encode(docs[i:i + self.embed_batch])
+            for i in range(0, n, self.embed_batch)
+        ])
+        self.store.add(ids=ids, texts=docs, metadatas=metas, embeddings=vectors)
+        self.on_flush()
+
+
+def ingest(
+    full: bool = False,
+    changed: Iterable[str] | None = None,
+    workers: int | None = None,
+    embed_batch: int | None = None,
+    upsert_batch: int | None = None,
+    progress: Callable[[IngestReport], None] | None = None,
+) -> IngestReport:
+    started = time.perf_counter()
+    store = PolicyVectorStore()
+    report = IngestReport()
+    # Loaded even with `full`: it is the only record of files removed since the last run.
+    old_manifest = load_manifest()
+    manifest: Dict[str, Any] = {}
+
+    def tick():
+        report.elapsed_seconds = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    writer = _BatchWriter(
+        store,
+        embed_batch or settings.INGEST_EMBED_BATCH_SIZE,
+        upsert_batch or settings.INGEST_UPSERT_BATCH_SIZE,
+        on_flush=tick,
+    )
+
+    # With `changed` (from the file watcher) only those files are re-read; the rest keep
+    # their manifest entries as long as the file still exists.
+    recheck = None if changed is None else {pathlib.Path(p).resolve() for p in changed}
+    discovered = discover_policies()
+    if not discovered:
+        # Refuse to wipe the index because of a wrong POLICY_DIR or an empty mount.
+        raise FileNotFoundError(f"No policy files found under {pathlib.Path(settings.POLICY_DIR).resolve()}")
+    policies = []
+    jobs = []
+    for item in discovered:
+        prev = old_manifest.get(item["path"])
+        # `full` re-chunks and re-embeds every file, unchanged or not.
+        known = prev.get("sha256") if prev and prev.get("domain") == item["domain"] and not full else None
+        if known and recheck is not None and pathlib.Path(item["path"]).resolve() not in recheck:
+            manifest[item["path"]] = prev
+            report.files_skipped += 1
+            report.chunks_unchanged += len(prev.get("chunk_ids", []))
+            continue
+        policies.append(item)
+        jobs.append((item["domain"], item["path"], item["source"], item["slug"], known))
+
+    workers = workers if workers is not None else (settings.INGEST_WORKERS or os.cpu_count() or 1)
+    for item, (digest, chunked) in zip(policies, _prepare_all(jobs, workers)):
         domain = item["domain"]
-        path = pathlib.Path(item["path"]).resolve()
-        if not path.exists():
-            raise FileNotFoundError(f"Policy file not found: {path}")
-        text = path.read_text(encoding="utf-8")
-        chunks = split_markdown(text, max_chars=1000, overlap=150)
-        for ch in chunks:
-            to_hash = f"{ch.get('heading','')}\n{ch['content']}"
-            h = hashlib.sha256(to_hash.encode("utf-8")).hexdigest()[:12]
-            ids.append(f"{domain}-{path.stem}-{h}")
-            docs.append(ch["content"])
-            metas.append({
-                "domain": domain,
-                "source": path.name,
-                "heading": ch.get("heading") or "",
-            })
-
-    store.add(ids=ids, texts=docs, metadatas=metas)
-    print(f"Ingested {len(docs)} chunks into Chroma collection '{store.collection.name}'")
+        key = item["path"]
+        prev = old_manifest.get(key)
+        if chunked is None:
+            manifest[key] = prev
+            report.files_skipped += 1
+            report.chunks_unchanged += len(prev.get("chunk_ids", []))
+            continue
+
+        ids, docs, metas = chunked
+        if prev:
+            old_ids = set(prev.get("chunk_ids", []))
+        else:
+            # No manifest entry: adopt whatever an earlier ingest left for this file.
+            old_ids = store.get_ids(where={"$and": [{"source": item["source"]}, {"domain": domain}]})
+
+        fresh = [i for i, cid in enumerate(ids) if full or cid not in old_ids]
+        if fresh:
+            writer.add([ids[i] for i in fresh], [docs[i] for i in fresh], [metas[i] for i in fresh])
+        stale = old_ids - set(ids)
+        store.delete(stale)
+
+        report.chunks_added += len(fresh)
+        report.chunks_deleted += len(stale)
+        report.chunks_unchanged += len(ids) - len(fresh)
+        if prev:
+            report.files_updated += 1
+        else:
+            report.files_added += 1
+        manifest[key] = {"domain": domain, "sha256": digest, "chunk_ids": ids}
+    writer.flush()
+
+    for key, prev in old_manifest.items():
+        if key in manifest:
+            continue
+        stale = prev.get("chunk_ids", [])
+        store.delete(stale)
+        report.files_deleted += 1
+        report.chunks_deleted += len(stale)
+
+    if report.changed or full:
+        version = uuid.uuid4().hex
+        if settings.HYBRID_SEARCH_ENABLED:
+            # Written before the version is published, so API workers memory-map it on
+            # their next request instead of each rebuilding it from a full scan.
+            load_lexical_index(store, version)
+        store.bump_content_version(version)
+    elif settings.HYBRID_SEARCH_ENABLED:
+        # Collections ingested before hybrid search existed get their index here too.
+        load_lexical_index(store)
+    save_manifest(manifest)
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
+
+
+def _print_progress(report: IngestReport) -> None:
+    print(f"\r  {report.chunks_added} chunks embedded, {report.chunks_per_sec:.1f} chunks/sec", end="", file=sys.stderr, flush=True)
+
 
 if __name__ == "__main__":
-    ingest()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Index policy markdown files into Chroma.")
+    parser.add_argument("--full", action="store_true", help="re-embed every chunk instead of only changed files")
+    parser.add_argument("--workers", type=int, default=None, help="chunking processes (default: INGEST_WORKERS or CPU count)")
+    parser.add_argument("--embed-batch", type=int, default=None, help="texts per embedding call")
+    parser.add_argument("--upsert-batch", type=int, default=None, help="records per Chroma upsert")
+    args = parser.parse_args()
+    report = ingest(
+        full=args.full,
+        workers=args.workers,
+        embed_batch=args.embed_batch,
+        upsert_batch=args.upsert_batch,
+        progress=_print_progress,
+    )
+    print(file=sys.stderr)
+    print(f"Ingest finished: {report.summary()}")
@@ -0,0 +1,59 @@
+from __future__ import annotations
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+from app.core.config import settings
+
+DEFAULT_KEYWORDS_FILE = Path(__file__).with_name("domain_keywords.json")
+
+_VOWELS = set("aeiou")
+# Hyphens separate words, so "per-diem" and "per diem" are the same two-word phrase.
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+
+def load_domain_keywords(path: str | None = None) -> Dict[str, Dict[str, float]]:
+    # {"DOMAIN": {"keyword or phrase": weight, ...}}; a plain list means weight 1 for each.
+    raw = json.loads(Path(path or settings.DOMAIN_KEYWORDS_FILE or DEFAULT_KEYWORDS_FILE).read_text(encoding="utf-8"))
+    out: Dict[str, Dict[str, float]] = {}
+    for domain, words in raw.items():
+        if isinstance(words, list):
+            words = {w: 1.0 for w in words}
+        out[domain.upper()] = {" ".join(w.lower().split()): float(weight) for w, weight in words.items()}
+    return out
+
+
+def _forms(keyword: str) -> Iterable[str]:
+    yield keyword
+    yield keyword + "s"
+    yield keyword + "es"
+    if len(keyword) > 1 and keyword.endswith("y") and keyword[-2] not in _VOWELS:
+        yield keyword[:-1] + "ies"
+
+
+class KeywordMatcher:
+    # Word-level automaton: the question is tokenized once by a compiled regex and every
+    # 1..n-word window is a dict lookup, so cost depends on question length, not on how
+    # many keywords are configured. Matches are whole words by construction.
+    def __init__(self, keywords: Dict[str, Dict[str, float]]):
+        self.by_form: Dict[Tuple[str, ...], List[Tuple[str, str, float]]] = {}
+        for domain, words in keywords.items():
+            for word, weight in words.items():
+                for form in _forms(word):
+                    key = tuple(_WORD.findall(form))
+                    if key:
+                        self.by_form.setdefault(key, []).append((domain, word, weight))
+        self.max_len = max((len(k) for k in self.by_form), default=0)
+
+    def score(self, text: str) -> Dict[str, float]:
+        # Each keyword counts once per question, however often it appears.
+        scores: Dict[str, float] = {}
+        words = _WORD.findall(text.lower())
+        seen = set()
+        for i in range(len(words)):
+            for n in range(1, min(self.max_len, len(words) - i) + 1):
+                for domain, word, weight in self.by_form.get(tuple(words[i:i + n]), ()):
+                    if (domain, word) not in seen:
+                        seen.add((domain, word))
+                        scores[domain] = scores.get(domain, 0.0) + weight
+        return scores
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.rag.vectorstore import PolicyVectorStore
+
+
+# Policy codes and versions ("hr-f017", "o365", "v2.1") stay one token; their parts are indexed too.
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_SPLIT = re.compile(r"[-_./]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its may my of on or our "
+    "should that the their there this to was we what when where which who will with you your".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    out: List[str] = []
+    for tok in _TOKEN.findall(text.lower()):
+        if tok in _STOPWORDS:
+            continue
+        out.append(tok)
+        if not tok.isalnum():
+            out.extend(p for p in _SPLIT.split(tok) if p and p not in _STOPWORDS)
+    return out
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda cid: -scores[cid])
+
+
+class LexicalIndex:
+    # BM25 as a CSR inverted index: postings of term t are rows offsets[t]:offsets[t+1] of
+    # `postings` (doc rows) and `weights` (precomputed BM25 impact), so a query is a few
+    # slice-and-add operations. Docs are sorted by domain; domain d owns rows ends[d-1]:ends[d].
+    def __init__(
+        self,
+        version: str,
+        ids: List[str],
+        domains: List[str],
+        ends: np.ndarray,
+        terms: List[str],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.version = version
+        self.ids = ids
+        self.domains = domains
+        self.ends = ends
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, version: str, ids: List[str], texts: List[str], domains: List[str]) -> LexicalIndex:
+        labels = np.array(domains, dtype=str)
+        order = np.argsort(labels, kind="stable")
+        names, counts = np.unique(labels, return_counts=True)
+        vocab: Dict[str, int] = {}
+        term_ids: List[np.ndarray] = []
+        tfs: List[np.ndarray] = []
+        lengths = np.zeros(len(ids), dtype=np.float32)
+        for row, i in enumerate(order):
+            counted = Counter(tokenize(texts[i]))
+            lengths[row] = sum(counted.values())
+            term_ids.append(np.fromiter((vocab.setdefault(t, len(vocab)) for t in counted), dtype=np.int32, count=len(counted)))
+            tfs.append(np.fromiter(counted.values(), dtype=np.float32, count=len(counted)))
+        rows = np.repeat(np.arange(len(ids), dtype=np.int32), [len(t) for t in term_ids])
+        term_col = np.concatenate(term_ids) if term_ids else np.zeros(0, dtype=np.int32)
+        tf = np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.float32)
+
+        by_term = np.argsort(term_col, kind="stable")
+        term_col, rows, tf = term_col[by_term], rows[by_term], tf[by_term]
+        df = np.bincount(term_col, minlength=len(vocab)).astype(np.float32)
+        offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+        idf = np.log1p((len(ids) - df + 0.5) / (df + 0.5))
+        avgdl = float(lengths.mean()) if len(ids) else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / max(avgdl, 1e-6))
+        weights = (idf[term_col] * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+
+        terms = [""] * len(vocab)
+        for t, i in vocab.items():
+            terms[i] = t
+        return cls(
+            version,
+            [ids[i] for i in order],
+            names.tolist(),
+            np.cumsum(counts).astype(np.int64),
+            terms,
+            offsets,
+            rows,
+            weights,
+        )
+
+    def search(self, query: str, k: int = 20, domain: str | None = None) -> List[Tuple[str, float]]:
+        start, end = 0, len(self.ids)
+        if domain is not None:
+            if domain not in self.domains:
+                return []
+            d = self.domains.index(domain)
+            start, end = (int(self.ends[d - 1]) if d else 0), int(self.ends[d])
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or end <= start:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for t in term_ids:
+            a, b = self.offsets[t], self.offsets[t + 1]
+            scores[self.postings[a:b]] += self.weights[a:b]
+        scores = scores[start:end]
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.ids[start + i], float(scores[i])) for i in hits]
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "offsets.npy", self.offsets)
+        np.save(tmp / "postings.npy", self.postings)
+        np.save(tmp / "weights.npy", self.weights)
+        meta = {"version": self.version, "ids": self.ids, "domains": self.domains, "ends": self.ends.tolist(), "terms": self.terms}
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # Another worker published the same version first.
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: Path) -> LexicalIndex:
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        return cls(
+            meta["version"],
+            meta["ids"],
+            meta["domains"],
+            np.asarray(meta["ends"], dtype=np.int64),
+            meta["terms"],
+            np.load(path / "offsets.npy", mmap_mode="r"),
+            np.load(path / "postings.npy", mmap_mode="r"),
+            np.load(path / "weights.npy", mmap_mode="r"),
+        )
+
+
+def _index_base(store: PolicyVectorStore) -> Path:
+    return store.version_path.with_name(f"{store.collection_name}.lexical")
+
+
+def load_lexical_index(store: PolicyVectorStore, version: str | None = None) -> LexicalIndex | None:
+    # Built at ingest time per content version, next to the Chroma files; a missing one
+    # (collection ingested before hybrid search existed) is built from the stored chunks.
+    # Ingest passes the version it is about to publish.
+    version = version or store.content_version() or "unversioned"
+    base = _index_base(store)
+    path = base.with_name(f"{base.name}.{version}")
+    try:
+        return LexicalIndex.load(path)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    ids, texts, metas = store.get_documents()
+    if not ids:
+        return None
+    index = LexicalIndex.build(version, ids, texts, [m.get("domain", "") for m in metas])
+    index.save(path)
+    for old in base.parent.glob(f"{base.name}.*"):
+        if old.name != path.name and ".tmp-" not in old.name:
+            shutil.rmtree(old, ignore_errors=True)
+    return index
@@ -0,0 +1,265 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+import numpy as np
+from app.core.config import settings
+from app.rag.vectorstore import PolicyVectorStore, RetrievedChunk, _normalize_rows
+
+# Rows scored per matmul; bounds the float32 scratch for float16 files and the score matrix.
+BLOCK_ROWS = 8192
+
+
+class _Snapshot:
+    # One published state of the collection, sorted by domain so a domain filter is a row
+    # range. Vectors and texts are memory-mapped: every worker maps the same files and the
+    # OS page cache holds one copy.
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self.ids: List[str] = []
+        self.metas: List[Dict[str, Any]] = []
+        self.domains: List[str] = []
+        self.ends = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.texts = np.zeros(0, dtype=np.uint8)
+        self._rows: Dict[str, int] | None = None
+        if path is None:
+            return
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.ids = meta["ids"]
+        self.metas = meta["metadatas"]
+        self.domains = meta["domains"]
+        self.ends = np.asarray(meta["ends"], dtype=np.int64)
+        if self.ids:
+            self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+            self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+            if self.offsets[-1]:
+                self.texts = np.memmap(path / "texts.bin", dtype=np.uint8, mode="r")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def text(self, row: int) -> str:
+        return self.texts[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def row_of(self, cid: str) -> int | None:
+        if self._rows is None:
+            self._rows = {cid: i for i, cid in enumerate(self.ids)}
+        return self._rows.get(cid)
+
+    def rows(self, domain: str | None) -> Tuple[int, int]:
+        if not domain:
+            return 0, len(self.ids)
+        try:
+            i = self.domains.index(domain)
+        except ValueError:
+            return 0, 0
+        return (int(self.ends[i - 1]) if i else 0), int(self.ends[i])
+
+
+def _matches(meta: Dict[str, Any], where: Dict[str, Any] | None) -> bool:
+    # The subset of Chroma's filter syntax ingestion uses: equality and $and.
+    if not where:
+        return True
+    for key, value in where.items():
+        if key == "$and":
+            if not all(_matches(meta, clause) for clause in value):
+                return False
+        elif isinstance(value, dict):
+            if "$eq" not in value or meta.get(key) != value["$eq"]:
+                return False
+        elif meta.get(key) != value:
+            return False
+    return True
+
+
+def top_k(queries: np.ndarray, vectors: np.ndarray, k: int, lo: int, hi: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Exact inner-product top-k over rows [lo, hi) for a batch of queries: one matmul per
+    # block, argpartition keeps each block's best k, a final sort orders the survivors.
+    n = len(queries)
+    k = min(k, hi - lo)
+    if n == 0 or k <= 0:
+        return np.zeros((n, 0), dtype=np.float32), np.zeros((n, 0), dtype=np.int64)
+    cand_scores: List[np.ndarray] = []
+    cand_rows: List[np.ndarray] = []
+    for start in range(lo, hi, BLOCK_ROWS):
+        stop = min(hi, start + BLOCK_ROWS)
+        scores = queries @ np.asarray(vectors[start:stop], dtype=np.float32).T
+        if scores.shape[1] > k:
+            idx = np.argpartition(scores, -k, axis=1)[:, -k:]
+            scores = np.take_along_axis(scores, idx, axis=1)
+        else:
+            idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        cand_scores.append(scores)
+        cand_rows.append(idx + start)
+    scores = np.concatenate(cand_scores, axis=1)
+    rows = np.concatenate(cand_rows, axis=1)
+    if scores.shape[1] > k:
+        idx = np.argpartition(scores, -k, axis=1)[:, -k:]
+        scores = np.take_along_axis(scores, idx, axis=1)
+        rows = np.take_along_axis(rows, idx, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+class NumpyVectorStore(PolicyVectorStore):
+    # Exact cosine search over a normalized, memory-mapped matrix; no chromadb import and
+    # no per-process index to build. Writes are staged in memory and published as a new
+    # snapshot by bump_content_version(), which ingestion calls once per run.
+    def __init__(self, collection_name: str = "policies"):
+        super().__init__(collection_name)
+        self.dtype = np.dtype(settings.VECTOR_DTYPE)
+        self.base = self.version_path.with_name(f"{collection_name}.numpy")
+        self.pointer = Path(f"{self.base}.json")
+        self._snapshot = self._load()
+        self._staged: Dict[str, Tuple[str, Dict[str, Any], np.ndarray]] | None = None
+        self._write_lock = threading.Lock()
+
+    def _pointed_name(self) -> str | None:
+        try:
+            return json.loads(self.pointer.read_text(encoding="utf-8"))["snapshot"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _load(self) -> _Snapshot:
+        # A snapshot can be removed between reading the pointer and opening it when ingests
+        # publish in quick succession; the pointer then names a newer one, so read it again.
+        for _ in range(3):
+            name = self._pointed_name()
+            if name is None:
+                break
+            try:
+                return _Snapshot(self.base.with_name(name))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError):
+                break
+        return _Snapshot()
+
+    @property
+    def max_batch_size(self) -> int:
+        # Upserts only touch the in-memory staging area.
+        return 1 << 20
+
+    def count(self) -> int:
+        return len(self._staged) if self._staged is not None else len(self._snapshot)
+
+    def _staging(self) -> Dict[str, Tuple[str, Dict[str, Any], np.ndarray]]:
+        if self._staged is None:
+            snap = self._snapshot
+            self._staged = {
+                cid: (snap.text(i), snap.metas[i], np.asarray(snap.vectors[i], dtype=np.float32))
+                for i, cid in enumerate(snap.ids)
+            }
+        return self._staged
+
+    def add(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: np.ndarray | None = None,
+    ):
+        if embeddings is None:
+            embeddings = self.embedder.encode(texts)
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        with self._write_lock:
+            staged = self._staging()
+            for cid, text, meta, vec in zip(ids, texts, metadatas, vectors):
+                staged[cid] = (text, dict(meta), vec)
+
+    def delete(self, ids: Iterable[str]):
+        with self._write_lock:
+            staged = self._staging()
+            for cid in ids:
+                staged.pop(cid, None)
+
+    def get_ids(self, where: Dict[str, Any] | None = None) -> Set[str]:
+        with self._write_lock:
+            if self._staged is not None:
+                return {cid for cid, (_, meta, _) in self._staged.items() if _matches(meta, where)}
+        snap = self._snapshot
+        return {cid for cid, meta in zip(snap.ids, snap.metas) if _matches(meta, where)}
+
+    def _commit(self) -> None:
+        with self._write_lock:
+            if self._staged is None:
+                return
+            items = sorted(self._staged.items(), key=lambda kv: (kv[1][1].get("domain", ""), kv[0]))
+            name = f"{self.base.name}.{uuid.uuid4().hex}"
+            path = self.base.with_name(name)
+            self._write(path, items)
+            previous = self._pointed_name()
+            tmp = self.pointer.with_name(f"{self.pointer.name}.tmp-{os.getpid()}")
+            tmp.write_text(json.dumps({"snapshot": name}), encoding="utf-8")
+            tmp.replace(self.pointer)
+            # The previous snapshot stays: another worker may have read the old pointer and
+            # not opened it yet. Readers still mapping an older one keep their pages.
+            keep = {name, previous}
+            for old in self.base.parent.glob(f"{self.base.name}.*"):
+                if old.is_dir() and old.name not in keep and ".tmp-" not in old.name:
+                    shutil.rmtree(old, ignore_errors=True)
+            self._snapshot = _Snapshot(path)
+            self._staged = None
+
+    def _write(self, path: Path, items: List[Tuple[str, Tuple[str, Dict[str, Any], np.ndarray]]]) -> None:
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        labels = [meta.get("domain", "") for _, (_, meta, _) in items]
+        domains, counts = np.unique(np.array(labels, dtype=str), return_counts=True) if items else ([], [])
+        if items:
+            np.save(tmp / "vectors.npy", np.vstack([vec for _, (_, _, vec) in items]).astype(self.dtype))
+            blobs = [text.encode("utf-8") for _, (text, _, _) in items]
+            np.save(tmp / "offsets.npy", np.concatenate(([0], np.cumsum([len(b) for b in blobs]))).astype(np.int64))
+            (tmp / "texts.bin").write_bytes(b"".join(blobs))
+        meta = {
+            "ids": [cid for cid, _ in items],
+            "metadatas": [meta for _, (_, meta, _) in items],
+            "domains": list(np.asarray(domains).tolist()),
+            "ends": np.cumsum(counts).tolist() if items else [],
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _read(self) -> _Snapshot:
+        # Staged writes become visible to this process on first read, without a version bump.
+        if self._staged is not None:
+            self._commit()
+        return self._snapshot
+
+    def get_embeddings(self) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        snap = self._read()
+        return list(snap.metas), np.asarray(snap.vectors, dtype=np.float32)
+
+    def get_documents(self) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        snap = self._read()
+        return list(snap.ids), [snap.text(i) for i in range(len(snap))], list(snap.metas)
+
+    def get_by_ids(self, ids: Sequence[str]) -> Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray]:
+        snap = self._read()
+        rows = [r for r in (snap.row_of(cid) for cid in ids) if r is not None]
+        vectors = np.asarray(snap.vectors[rows], dtype=np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+        return [snap.ids[r] for r in rows], [snap.text(r) for r in rows], [snap.metas[r] for r in rows], vectors
+
+    def search_many_by_vectors(
+        self, embeddings: Sequence[Sequence[float]], k: int = 5, domain: str | None = None
+    ) -> List[List[RetrievedChunk]]:
+        if len(embeddings) == 0:
+            return []
+        snap = self._read()
+        queries = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        lo, hi = snap.rows(domain)
+        scores, rows = top_k(queries, snap.vectors, k, lo, hi)
+        return [
+            [
+                RetrievedChunk(content=snap.text(r), metadata=snap.metas[r], score=float(s), id=snap.ids[r])
+                for s, r in zip(row_scores, row_ids)
+            ]
+            for row_scores, row_ids in zip(scores.tolist(), rows.tolist())
+        ]
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import pathlib
+import shutil
+from typing import List, Sequence
+
+import numpy as np
+from app.core.config import settings
+
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+META_FILE = "embedding.json"
+
+
+def onnx_dir(model_name: str | None = None) -> pathlib.Path:
+    name = model_name or settings.EMBEDDING_MODEL
+    return pathlib.Path(settings.EMBEDDING_ONNX_DIR) / name.strip("/").replace("/", "--")
+
+
+def default_threads() -> int:
+    # Query-time batches are small; beyond a few threads the sync overhead outweighs the
+    # extra cores and starves the other workers on the box.
+    return settings.EMBEDDING_THREADS or max(1, min(4, os.cpu_count() or 1))
+
+
+def export_onnx(model_name: str | None = None, quantize: bool = True) -> pathlib.Path:
+    # The only step that needs torch: trace the full SentenceTransformer (transformer, pooling,
+    # optional dense/normalize layers) so the ONNX graph returns the sentence embedding directly.
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    name = model_name or settings.EMBEDDING_MODEL
+    final = onnx_dir(name)
+    # Several workers may export on the same first start: each writes a private directory
+    # and moves the files into place, the metadata file last.
+    out = final.parent / f".{final.name}.{os.getpid()}"
+    out.mkdir(parents=True, exist_ok=True)
+    st = SentenceTransformer(name, device="cpu")
+    st.eval()
+    tokenizer = st.tokenizer
+    sample = tokenizer(["warm up", "a longer sample sentence"], padding=True, return_tensors="pt")
+    inputs = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+
+    class SentenceEmbedding(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.st = st
+
+        def forward(self, *tensors):
+            return self.st(dict(zip(inputs, tensors)))["sentence_embedding"]
+
+    with torch.inference_mode():
+        torch.onnx.export(
+            SentenceEmbedding(),
+            tuple(sample[k] for k in inputs),
+            str(out / FP32_FILE),
+            input_names=inputs,
+            output_names=["sentence_embedding"],
+            dynamic_axes={**{k: {0: "batch", 1: "sequence"} for k in inputs}, "sentence_embedding": {0: "batch"}},
+            opset_version=17,
+            dynamo=False,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # Weights to int8, activations quantized on the fly; no calibration set needed.
+        quantize_dynamic(str(out / FP32_FILE), str(out / INT8_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(str(out))
+    meta = {
+        "model": name,
+        "inputs": inputs,
+        "max_seq_length": st.max_seq_length,
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+    }
+    (out / META_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    final.mkdir(parents=True, exist_ok=True)
+    for path in sorted(out.iterdir(), key=lambda p: p.name == META_FILE):
+        os.replace(path, final / path.name)
+    shutil.rmtree(out, ignore_errors=True)
+    return final
+
+
+class OnnxEncoder:
+    # ONNX Runtime + the `tokenizers` library: no torch import on the serving path.
+    def __init__(self, model_dir: pathlib.Path, quantized: bool = False, threads: int | None = None, batch_size: int = 32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        meta = json.loads((model_dir / META_FILE).read_text(encoding="utf-8"))
+        self.inputs: List[str] = meta["inputs"]
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(meta["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=meta["pad_id"] or 0, pad_token=meta["pad_token"] or "[PAD]")
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads or default_threads()
+        opts.inter_op_num_threads = 1
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        path = model_dir / (INT8_FILE if quantized else FP32_FILE)
+        self.session = ort.InferenceSession(str(path), sess_options=opts, providers=["CPUExecutionProvider"])
+
+    def _run(self, texts: Sequence[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch(list(texts))
+        feeds = {
+            "input_ids": np.array([e.ids for e in enc], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in enc], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in enc], dtype=np.int64),
+        }
+        return self.session.run(None, {k: feeds[k] for k in self.inputs})[0]
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Length-sorted batches keep padding short; results go back in input order.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out: np.ndarray | None = None
+        for i in range(0, len(order), self.batch_size):
+            idx = order[i:i + self.batch_size]
+            vecs = self._run([texts[j] for j in idx])
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+def load_onnx_encoder(model_name: str | None = None, quantized: bool = False, threads: int | None = None) -> OnnxEncoder:
+    path = onnx_dir(model_name)
+    if not (path / META_FILE).exists() or not (path / (INT8_FILE if quantized else FP32_FILE)).exists():
+        # First start without a pre-exported model; `python -m app.rag.onnx_embeddings` avoids this.
+        export_onnx(model_name, quantize=quantized)
+    return OnnxEncoder(path, quantized=quantized, threads=threads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export EMBEDDING_MODEL to ONNX (and int8) for EMBEDDING_BACKEND=onnx|onnx-int8.")
+    parser.add_argument("--model", default="", help="defaults to EMBEDDING_MODEL")
+    parser.add_argument("--no-quantize", action="store_true", help="skip the int8 model")
+    args = parser.parse_args()
+    print(f"Exported to {export_onnx(args.model or None, quantize=not args.no_quantize)}")
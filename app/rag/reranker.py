@@ -0,0 +1,144 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence, Tuple, TYPE_CHECKING
+
+from app.core.config import settings
+from app.rag.answer_cache import AnswerCache
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+    from app.rag.vectorstore import RetrievedChunk
+
+
+class CrossEncoderReranker:
+    # Scores (question, chunk) pairs with a small cross-encoder. Scores are cached per
+    # normalized question and chunk id (ids hash the chunk content), so repeated candidates
+    # are never scored twice.
+    def __init__(self, model_name: str | None = None, max_length: int | None = None, cache_entries: int | None = None):
+        self.model_name = model_name or settings.RERANK_MODEL
+        self.max_length = max_length or settings.RERANK_MAX_LENGTH
+        self.cache_entries = cache_entries if cache_entries is not None else settings.RERANK_CACHE_ENTRIES
+        self._model: CrossEncoder | None = None
+        self._load_lock = threading.Lock()
+        self._predict_lock = threading.Lock()
+        # Request-time scoring runs on its own single thread and at most one pass is in
+        # flight: a pass that outlives its budget keeps running, and later requests skip
+        # reranking instead of piling up behind it in the shared default executor.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._busy = threading.Lock()
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.pairs_scored = 0
+        self.cache_hits = 0
+        self.fallbacks = 0
+        self.skipped_busy = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    @property
+    def model(self) -> CrossEncoder:
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    @staticmethod
+    def _keys(question: str, chunks: Sequence[RetrievedChunk]) -> List[Tuple[str, str]]:
+        q_key = AnswerCache.normalize(question)
+        return [(q_key, c.id or hashlib.sha1(c.content.encode("utf-8")).hexdigest()) for c in chunks]
+
+    def _cached(self, keys: Sequence[Tuple[str, str]]) -> List[float | None]:
+        with self._lock:
+            out = []
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                out.append(score)
+            return out
+
+    def score(self, question: str, chunks: Sequence[RetrievedChunk]) -> List[float]:
+        keys = self._keys(question, chunks)
+        scores = self._cached(keys)
+        missing = [i for i, s in enumerate(scores) if s is None]
+        with self._lock:
+            self.cache_hits += len(chunks) - len(missing)
+        if missing:
+            pairs = [(question, chunks[i].content) for i in missing]
+            # One forward pass over every uncached pair.
+            with self._predict_lock:
+                raw = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            with self._lock:
+                self.pairs_scored += len(pairs)
+                for i, s in zip(missing, raw):
+                    scores[i] = float(s)
+                    self._scores[keys[i]] = float(s)
+                while len(self._scores) > self.cache_entries:
+                    self._scores.popitem(last=False)
+        return scores  # type: ignore[return-value]
+
+    def _score_and_release(self, question: str, chunks: Sequence[RetrievedChunk]) -> List[float]:
+        try:
+            return self.score(question, chunks)
+        finally:
+            self._busy.release()
+
+    async def rerank(self, question: str, chunks: List[RetrievedChunk], budget_ms: float) -> List[RetrievedChunk]:
+        # Best first by cross-encoder score. Over budget (including the first model load),
+        # while another pass is still running, or on error the input order is kept; a late
+        # forward pass still fills the cache.
+        started = time.perf_counter()
+        try:
+            if None not in self._cached(self._keys(question, chunks)):
+                scores = self.score(question, chunks)
+            elif not self._busy.acquire(blocking=False):
+                self._record(started, fallback=True, busy=True)
+                return list(chunks)
+            else:
+                future = asyncio.get_running_loop().run_in_executor(self._executor, self._score_and_release, question, chunks)
+                # Shielded so a timeout never cancels a pass that has not started yet, which
+                # would leave _busy held.
+                scores = await asyncio.wait_for(asyncio.shield(future), budget_ms / 1000)
+        except asyncio.TimeoutError:
+            self._record(started, fallback=True)
+            return list(chunks)
+        except Exception:
+            self._record(started, fallback=True, error=True)
+            return list(chunks)
+        self._record(started)
+        order = sorted(range(len(chunks)), key=lambda i: -scores[i])
+        return [chunks[i] for i in order]
+
+    def _record(self, started: float, fallback: bool = False, error: bool = False, busy: bool = False) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.calls += 1
+            self.fallbacks += fallback
+            self.skipped_busy += busy
+            self.errors += error
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "calls": self.calls,
+                "pairs_scored": self.pairs_scored,
+                "cache_hits": self.cache_hits,
+                "cache_entries": len(self._scores),
+                "fallbacks": self.fallbacks,
+                "skipped_busy": self.skipped_busy,
+                "errors": self.errors,
+                "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+                "max_ms": round(self.max_ms, 3),
+            }
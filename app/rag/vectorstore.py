@@ -1,41 +1,333 @@
 from __future__ import annotations
+import abc
+import threading
+import uuid
 from dataclasses import dataclass
-from typing import List, Dict, Any
-import chromadb
-from chromadb.utils import embedding_functions
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Sequence, Set, Tuple
+import numpy as np
 from app.core.config import settings
+from app.rag.embeddings import EmbeddingService, get_embedding_service
+from app.rag.lexical import LexicalIndex, load_lexical_index, reciprocal_rank_fusion
 
 
 @dataclass
 class RetrievedChunk:
     content: str
     metadata: Dict[str, Any]
-    score: float  
+    score: float
+    id: str = ""
 
 
-class PolicyVectorStore:
+def _shared_embedding_function(service: EmbeddingService):
+    from chromadb.utils import embedding_functions
+
+    class SharedEmbeddingFunction(embedding_functions.SentenceTransformerEmbeddingFunction):
+        # Keeps Chroma's "sentence_transformer" config but encodes through the shared service,
+        # so the model weights are loaded once per process.
+        def __init__(self):
+            self.model_name = service.model_name
+            self.device = "cpu"
+            self.normalize_embeddings = True
+            self.kwargs = {}
+            self._service = service
+
+        def __call__(self, input):
+            return list(self._service.encode(list(input)))
+
+    return SharedEmbeddingFunction()
+
+
+class PolicyVectorStore(abc.ABC):
+    # Version file, lexical index and hybrid fusion are shared; storage and vector search
+    # come from the backend subclass picked by VECTOR_BACKEND. PolicyVectorStore() returns
+    # that subclass, so callers never name a backend.
+    def __new__(cls, *args, **kwargs):
+        if cls is PolicyVectorStore:
+            if settings.VECTOR_BACKEND == "numpy":
+                from app.rag.numpy_store import NumpyVectorStore
+                cls = NumpyVectorStore
+            else:
+                cls = ChromaVectorStore
+        return super().__new__(cls)
+
+    def __init__(self, collection_name: str = "policies"):
+        self.collection_name = collection_name
+        self.version_path = Path(settings.CHROMA_DIR) / f"{collection_name}.version"
+        # Read before the backend opens, so an ingest that lands in between shows up as a
+        # newer version rather than being attributed to this handle.
+        self.opened_version = self.content_version()
+        self.embedder = get_embedding_service()
+        self._lexical: LexicalIndex | None = None
+        self._lexical_lock = threading.Lock()
+
+    def reopen(self) -> PolicyVectorStore:
+        # A fresh handle that sees writes made by other processes; the old one keeps working
+        # for requests that are still using it.
+        return type(self)(self.collection_name)
+
+    @property
+    @abc.abstractmethod
+    def max_batch_size(self) -> int:
+        ...
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abc.abstractmethod
+    def add(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: np.ndarray | None = None,
+    ):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, ids: Iterable[str]):
+        ...
+
+    @abc.abstractmethod
+    def get_ids(self, where: Dict[str, Any] | None = None) -> Set[str]:
+        ...
+
+    @abc.abstractmethod
+    def get_embeddings(self) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        ...
+
+    @abc.abstractmethod
+    def get_documents(self) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        ...
+
+    @abc.abstractmethod
+    def get_by_ids(self, ids: Sequence[str]) -> Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray]:
+        # (ids, documents, metadatas, embeddings) for the ids that exist.
+        ...
+
+    @abc.abstractmethod
+    def search_many_by_vectors(
+        self, embeddings: Sequence[Sequence[float]], k: int = 5, domain: str | None = None
+    ) -> List[List[RetrievedChunk]]:
+        ...
+
+    def _commit(self) -> None:
+        # Makes staged writes visible to other processes; called before the version bump.
+        pass
+
+    def lexical_index(self) -> LexicalIndex | None:
+        version = self.content_version() or "unversioned"
+        with self._lexical_lock:
+            if self._lexical is None or self._lexical.version != version:
+                self._lexical = load_lexical_index(self)
+        return self._lexical
+
+    def content_version(self) -> str:
+        # Changes whenever ingestion rewrites the collection, also from another process.
+        try:
+            return self.version_path.read_text(encoding="utf-8").strip()
+        except OSError:
+            return ""
+
+    def bump_content_version(self, version: str | None = None) -> str:
+        self._commit()
+        version = version or uuid.uuid4().hex
+        self.version_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.version_path.with_suffix(".tmp")
+        tmp.write_text(version, encoding="utf-8")
+        tmp.replace(self.version_path)
+        return version
+
+    def search(self, query: str, k: int = 5, domain: str | None = None) -> List[RetrievedChunk]:
+        return self.search_by_vector(self.embedder.encode_one(query), k, domain=domain)
+
+    def search_by_vector(
+        self, embedding: Sequence[float], k: int = 5, domain: str | None = None
+    ) -> List[RetrievedChunk]:
+        return self.search_many_by_vectors([embedding], k, domain=domain)[0]
+
+    def search_many(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 5,
+        domain: str | None = None,
+        queries: Sequence[str | None] | None = None,
+    ) -> List[List[RetrievedChunk]]:
+        if queries is not None and settings.HYBRID_SEARCH_ENABLED:
+            return self.hybrid_search_many(embeddings, queries, k, domain=domain)
+        return self.search_many_by_vectors(embeddings, k, domain=domain)
+
+    def hybrid_search_many(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        queries: Sequence[str | None],
+        k: int = 5,
+        domain: str | None = None,
+    ) -> List[List[RetrievedChunk]]:
+        # Vector and BM25 candidates fused by reciprocal rank. Scores stay cosine similarities,
+        # so the relevance thresholds downstream mean the same with or without hybrid search.
+        pool = max(k, settings.HYBRID_CANDIDATES)
+        dense = self.search_many_by_vectors(embeddings, pool, domain=domain)
+        index = self.lexical_index()
+        if index is None:
+            return [hits[:k] for hits in dense]
+
+        fused: List[List[str]] = []
+        for hits, query in zip(dense, queries):
+            lexical = index.search(query, pool, domain=domain) if query else []
+            ranked = reciprocal_rank_fusion([[c.id for c in hits], [cid for cid, _ in lexical]], settings.HYBRID_RRF_K)
+            fused.append(ranked[:k])
+
+        # Lexical-only hits: fetch text and vectors once for the whole batch and score them
+        # against their query the way the vector search would have.
+        missing = sorted({cid for ranked, hits in zip(fused, dense) for cid in set(ranked) - {c.id for c in hits}})
+        extra: Dict[str, Tuple[str, Dict[str, Any], np.ndarray]] = {}
+        if missing:
+            ids, docs, metas, vectors = self.get_by_ids(missing)
+            vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+            extra = {cid: (doc, meta, vec) for cid, doc, meta, vec in zip(ids, docs, metas, vectors)}
+
+        matrix = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(dense), -1))
+        out: List[List[RetrievedChunk]] = []
+        for q_emb, ranked, hits in zip(matrix, fused, dense):
+            by_id = {c.id: c for c in hits}
+            chunks: List[RetrievedChunk] = []
+            for cid in ranked:
+                if cid in by_id:
+                    chunks.append(by_id[cid])
+                elif cid in extra:
+                    doc, meta, vec = extra[cid]
+                    chunks.append(RetrievedChunk(content=doc, metadata=meta, score=float(q_emb @ vec), id=cid))
+            out.append(chunks)
+        return out
+
+
+class ChromaVectorStore(PolicyVectorStore):
     def __init__(self, collection_name: str = "policies"):
+        import chromadb
+
+        super().__init__(collection_name)
         self.client = chromadb.PersistentClient(path=settings.CHROMA_DIR)
-        self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=settings.EMBEDDING_MODEL
-        )
+        self.embedding_fn = _shared_embedding_function(self.embedder)
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
             embedding_function=self.embedding_fn,
             metadata={"hnsw:space": "cosine"},
         )
+        # System of the handle this one replaced; stopped on the next reopen.
+        self._retired = None
+
+    def reopen(self) -> PolicyVectorStore:
+        # Chroma keeps one in-memory index per path and process, so writes made by another
+        # process only become visible through a fresh system. Clearing the cache does not
+        # stop the old system, so its sqlite connection and segment readers are closed one
+        # reload later, when requests still searching through that handle have finished.
+        if self._retired is not None:
+            self._retired.stop()
+        # Captured before clearing: the client looks its system up in that cache.
+        system = self.client._system
+        self.client.clear_system_cache()
+        store = super().reopen()
+        store._retired = system
+        return store
+
+    @property
+    def max_batch_size(self) -> int:
+        # Largest number of records Chroma accepts in a single upsert/delete.
+        return self.client.get_max_batch_size()
 
-    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
-        self.collection.upsert(ids=ids, documents=texts, metadatas=metadatas)
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: np.ndarray | None = None,
+    ):
+        if embeddings is None:
+            self.collection.upsert(ids=ids, documents=texts, metadatas=metadatas)
+            return
+        # Precomputed vectors skip Chroma's embedding function entirely.
+        self.collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=list(embeddings))
+
+    def delete(self, ids: Iterable[str]):
+        ids = list(ids)
+        step = self.max_batch_size
+        for i in range(0, len(ids), step):
+            self.collection.delete(ids=ids[i:i + step])
+
+    def get_ids(self, where: Dict[str, Any] | None = None) -> Set[str]:
+        res = self.collection.get(where=where, include=[])
+        return set(res.get("ids") or [])
+
+    def get_embeddings(self) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        # Every stored vector with its metadata, paged to stay under Chroma's batch limit.
+        metas: List[Dict[str, Any]] = []
+        vectors: List[np.ndarray] = []
+        step = self.max_batch_size
+        offset = 0
+        while True:
+            res = self.collection.get(include=["embeddings", "metadatas"], limit=step, offset=offset)
+            ids = res.get("ids") or []
+            if not ids:
+                break
+            metas.extend(res["metadatas"])
+            vectors.append(np.asarray(res["embeddings"], dtype=np.float32))
+            offset += len(ids)
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return metas, matrix
+
+    def get_documents(self) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        ids: List[str] = []
+        docs: List[str] = []
+        metas: List[Dict[str, Any]] = []
+        step = self.max_batch_size
+        while True:
+            res = self.collection.get(include=["documents", "metadatas"], limit=step, offset=len(ids))
+            if not res.get("ids"):
+                break
+            ids.extend(res["ids"])
+            docs.extend(res["documents"])
+            metas.extend(res["metadatas"])
+        return ids, docs, metas
+
+    def get_by_ids(self, ids: Sequence[str]) -> Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray]:
+        res = self.collection.get(ids=list(ids), include=["documents", "metadatas", "embeddings"])
+        return res["ids"], res["documents"], res["metadatas"], np.asarray(res["embeddings"], dtype=np.float32)
 
     def search(self, query: str, k: int = 5, domain: str | None = None) -> List[RetrievedChunk]:
         where = {"domain": domain} if domain else None
         res = self.collection.query(query_texts=[query], n_results=k, where=where)
-        docs = res.get("documents", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        dists = res.get("distances", [[]])[0]
-        out: List[RetrievedChunk] = []
-        for doc, meta, dist in zip(docs, metas, dists):
-            score = 1.0 - float(dist)
-            out.append(RetrievedChunk(content=doc, metadata=meta, score=score))
-        return out
\ No newline at end of file
+        return self._to_chunks(res)[0]
+
+    def search_many_by_vectors(
+        self, embeddings: Sequence[Sequence[float]], k: int = 5, domain: str | None = None
+    ) -> List[List[RetrievedChunk]]:
+        if len(embeddings) == 0:
+            return []
+        where = {"domain": domain} if domain else None
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        res = self.collection.query(query_embeddings=list(matrix), n_results=k, where=where)
+        return self._to_chunks(res, n_queries=len(matrix))
+
+    @staticmethod
+    def _to_chunks(res: Dict[str, Any], n_queries: int = 1) -> List[List[RetrievedChunk]]:
+        all_docs = res.get("documents") or [[]] * n_queries
+        all_metas = res.get("metadatas") or [[]] * n_queries
+        all_dists = res.get("distances") or [[]] * n_queries
+        all_ids = res.get("ids") or [[""] * len(docs) for docs in all_docs]
+        out: List[List[RetrievedChunk]] = []
+        for ids, docs, metas, dists in zip(all_ids, all_docs, all_metas, all_dists):
+            chunks: List[RetrievedChunk] = []
+            for cid, doc, meta, dist in zip(ids, docs, metas, dists):
+                score = 1.0 - float(dist)
+                chunks.append(RetrievedChunk(content=doc, metadata=meta, score=score, id=cid))
+            out.append(chunks)
+        return out
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
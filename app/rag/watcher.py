@@ -0,0 +1,49 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import logging
+from typing import Callable
+from app.core.config import settings
+from app.rag.ingest import IngestReport, ingest
+
+logger = logging.getLogger("app.watcher")
+
+
+def _is_policy(change, path: str) -> bool:
+    return path.endswith(".md")
+
+
+async def watch_policies(
+    stop_event: asyncio.Event | None = None,
+    on_ingest: Callable[[IngestReport], None] | None = None,
+) -> None:
+    from watchfiles import awatch
+
+    async for changes in awatch(
+        settings.POLICY_DIR,
+        watch_filter=_is_policy,
+        debounce=settings.POLICY_WATCH_DEBOUNCE_MS,
+        stop_event=stop_event,
+    ):
+        changed = sorted({path for _, path in changes})
+        try:
+            # Chunk in-thread: forking a process that already holds the model is not safe.
+            report = await asyncio.to_thread(ingest, changed=changed, workers=1)
+        except Exception:
+            logger.exception({"status": "reindex failed", "files": changed})
+            continue
+        logger.info({"status": "reindexed", "files": changed, "summary": report.summary()})
+        if on_ingest:
+            on_ingest(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the Chroma index in sync with POLICY_DIR.")
+    parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(f"Initial ingest: {ingest().summary()}")
+    print(f"Watching {settings.POLICY_DIR} for policy changes...")
+    try:
+        asyncio.run(watch_policies(on_ingest=lambda r: print(f"Re-indexed: {r.summary()}")))
+    except KeyboardInterrupt:
+        pass
@@ -21,9 +21,12 @@ class ChatResponse(BaseModel):
     retrieval_scores: List[float] = Field(default_factory=list)
     needs_clarification: bool = False
     clarification: Optional[str] = None
+    route: Optional[str] = None
     latency_ms: int
+    cached: bool = False
     input_token_count: Optional[int] = None
     input_char_count: Optional[int] = None
     output_token_count: Optional[int] = None
     output_char_count: Optional[int] = None
+    prompt_token_count: Optional[int] = None
 
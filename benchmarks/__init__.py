@@ -0,0 +1 @@
+"""Benchmark scripts. Run from the project root, e.g. `python -m benchmarks.bench_batching`."""
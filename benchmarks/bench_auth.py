@@ -0,0 +1,102 @@
+"""Auth dependency under concurrent load: DB lookup per request in the threadpool (previous) vs. token claims + user cache.
+
+    python -m benchmarks.bench_auth --requests 5000 --concurrency 64
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.config import settings
+from benchmarks.corpus import percentiles
+
+
+def legacy_get_current_user(credentials: HTTPAuthorizationCredentials):
+    # The original dependency: fresh session, JWT decode and db.get on every call.
+    from app.core.security import decode_token
+    from app.db.session import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        payload = decode_token(credentials.credentials)
+        user = db.get(User, int(payload["sub"]))
+        if not user or not user.is_active:
+            raise RuntimeError("unauthorized")
+        return user
+    finally:
+        db.close()
+
+
+async def drive(call: Callable[[], Awaitable[object]], requests: int, concurrency: int) -> Dict[str, object]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one():
+        async with sem:
+            t = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {"requests_per_sec": round(requests / elapsed, 1), "latency_ms": percentiles(latencies)}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    from app.api.v1.auth import get_current_user
+    from app.core.security import create_access_token
+    from app.core.user_cache import user_cache
+    from app.db.session import SessionLocal
+    from app.init_db import init
+    from app.models.user import User
+
+    init()
+    db = SessionLocal()
+    user = User(email="bench@example.com", full_name="Bench", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+    legacy_token = create_access_token(user.id)
+    claims_token = create_access_token(user.id, claims={"email": user.email, "name": user.full_name, "active": True})
+    db.close()
+
+    def creds(token: str) -> HTTPAuthorizationCredentials:
+        return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    # FastAPI runs sync dependencies in the threadpool, as to_thread does here.
+    legacy = await drive(lambda: asyncio.to_thread(legacy_get_current_user, creds(legacy_token)), args.requests, args.concurrency)
+
+    settings.AUTH_TRUST_TOKEN_CLAIMS = False
+    user_cache.ttl_seconds = args.ttl
+    cached_db = await drive(lambda: get_current_user(creds(legacy_token)), args.requests, args.concurrency)
+    db_stats = user_cache.stats()
+
+    settings.AUTH_TRUST_TOKEN_CLAIMS = True
+    user_cache._entries.clear()
+    claims = await drive(lambda: get_current_user(creds(claims_token)), args.requests, args.concurrency)
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "runs": [
+            {"auth": "db_per_request_threadpool", **legacy},
+            {"auth": f"user_cache_ttl_{args.ttl:g}s", **cached_db, "cache": db_stats},
+            {"auth": "token_claims", **claims},
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--ttl", type=float, default=settings.AUTH_USER_CACHE_TTL_SECONDS)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASE_URL = f"sqlite:///{tmp}/bench.db"
+        print(json.dumps(asyncio.run(run(args)), indent=2))
@@ -0,0 +1,89 @@
+"""Throughput of the /chat/ retrieval stage: one-at-a-time threads vs. the micro-batching scheduler.
+
+    python -m benchmarks.bench_batching --requests 512 --concurrency 64
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from app.core.config import settings
+from app.rag.batching import RetrievalBatcher
+from app.rag.chunker import split_markdown
+from app.rag.embeddings import get_embedding_service
+from app.rag.vectorstore import PolicyVectorStore
+from benchmarks.corpus import percentiles, sample_questions, synthetic_policy
+
+
+def build_store(sections: int) -> PolicyVectorStore:
+    store = PolicyVectorStore(collection_name="bench")
+    ids, docs, metas = [], [], []
+    for domain in ("HR", "IT"):
+        for i, ch in enumerate(split_markdown(synthetic_policy(domain, sections))):
+            ids.append(f"{domain}-{i}")
+            docs.append(ch["content"])
+            metas.append({"domain": domain, "source": f"{domain.lower()}_policy.md", "heading": ch["heading"]})
+    step = store.max_batch_size
+    for i in range(0, len(ids), step):
+        store.add(ids=ids[i:i + step], texts=docs[i:i + step], metadatas=metas[i:i + step])
+    return store
+
+
+async def drive(handler: Callable[[str, str], Awaitable[object]], questions: List[Dict[str, str]], concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(item: Dict[str, str]):
+        async with sem:
+            t = time.perf_counter()
+            await handler(item["question"], item["domain"])
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    elapsed = time.perf_counter() - started
+    return {"rps": round(len(questions) / elapsed, 1), "latency_ms": percentiles(latencies)}
+
+
+async def main(args: argparse.Namespace) -> Dict[str, object]:
+    embedder = get_embedding_service()
+    store = build_store(args.sections)
+    questions = sample_questions(args.requests)
+    embedder.encode_one("warm up")
+
+    async def unbatched(q: str, domain: str):
+        emb = await asyncio.to_thread(embedder.encode_one, q)
+        return await asyncio.to_thread(store.search_by_vector, emb, 6, domain)
+
+    batcher = RetrievalBatcher(embedder, store, max_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    async def batched(q: str, domain: str):
+        emb = await batcher.embed(q)
+        return await batcher.search(emb, 6, domain)
+
+    report: Dict[str, object] = {
+        "chunks": store.count(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "unbatched": await drive(unbatched, questions, args.concurrency),
+        "batched": await drive(batched, questions, args.concurrency),
+    }
+    report["speedup"] = round(report["batched"]["rps"] / max(report["unbatched"]["rps"], 1e-9), 2)
+    report["batch_stats"] = batcher.stats()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--max-batch", type=int, default=settings.BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.CHROMA_DIR = tmp
+        print(json.dumps(asyncio.run(main(args)), indent=2))
@@ -0,0 +1,95 @@
+"""Chunking throughput and chunk shape: legacy per-line chunker vs. single-pass split_markdown vs. token windows.
+
+    python -m benchmarks.bench_chunking --sections 2000 --repeat 3
+"""
+from __future__ import annotations
+import argparse
+import json
+import re
+import time
+from typing import Callable, Dict, List
+
+from app.core.config import settings
+from app.rag.chunker import _window, chunk_markdown, split_markdown
+from app.rag.embeddings import get_token_counter
+from benchmarks.corpus import synthetic_policy
+
+
+def legacy_split_markdown(text: str, max_chars: int = 1000, overlap: int = 150) -> List[Dict]:
+    # The original implementation, kept as the baseline.
+    text = text.replace("\r\n", "\n").strip()
+    parts: List[Dict] = []
+    current_heading = ""
+    buffer: List[str] = []
+    for line in text.split("\n"):
+        m = re.match(r"^(#{1,6})\s+(.*)$", line)
+        if m:
+            if buffer:
+                section_text = "\n".join(buffer).strip()
+                if section_text:
+                    parts.extend(_window(section_text, current_heading, max_chars, overlap))
+                buffer = []
+            current_heading = m.group(2).strip()
+        buffer.append(line)
+    if buffer:
+        section_text = "\n".join(buffer).strip()
+        if section_text:
+            parts.extend(_window(section_text, current_heading, max_chars, overlap))
+    return parts
+
+
+def measure(name: str, fn: Callable[[str], List[Dict]], text: str, repeat: int, count_tokens, limit: int) -> Dict[str, object]:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        chunks = fn(text)
+        best = min(best, time.perf_counter() - t)
+    tokens = count_tokens([c["content"] for c in chunks])
+    mid_sentence = sum(1 for c in chunks if not c["content"].rstrip().endswith((".", "!", "?")) and not c["content"].startswith("#"))
+    return {
+        "chunker": name,
+        "mb_per_sec": round(len(text.encode("utf-8")) / best / 1e6, 2),
+        "seconds": round(best, 4),
+        "chunks": len(chunks),
+        "mean_tokens": round(sum(tokens) / max(len(tokens), 1), 1),
+        "max_tokens": max(tokens, default=0),
+        "truncated_by_model": sum(1 for n in tokens if n > limit),
+        "ending_mid_sentence": mid_sentence,
+    }
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    structured = "\n\n".join(synthetic_policy(d, args.sections) for d in ("HR", "IT"))
+    # Same text with the H3 subheadings removed, so sections run well past one window.
+    long_sections = re.sub(r"^### .*\n", "", structured, flags=re.M)
+    count_tokens = get_token_counter(args.tokenizer)
+    count_tokens(["warm up"])
+    token_windows = lambda t: chunk_markdown(t, count_tokens, args.max_tokens, args.overlap_tokens)
+
+    report: Dict[str, object] = {"tokenizer": args.tokenizer, "model_token_limit": args.model_limit, "corpora": []}
+    for name, text in (("structured", structured), ("long_sections", long_sections)):
+        t = time.perf_counter()
+        count_tokens(text.split("\n\n"))
+        tokenize_only = time.perf_counter() - t
+        report["corpora"].append({
+            "corpus": name,
+            "corpus_mb": round(len(text.encode("utf-8")) / 1e6, 2),
+            "tokenizer_only_mb_per_sec": round(len(text.encode("utf-8")) / tokenize_only / 1e6, 2),
+            "runs": [
+                measure("legacy_split_markdown", legacy_split_markdown, text, args.repeat, count_tokens, args.model_limit),
+                measure("split_markdown", split_markdown, text, args.repeat, count_tokens, args.model_limit),
+                measure("chunk_markdown", token_windows, text, args.repeat, count_tokens, args.model_limit),
+            ],
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=2000, help="sections per domain handbook")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tokenizer", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--max-tokens", type=int, default=settings.CHUNK_MAX_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--model-limit", type=int, default=254, help="tokens the embedding model keeps, excluding [CLS]/[SEP]")
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,104 @@
+"""Domain classification: whole-document embeddings (previous classifier) vs. cached chunk matrix vote.
+
+    python -m benchmarks.bench_classifier --sections 200 --questions 600
+"""
+from __future__ import annotations
+import argparse
+import json
+import pathlib
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.rag.chunker import split_markdown
+from app.rag.classifier import DomainClassifier
+from app.rag.embeddings import get_embedding_service
+from app.rag.vectorstore import PolicyVectorStore
+from benchmarks.corpus import percentiles, sample_questions, synthetic_policy
+
+DOMAINS = ("FINANCE", "HR", "IT")
+
+
+def build_corpus(root: pathlib.Path, sections: int) -> tuple[List[Dict[str, str]], PolicyVectorStore]:
+    store = PolicyVectorStore(collection_name="bench")
+    policies = []
+    for domain in DOMAINS:
+        path = root / f"{domain.lower()}_policy.md"
+        path.write_text(synthetic_policy(domain, sections), encoding="utf-8")
+        policies.append({"domain": domain, "path": str(path)})
+        chunks = split_markdown(path.read_text(encoding="utf-8"))
+        step = store.max_batch_size
+        for i in range(0, len(chunks), step):
+            batch = chunks[i:i + step]
+            store.add(
+                ids=[f"{domain}-{i + j}" for j in range(len(batch))],
+                texts=[c["content"] for c in batch],
+                metadatas=[{"domain": domain, "heading": c["heading"]} for c in batch],
+                embeddings=store.embedder.encode([c["content"] for c in batch]),
+            )
+    store.bump_content_version()
+    return policies, store
+
+
+def evaluate(clf: DomainClassifier, questions: List[Dict[str, str]], q_embs: np.ndarray) -> Dict[str, object]:
+    full_hits = emb_hits = clarify = 0
+    latencies: List[float] = []
+    for item, q_emb in zip(questions, q_embs):
+        domain, conf, _ = clf.classify(item["question"], q_emb)
+        full_hits += domain == item["domain"]
+        clarify += conf < 0.55
+        t = time.perf_counter()
+        emb_domain, _, _ = clf.classify_embedding(q_emb)
+        latencies.append((time.perf_counter() - t) * 1000)
+        emb_hits += emb_domain == item["domain"]
+    n = len(questions)
+    return {
+        "accuracy": round(full_hits / n, 4),
+        "embedding_only_accuracy": round(emb_hits / n, 4),
+        "clarification_rate": round(clarify / n, 4),
+        "embedding_latency_ms": percentiles(latencies),
+    }
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    embedder = get_embedding_service()
+    policies, store = build_corpus(pathlib.Path(settings.CHROMA_DIR), args.sections)
+    questions = sample_questions(args.questions, domains=DOMAINS)
+    q_embs = embedder.encode([q["question"] for q in questions])
+
+    t = time.perf_counter()
+    whole_doc = DomainClassifier(policies=policies)
+    whole_doc_init = time.perf_counter() - t
+    t = time.perf_counter()
+    chunk_vote = DomainClassifier(store=store)
+    cold_init = time.perf_counter() - t
+    t = time.perf_counter()
+    chunk_vote = DomainClassifier(store=store)
+    cached_init = time.perf_counter() - t
+    chunk_vote.top_k = args.top_k
+
+    return {
+        "chunks": store.count(),
+        "questions": len(questions),
+        "whole_document": {"init_ms": round(whole_doc_init * 1000, 1), **evaluate(whole_doc, questions, q_embs)},
+        "chunk_vote": {
+            "init_ms_cold": round(cold_init * 1000, 1),
+            "init_ms_cached": round(cached_init * 1000, 1),
+            "top_k": args.top_k,
+            **evaluate(chunk_vote, questions, q_embs),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=600)
+    parser.add_argument("--top-k", type=int, default=settings.CLASSIFIER_TOP_K)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.CHROMA_DIR = tmp
+        print(json.dumps(main(args), indent=2))
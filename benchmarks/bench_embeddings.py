@@ -0,0 +1,91 @@
+"""Embedding backends on CPU: PyTorch SentenceTransformer vs. ONNX Runtime fp32 vs. int8, with load time, latency, throughput, RSS and parity.
+
+    python -m benchmarks.bench_embeddings --questions 200 --chunks 512 --threads 1 4
+    python -m app.rag.onnx_embeddings   # export once first, or the first onnx run includes the export
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.rag.chunker import split_markdown
+from benchmarks.corpus import percentiles, sample_questions, synthetic_policy
+
+
+def child(args: argparse.Namespace) -> Dict[str, object]:
+    # Runs in a fresh interpreter so import time and peak RSS belong to one backend.
+    started = time.perf_counter()
+    settings.EMBEDDING_THREADS = args.child_threads
+    from app.rag.embeddings import EmbeddingService
+
+    service = EmbeddingService(backend=args.child)
+    service.encode(["warm up"])
+    load_s = time.perf_counter() - started
+    # Measured before the workload is built; chunking loads the tokenizer on its own.
+    load_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    questions = [q["question"] for q in sample_questions(args.questions)]
+    chunks = [c["content"] for c in split_markdown(synthetic_policy("HR", 200))][:args.chunks]
+    latencies: List[float] = []
+    for q in questions:
+        t = time.perf_counter()
+        service.encode_one(q)
+        latencies.append((time.perf_counter() - t) * 1000)
+    t = time.perf_counter()
+    vectors = service.encode(chunks)
+    batch_s = time.perf_counter() - t
+    np.save(args.vectors, vectors)
+    return {
+        "backend": args.child,
+        "threads": args.child_threads or None,
+        "load_seconds": round(load_s, 2),
+        "rss_after_load_mb": round(load_rss_mb, 1),
+        "query_ms": percentiles(latencies),
+        "chunks_per_sec": round(len(chunks) / batch_s, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "torch_imported": "torch" in sys.modules,
+    }
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    runs = [("torch", 0)] + [(b, t) for b in ("onnx", "onnx-int8") for t in args.threads]
+    results = []
+    reference = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend, threads in runs:
+            path = os.path.join(tmp, f"{backend}-{threads}.npy")
+            cmd = [
+                sys.executable, "-m", "benchmarks.bench_embeddings", "--child", backend,
+                "--child-threads", str(threads), "--vectors", path,
+                "--questions", str(args.questions), "--chunks", str(args.chunks),
+            ]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            row = json.loads(out.strip().splitlines()[-1])
+            vectors = np.load(path)
+            if reference is None:
+                reference = vectors
+            cos = (vectors * reference).sum(axis=1)
+            row["cosine_vs_torch"] = {"min": round(float(cos.min()), 5), "mean": round(float(cos.mean()), 5)}
+            results.append(row)
+    return {"model": settings.EMBEDDING_MODEL, "cpu_count": os.cpu_count(), "runs": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=200, help="single-query encodes")
+    parser.add_argument("--chunks", type=int, default=512, help="chunks in the throughput batch")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4], help="ONNX Runtime intra-op threads to try")
+    parser.add_argument("--child", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--child-threads", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--vectors", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    print(json.dumps(child(args) if args.child else main(args), indent=None if args.child else 2))
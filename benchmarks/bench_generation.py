@@ -0,0 +1,85 @@
+"""Transformers backend: tokens/sec of per-request pipeline calls vs. batched generation.
+
+    python -m benchmarks.bench_generation --concurrency 1 4 16 --requests 32
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from app.core.config import settings
+from app.rag.chunker import split_markdown
+from benchmarks.corpus import percentiles, sample_questions, synthetic_policy
+
+
+async def drive(
+    call: Callable[[str, List[str]], Awaitable[str]],
+    workload: List[Dict],
+    concurrency: int,
+    count_tokens: Callable[[str], int],
+) -> Dict[str, object]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    tokens = 0
+
+    async def one(item: Dict):
+        nonlocal tokens
+        async with sem:
+            t = time.perf_counter()
+            out = await call(item["question"], item["context"])
+            latencies.append((time.perf_counter() - t) * 1000)
+            tokens += count_tokens(out)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(w) for w in workload))
+    elapsed = time.perf_counter() - started
+    return {
+        "tokens_per_sec": round(tokens / elapsed, 1),
+        "requests_per_sec": round(len(workload) / elapsed, 2),
+        "latency_ms": percentiles(latencies),
+    }
+
+
+async def main(args: argparse.Namespace) -> Dict[str, object]:
+    settings.LLM_BACKEND = "transformers"
+    settings.MAX_NEW_TOKENS = args.max_new_tokens
+    settings.GEN_BATCHING_ENABLED = True
+    settings.GEN_BATCH_MAX_SIZE = max(args.concurrency)
+    from app.rag.generator import AnswerGenerator
+
+    gen = AnswerGenerator()
+    chunks = {d: [c["content"] for c in split_markdown(synthetic_policy(d, 20))] for d in ("HR", "IT")}
+    workload = [
+        {"question": q["question"], "context": chunks[q["domain"]][i % len(chunks[q["domain"]]): i % len(chunks[q["domain"]]) + 2]}
+        for i, q in enumerate(sample_questions(args.requests))
+    ]
+
+    def count_tokens(text: str) -> int:
+        return len(gen.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    async def per_request(q: str, ctx: List[str]) -> str:
+        return await asyncio.to_thread(gen.generate, q, ctx)
+
+    await per_request("warm up", ["warm up"])
+    report: Dict[str, object] = {"model": settings.HF_MODEL, "max_new_tokens": args.max_new_tokens, "runs": []}
+    for c in args.concurrency:
+        baseline = await drive(per_request, workload, c, count_tokens)
+        batched = await drive(gen.agenerate, workload, c, count_tokens)
+        report["runs"].append({
+            "concurrency": c,
+            "per_request": baseline,
+            "batched": batched,
+            "speedup": round(batched["tokens_per_sec"] / max(baseline["tokens_per_sec"], 1e-9), 2),
+        })
+    report["batch_stats"] = gen.batcher.stats.snapshot()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,72 @@
+"""ingest() on a generated corpus: full index, no-op re-run, and one edited file, for a range of worker counts.
+
+    python -m benchmarks.bench_ingest --files 8 --sections 150 --workers 1 4
+"""
+from __future__ import annotations
+import argparse
+import json
+import pathlib
+import shutil
+import tempfile
+from typing import Dict, List
+
+from app.core.config import settings
+from app.rag.ingest import IngestReport, ingest
+from benchmarks.corpus import synthetic_policy
+
+DOMAINS = ("HR", "IT", "FINANCE")
+
+
+def write_corpus(root: pathlib.Path, files: int, sections: int) -> List[pathlib.Path]:
+    paths = []
+    for domain in DOMAINS:
+        (root / domain).mkdir(parents=True, exist_ok=True)
+        for i in range(files):
+            path = root / domain / f"handbook-{i:02d}.md"
+            path.write_text(synthetic_policy(domain, sections, seed=i), encoding="utf-8")
+            paths.append(path)
+    return paths
+
+
+def row(phase: str, report: IngestReport) -> Dict[str, object]:
+    return {
+        "phase": phase,
+        "seconds": round(report.elapsed_seconds, 3),
+        "chunks_added": report.chunks_added,
+        "chunks_deleted": report.chunks_deleted,
+        "chunks_per_sec": round(report.chunks_per_sec, 1),
+        "files_skipped": report.files_skipped,
+    }
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        settings.POLICY_DIR = str(root / "data")
+        paths = write_corpus(root / "data", args.files, args.sections)
+        megabytes = sum(p.stat().st_size for p in paths) / 1e6
+        for workers in args.workers:
+            settings.CHROMA_DIR = str(root / f"chroma-{workers}")
+            phases = [row("full", ingest(workers=workers)), row("unchanged", ingest(workers=workers))]
+            edited = paths[0]
+            original = edited.read_text(encoding="utf-8")
+            edited.write_text(original + "\n## Appendix\n\nStaff must read the appendix.\n", encoding="utf-8")
+            phases.append(row("one_file_edited", ingest(workers=workers)))
+            edited.write_text(original, encoding="utf-8")
+            shutil.rmtree(settings.CHROMA_DIR, ignore_errors=True)
+            runs.append({"workers": workers, "phases": phases})
+    return {
+        "files": len(paths),
+        "megabytes": round(megabytes, 2),
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8, help="handbooks per domain")
+    parser.add_argument("--sections", type=int, default=150, help="sections per handbook")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    print(json.dumps(main(parser.parse_args()), indent=2))
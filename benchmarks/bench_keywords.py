@@ -0,0 +1,82 @@
+"""Keyword fast path: per-keyword substring scan (previous) vs. one compiled word-boundary matcher.
+
+    python -m benchmarks.bench_keywords --domains 20 --keywords 50 --questions 5000
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List
+
+from app.rag.keywords import KeywordMatcher, load_domain_keywords
+from benchmarks.corpus import percentiles, sample_questions
+
+# Words that contain a default keyword without being about it.
+FALSE_FRIENDS = [
+    "Is the training mandatory for accountants?", "Can I cleave to the old process?", "Who validates the invoices?",
+    "Is the accountant on leave?", "What about metadata retention?", "Where is the holidays calendar?",
+]
+
+
+def synthetic_keywords(domains: int, per_domain: int, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ru", "te", "sa", "no", "vi", "pe", "da", "zu", "re"]
+    keywords = load_domain_keywords()
+    for d in range(domains):
+        words = {}
+        while len(words) < per_domain:
+            word = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+            if rng.random() < 0.2:
+                word += " " + "".join(rng.choice(syllables) for _ in range(2))
+            words[word] = round(rng.uniform(0.5, 2.0), 2)
+        keywords[f"D{d}"] = words
+    return keywords
+
+
+def substring_scan(keywords: Dict[str, Dict[str, float]]) -> Callable[[str], Dict[str, float]]:
+    def score(q: str) -> Dict[str, float]:
+        ql = q.lower()
+        return {d: sum(1 for w in words if w in ql) for d, words in keywords.items()}
+    return score
+
+
+def time_calls(fn: Callable[[str], object], questions: List[str]) -> Dict[str, float]:
+    samples = []
+    for q in questions:
+        t = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - t) * 1e6)
+    return percentiles(samples)
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    keywords = synthetic_keywords(args.domains, args.keywords)
+    t = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    compile_ms = (time.perf_counter() - t) * 1000
+    legacy = substring_scan(keywords)
+    questions = [q["question"] for q in sample_questions(args.questions)]
+
+    def hits(score: Dict[str, float]) -> List[str]:
+        return sorted(d for d, v in score.items() if v and d in ("HR", "IT"))
+
+    return {
+        "domains": len(keywords),
+        "keywords": sum(len(w) for w in keywords.values()),
+        "compile_ms": round(compile_ms, 2),
+        "substring_scan_us": time_calls(legacy, questions),
+        "compiled_matcher_us": time_calls(matcher.score, questions),
+        "false_friends": [
+            {"question": q, "substring_scan": hits(legacy(q)), "compiled_matcher": hits(matcher.score(q))}
+            for q in FALSE_FRIENDS
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domains", type=int, default=20, help="synthetic domains added to the default HR/IT sets")
+    parser.add_argument("--keywords", type=int, default=50, help="keywords per synthetic domain")
+    parser.add_argument("--questions", type=int, default=5000)
+    print(json.dumps(main(parser.parse_args()), indent=2))
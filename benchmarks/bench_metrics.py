@@ -0,0 +1,78 @@
+"""Instrumentation overhead: one global lock per observation vs. per-thread shards, with concurrent writers.
+
+    python -m benchmarks.bench_metrics --threads 8 --observations 200000
+"""
+from __future__ import annotations
+import argparse
+import json
+import threading
+import time
+from typing import Callable, Dict
+
+from app.core.metrics import DEFAULT_BUCKETS, MetricsRegistry, StageTimer
+
+
+class LockedRegistry(MetricsRegistry):
+    # The straightforward alternative: one shared dict behind one lock.
+    def __init__(self):
+        super().__init__()
+        self._shared = self._shard()
+        self._write_lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        with self._write_lock:
+            self._local.shard = self._shared
+            super().observe(name, seconds, **labels)
+
+
+def run(observe: Callable[[], None], threads: int, per_thread: int) -> Dict[str, float]:
+    def work():
+        for _ in range(per_thread):
+            observe()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    total = threads * per_thread
+    return {"observations_per_sec": round(total / elapsed), "ns_per_observation": round(elapsed / total * 1e9, 1)}
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    per_thread = args.observations // args.threads
+    labels = {"stage": "search", "domain": "HR", "method": "keywords", "outcome": "success"}
+    runs = []
+    for name, reg in (("global_lock", LockedRegistry()), ("thread_shards", MetricsRegistry())):
+        result = run(lambda: reg.observe("rag_stage_seconds", 0.004, **labels), args.threads, per_thread)
+        t = time.perf_counter()
+        reg.render()
+        runs.append({"registry": name, **result, "render_ms": round((time.perf_counter() - t) * 1000, 3)})
+
+    # A full request: nine stage timers, the request histogram and the counter.
+    reg = MetricsRegistry()
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        timer = StageTimer()
+        for stage in ("classify", "embed", "search", "dedup", "prompt_build", "llm_queue", "ttft", "generate"):
+            with timer.stage(stage):
+                pass
+        timer.domain, timer.method = "HR", "keywords"
+        timer.finish(reg, outcome="success")
+    per_request_us = (time.perf_counter() - started) / args.requests * 1e6
+    return {
+        "threads": args.threads,
+        "buckets": len(DEFAULT_BUCKETS),
+        "runs": runs,
+        "instrumentation_us_per_request": round(per_request_us, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--observations", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=20000)
+    print(json.dumps(main(parser.parse_args()), indent=2))
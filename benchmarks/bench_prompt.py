@@ -0,0 +1,100 @@
+"""Prompt size and prefill time: three full chunks (previous prompt) vs. the token-budget context packer.
+
+    python -m benchmarks.bench_prompt --questions 50 --budget 512
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+from app.core.config import settings
+from app.rag.chunker import split_markdown
+from app.rag.generator import SYSTEM_PROMPT
+from benchmarks.corpus import TOPICS, percentiles, sample_questions, synthetic_policy
+
+
+def legacy_prompt(question: str, blocks: List[str]) -> str:
+    # The original template; Ollama also received SYSTEM_PROMPT again as the system message.
+    ctx = "\n\n".join(blocks)
+    return (
+        f"<system>\n{SYSTEM_PROMPT}\n</system>\n"
+        f"<context>\n{ctx}\n</context>\n"
+        f"<user>Question: {question}\nProvide a concise answer based on the context.</user>"
+    )
+
+
+def workload(n: int, sections: int) -> List[Dict[str, object]]:
+    # Each question gets the first three chunks on its topic, standing in for retrieval.
+    chunks = {d: split_markdown(synthetic_policy(d, sections)) for d in ("HR", "IT")}
+    out = []
+    for item in sample_questions(n):
+        topic = next(t for t in sorted(TOPICS[item["domain"]], key=len, reverse=True) if t in item["question"])
+        blocks = [c["content"] for c in chunks[item["domain"]] if topic.lower() in c["heading"].lower()][:3]
+        out.append({"question": item["question"], "blocks": blocks})
+    return out
+
+
+def prefill_ms(gen, prompts: List[str]) -> List[float]:
+    import torch
+
+    samples = []
+    with torch.inference_mode():
+        gen.hf_model(**gen.tokenizer(prompts[0], return_tensors="pt"))
+        for prompt in prompts:
+            enc = gen.tokenizer(prompt, return_tensors="pt")
+            t = time.perf_counter()
+            gen.hf_model(**enc)
+            samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+
+def summarize(name: str, counts: List[int], prefill: List[float] | None) -> Dict[str, object]:
+    return {
+        "prompt": name,
+        "prompt_tokens": percentiles(counts),
+        "prefill_ms": percentiles(prefill) if prefill is not None else None,
+    }
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    settings.LLM_BACKEND = "transformers"
+    settings.HF_MODEL = args.model
+    settings.GEN_BATCHING_ENABLED = False
+    settings.LLM_INPUT_TOKEN_BUDGET = args.budget
+    from app.rag.generator import AnswerGenerator
+
+    gen = AnswerGenerator()
+    count: Callable[[List[str]], List[int]] = gen.count_tokens
+    items = workload(args.questions, args.sections)
+
+    legacy = [legacy_prompt(w["question"], w["blocks"]) for w in items]
+    t = time.perf_counter()
+    packed = [gen.pack_context(w["question"], w["blocks"]) for w in items]
+    pack_ms = (time.perf_counter() - t) * 1000 / len(items)
+    packed_prompts = [gen.build_prompt(w["question"], p.blocks) for w, p in zip(items, packed)]
+
+    legacy_counts = count(legacy)
+    system_tokens = count([SYSTEM_PROMPT])[0]
+    return {
+        "model": args.model,
+        "budget": args.budget,
+        "questions": len(items),
+        "pack_ms_per_request": round(pack_ms, 3),
+        "sentences_dropped_per_request": round(sum(p.sentences_dropped for p in packed) / len(items), 2),
+        "runs": [
+            summarize("legacy_ollama (system prompt twice)", [n + system_tokens for n in legacy_counts], None),
+            summarize("legacy", legacy_counts, None if args.no_prefill else prefill_ms(gen, legacy)),
+            summarize("packed", [p.prompt_tokens for p in packed], None if args.no_prefill else prefill_ms(gen, packed_prompts)),
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--sections", type=int, default=40, help="sections per domain handbook")
+    parser.add_argument("--budget", type=int, default=settings.LLM_INPUT_TOKEN_BUDGET)
+    parser.add_argument("--model", default=settings.HF_MODEL)
+    parser.add_argument("--no-prefill", action="store_true", help="only count tokens, skip the forward passes")
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,137 @@
+"""Retrieval quality and latency: vector-only vs. BM25-only vs. hybrid (reciprocal-rank fusion).
+
+    python -m benchmarks.bench_retrieval --sections 300 --questions 400
+"""
+from __future__ import annotations
+import argparse
+import json
+import pathlib
+import random
+import re
+import tempfile
+import time
+from typing import Callable, Dict, List, Set
+
+from app.core.config import settings
+from app.rag.chunker import split_markdown
+from app.rag.embeddings import get_embedding_service
+from app.rag.lexical import load_lexical_index
+from app.rag.vectorstore import PolicyVectorStore, RetrievedChunk
+from benchmarks.corpus import TOPICS, percentiles, sample_questions, synthetic_policy
+
+DOMAINS = ("FINANCE", "HR", "IT")
+KS = (1, 3, 6)
+_CODE = re.compile(r"\b[A-Z]+-F\d{4}\b")
+
+
+def with_form_codes(domain: str, text: str) -> str:
+    # Every subsection cites its own form code, the kind of exact term embeddings blur together.
+    def cite(m: re.Match) -> str:
+        section, sub = m.group(1), m.group(2)
+        return f"{m.group(0)}\nUse form {domain}-F{int(section):02d}{int(sub):02d} for these requests."
+
+    return re.sub(r"^### (\d+)\.(\d+) .*$", cite, text, flags=re.M)
+
+
+def build_corpus(sections: int) -> PolicyVectorStore:
+    store = PolicyVectorStore(collection_name="bench")
+    for domain in DOMAINS:
+        chunks = split_markdown(with_form_codes(domain, synthetic_policy(domain, sections)))
+        step = store.max_batch_size
+        for i in range(0, len(chunks), step):
+            batch = chunks[i:i + step]
+            store.add(
+                ids=[f"{domain}-{i + j}" for j in range(len(batch))],
+                texts=[c["content"] for c in batch],
+                metadatas=[{"domain": domain, "heading": c["heading"]} for c in batch],
+                embeddings=store.embedder.encode([c["content"] for c in batch]),
+            )
+    store.bump_content_version()
+    return store
+
+
+def build_questions(store: PolicyVectorStore, n: int, seed: int = 0) -> List[Dict[str, object]]:
+    # Half cite a form code (one relevant chunk), half are topic questions (any chunk on the topic).
+    rng = random.Random(seed)
+    ids, docs, metas = store.get_documents()
+    by_code: Dict[str, Set[str]] = {}
+    for cid, doc in zip(ids, docs):
+        for code in _CODE.findall(doc):
+            by_code.setdefault(code, set()).add(cid)
+    codes = sorted(by_code)
+    out: List[Dict[str, object]] = []
+    for code in rng.sample(codes, min(n // 2, len(codes))):
+        out.append({"kind": "form_code", "question": f"What is form {code} used for?", "domain": code.split("-")[0], "relevant": by_code[code]})
+    for item in sample_questions(n - len(out), seed, domains=DOMAINS):
+        topic = next(t for t in sorted(TOPICS[item["domain"]], key=len, reverse=True) if t.lower() in item["question"].lower())
+        relevant = {cid for cid, m in zip(ids, metas) if m["domain"] == item["domain"] and topic.lower() in m["heading"].lower()}
+        out.append({"kind": "topic", **item, "relevant": relevant})
+    return out
+
+
+def evaluate(name: str, search: Callable[[Dict[str, object]], List[str]], questions: List[Dict[str, object]]) -> Dict[str, object]:
+    latencies: List[float] = []
+    hits = {kind: {k: 0 for k in KS} for kind in ("form_code", "topic")}
+    totals = {"form_code": 0, "topic": 0}
+    for q in questions:
+        t = time.perf_counter()
+        ranked = search(q)
+        latencies.append((time.perf_counter() - t) * 1000)
+        totals[q["kind"]] += 1
+        for k in KS:
+            hits[q["kind"]][k] += bool(q["relevant"] & set(ranked[:k]))
+    return {
+        "retriever": name,
+        **{
+            f"{kind}_recall": {f"@{k}": round(hits[kind][k] / max(totals[kind], 1), 4) for k in KS}
+            for kind in hits
+        },
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    embedder = get_embedding_service()
+    store = build_corpus(args.sections)
+    questions = build_questions(store, args.questions)
+    q_embs = {q["question"]: e for q, e in zip(questions, embedder.encode([q["question"] for q in questions]))}
+
+    t = time.perf_counter()
+    load_lexical_index(store)
+    build_ms = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    index = store.lexical_index()
+    load_ms = (time.perf_counter() - t) * 1000
+    index_dir = next(pathlib.Path(settings.CHROMA_DIR).glob("bench.lexical.*"))
+
+    def ids(chunks: List[RetrievedChunk]) -> List[str]:
+        return [c.id for c in chunks]
+
+    k = max(KS)
+    runs = [
+        evaluate("vector", lambda q: ids(store.search_by_vector(q_embs[q["question"]], k, q["domain"])), questions),
+        evaluate("bm25", lambda q: [cid for cid, _ in index.search(q["question"], k, q["domain"])], questions),
+        evaluate("hybrid", lambda q: ids(store.hybrid_search_many([q_embs[q["question"]]], [q["question"]], k, q["domain"])[0]), questions),
+    ]
+    return {
+        "chunks": len(index),
+        "terms": len(index.terms),
+        "questions": len(questions),
+        "lexical_index": {
+            "build_ms": round(build_ms, 1),
+            "mmap_load_ms": round(load_ms, 1),
+            "bytes_on_disk": sum(p.stat().st_size for p in index_dir.iterdir()),
+        },
+        "vector_timeout_ms": settings.VECTOR_TIMEOUT_SECONDS * 1000,
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=300, help="sections per domain handbook")
+    parser.add_argument("--questions", type=int, default=400)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.CHROMA_DIR = tmp
+        print(json.dumps(main(args), indent=2))
@@ -0,0 +1,109 @@
+"""Time to first token: cold start vs. warm-up, and full prefill vs. the reused system prompt prefix.
+
+    python -m benchmarks.bench_ttft --backend transformers --questions 20
+    python -m benchmarks.bench_ttft --backend ollama --questions 20   # needs a running Ollama
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Callable, Dict, List
+
+from app.core.config import settings
+from app.rag.chunker import split_markdown
+from app.rag.generator import SYSTEM_PREFIX, SYSTEM_PROMPT
+from benchmarks.corpus import percentiles, sample_questions, synthetic_policy
+
+
+def workload(n: int) -> List[Dict[str, object]]:
+    chunks = {d: [c["content"] for c in split_markdown(synthetic_policy(d, 20))] for d in ("HR", "IT")}
+    return [
+        {"question": q["question"], "blocks": chunks[q["domain"]][i % 10: i % 10 + 3]}
+        for i, q in enumerate(sample_questions(n))
+    ]
+
+
+async def first_token_ms(stream: Callable[[], AsyncIterator[str]]) -> float:
+    t = time.perf_counter()
+    parts = stream()
+    try:
+        await parts.__anext__()
+    except StopAsyncIteration:
+        pass
+    finally:
+        await parts.aclose()
+    return (time.perf_counter() - t) * 1000
+
+
+async def transformers_runs(items: List[Dict[str, object]]) -> Dict[str, object]:
+    settings.LLM_BACKEND = "transformers"
+    settings.GEN_BATCHING_ENABLED = False
+    from app.rag.generator import AnswerGenerator
+
+    first = items[0]
+    # Without warm-up the first user waits for the weights and the full prompt.
+    t = time.perf_counter()
+    cold = AnswerGenerator()
+    await first_token_ms(lambda: cold.astream(first["question"], first["blocks"]))
+    cold_ms = (time.perf_counter() - t) * 1000
+
+    warm = AnswerGenerator()
+    warmup_s = warm.warmup()
+    warm_ms = await first_token_ms(lambda: warm.astream(first["question"], first["blocks"]))
+
+    runs = []
+    for enabled in (False, True):
+        settings.PREFIX_CACHE_ENABLED = enabled
+        warm._prefix_ids = warm._prefix_cache = None
+        warm.warmup()
+        samples = [await first_token_ms(lambda: warm.astream(w["question"], w["blocks"])) for w in items]
+        runs.append({"prefix_cache": enabled, "ttft_ms": percentiles(samples)})
+    return {
+        "model": settings.HF_MODEL,
+        "first_request": {
+            "without_warmup_ms": round(cold_ms, 1),
+            "warmup_seconds": round(warmup_s, 2),
+            "after_warmup_ms": round(warm_ms, 1),
+        },
+        "runs": runs,
+    }
+
+
+async def ollama_runs(items: List[Dict[str, object]]) -> Dict[str, object]:
+    settings.LLM_BACKEND = "ollama"
+    from app.rag.generator import AnswerGenerator
+
+    gen = AnswerGenerator()
+
+    async def legacy(question: str, blocks: List[str]) -> AsyncIterator[str]:
+        # Previous layout: system prompt repeated in the user message, server-default keep_alive.
+        prompt = SYSTEM_PREFIX + gen.build_prompt(question, blocks)
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+        parts = await gen.async_client.chat(model=gen.model, messages=messages, stream=True)
+        async for part in parts:
+            if part["message"]["content"]:
+                yield part["message"]["content"]
+
+    warmup_s = gen.warmup()
+    runs = []
+    for name, stream in (("legacy_layout", legacy), ("stable_layout_keep_alive", gen.astream)):
+        samples = [await first_token_ms(lambda: stream(w["question"], w["blocks"])) for w in items]
+        runs.append({"prompt": name, "ttft_ms": percentiles(samples)})
+    return {"model": settings.OLLAMA_MODEL, "warmup_seconds": round(warmup_s, 2), "runs": runs}
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    if args.model:
+        settings.HF_MODEL = args.model
+    items = workload(args.questions)
+    run = transformers_runs if args.backend == "transformers" else ollama_runs
+    return asyncio.run(run(items))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["transformers", "ollama"], default="transformers")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--model", default="", help="HF model for the transformers backend (default HF_MODEL)")
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,147 @@
+"""Vector search backends: Chroma HNSW vs. the memory-mapped NumPy store (float32, float16), on synthetic clustered vectors.
+
+    python -m benchmarks.bench_vectorstore --rows 20000 --dim 384 --queries 500 --batch 32
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.corpus import percentiles
+
+DOMAINS = ("FINANCE", "HR", "IT")
+BACKENDS = (("chroma", "float32"), ("numpy", "float32"), ("numpy", "float16"))
+
+
+def make_data(rows: int, dim: int, queries: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    # Chunk embeddings cluster by topic; queries are perturbed chunks, half filtered by domain.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, rows // 200), dim))
+    assign = rng.integers(0, len(centers), rows)
+    vectors = centers[assign] + 0.6 * rng.normal(size=(rows, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(0, rows, queries)
+    qs = vectors[picks] + 0.3 * rng.normal(size=(queries, dim)) / np.sqrt(dim)
+    qs /= np.linalg.norm(qs, axis=1, keepdims=True)
+    return {
+        "vectors": vectors.astype(np.float32),
+        "domains": rng.integers(0, len(DOMAINS), rows),
+        "queries": qs.astype(np.float32),
+        "query_domains": np.where(np.arange(queries) % 2 == 0, -1, rng.integers(0, len(DOMAINS), queries)),
+    }
+
+
+def exact_top_k(data: Dict[str, np.ndarray], k: int) -> List[List[str]]:
+    vectors = data["vectors"].astype(np.float64)
+    out = []
+    for q, d in zip(data["queries"].astype(np.float64), data["query_domains"]):
+        rows = np.arange(len(vectors)) if d < 0 else np.flatnonzero(data["domains"] == d)
+        scores = vectors[rows] @ q
+        out.append([f"c{rows[i]}" for i in np.argsort(-scores)[:k]])
+    return out
+
+
+def _rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def child(args: argparse.Namespace) -> Dict[str, object]:
+    # build: fill the store; serve: open it in a fresh process the way a worker would and query.
+    from app.core.config import settings
+
+    settings.CHROMA_DIR = args.dir
+    settings.VECTOR_BACKEND = args.backend
+    settings.VECTOR_DTYPE = args.dtype
+    data = dict(np.load(os.path.join(args.dir, "data.npz")))
+    started = time.perf_counter()
+    from app.rag.vectorstore import PolicyVectorStore
+
+    store = PolicyVectorStore(collection_name="bench")
+    open_s = time.perf_counter() - started
+    if args.child == "build":
+        vectors = data["vectors"]
+        step = min(store.max_batch_size, 5000)
+        for i in range(0, len(vectors), step):
+            ids = [f"c{j}" for j in range(i, min(len(vectors), i + step))]
+            store.add(
+                ids=ids,
+                texts=[f"chunk {cid}" for cid in ids],
+                metadatas=[{"domain": DOMAINS[data["domains"][int(cid[1:])]]} for cid in ids],
+                embeddings=vectors[i:i + step],
+            )
+        store.bump_content_version()
+        return {"build_seconds": round(time.perf_counter() - started, 2)}
+
+    queries = data["queries"]
+    domains = [None if d < 0 else DOMAINS[d] for d in data["query_domains"]]
+    store.search_many_by_vectors(queries[:1], k=args.k)  # first-query work (index load, page faults)
+    first_s = time.perf_counter() - started
+    latencies: List[float] = []
+    found: List[List[str]] = []
+    for q, d in zip(queries, domains):
+        t = time.perf_counter()
+        hits = store.search_many_by_vectors([q], k=args.k, domain=d)[0]
+        latencies.append((time.perf_counter() - t) * 1000)
+        found.append([h.id for h in hits])
+    unfiltered = queries[[i for i, d in enumerate(domains) if d is None]]
+    t = time.perf_counter()
+    for i in range(0, len(unfiltered), args.batch):
+        store.search_many_by_vectors(unfiltered[i:i + args.batch], k=args.k)
+    batch_s = time.perf_counter() - t
+    return {
+        "open_seconds": round(open_s, 3),
+        "first_query_seconds": round(first_s, 3),
+        "query_ms": percentiles(latencies),
+        "batched_qps": round(len(unfiltered) / batch_s, 1),
+        "peak_rss_mb": _rss_mb(),
+        "chromadb_imported": "chromadb" in sys.modules,
+        "found": found,
+    }
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    data = make_data(args.rows, args.dim, args.queries)
+    truth = exact_top_k(data, args.k)
+    results = []
+    for backend, dtype in BACKENDS:
+        with tempfile.TemporaryDirectory() as tmp:
+            np.savez(os.path.join(tmp, "data.npz"), **data)
+            row: Dict[str, object] = {"backend": backend, "dtype": dtype}
+            for phase in ("build", "serve"):
+                cmd = [
+                    sys.executable, "-m", "benchmarks.bench_vectorstore", "--child", phase, "--dir", tmp,
+                    "--backend", backend, "--dtype", dtype, "--k", str(args.k), "--batch", str(args.batch),
+                ]
+                out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+                row.update(json.loads(out.strip().splitlines()[-1]))
+            found = row.pop("found")
+            hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+            row["recall_at_k"] = round(hits / sum(len(t) for t in truth), 4)
+            row["disk_mb"] = round(sum(
+                os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(tmp) for f in files if f != "data.npz"
+            ) / 2**20, 1)
+            results.append(row)
+    return {"rows": args.rows, "dim": args.dim, "k": args.k, "queries": args.queries, "runs": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000, help="stored chunks")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500, help="half unfiltered, half with a domain filter")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32, help="queries per call in the batched run")
+    parser.add_argument("--child", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", default="numpy", help=argparse.SUPPRESS)
+    parser.add_argument("--dtype", default="float32", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    print(json.dumps(child(args) if args.child else main(args), indent=None if args.child else 2))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import random
+import statistics
+from typing import Dict, List, Sequence
+
+
+TOPICS: Dict[str, List[str]] = {
+    "HR": [
+        "annual leave", "sick leave", "parental leave", "payroll", "salary review", "benefits",
+        "probation", "timesheets", "overtime", "per diem", "expense claims", "remote work",
+        "attendance", "public holidays", "performance reviews", "onboarding",
+    ],
+    "IT": [
+        "VPN access", "password rotation", "MFA enrolment", "laptop encryption", "device loans",
+        "software requests", "network security", "email retention", "helpdesk tickets",
+        "data backup", "antivirus", "account lockout", "access reviews", "USB storage",
+    ],
+    "FINANCE": [
+        "invoice approval", "purchase orders", "vendor onboarding", "corporate cards", "budget owners",
+        "quarter close", "travel advances", "mileage rates", "audit evidence", "petty cash",
+    ],
+}
+
+_VERBS = ["must", "should", "may", "is required to", "is expected to", "can"]
+_SUBJECTS = ["Employees", "Managers", "Contractors", "Team leads", "New starters", "Staff"]
+_OBJECTS = [
+    "submit the request through the portal", "notify their line manager in advance",
+    "keep records for at least twelve months", "follow the approval workflow",
+    "contact the helpdesk for exceptions", "complete the relevant form within five working days",
+    "review the entitlement at the start of each year", "attach supporting documents",
+]
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    return f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} regarding {topic}."
+
+
+def synthetic_policy(domain: str, sections: int = 50, seed: int = 0) -> str:
+    rng = random.Random(f"{domain}-{seed}")
+    topics = TOPICS.get(domain, TOPICS["HR"])
+    lines = [f"# {domain} Policy Handbook", ""]
+    for s in range(sections):
+        topic = topics[s % len(topics)]
+        lines.append(f"## {s + 1}. {topic.title()}")
+        lines.append("")
+        for sub in range(rng.randint(1, 3)):
+            lines.append(f"### {s + 1}.{sub + 1} {topic.title()} rules")
+            for _ in range(rng.randint(1, 4)):
+                lines.append(" ".join(_sentence(rng, topic) for _ in range(rng.randint(2, 6))))
+                lines.append("")
+    return "\n".join(lines)
+
+
+def sample_questions(n: int, seed: int = 0, domains: Sequence[str] = ("HR", "IT")) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    templates = [
+        "What is the rule for {t}?", "How do I handle {t}?", "Who approves {t}?",
+        "Where can I find the {t} policy?", "What are the deadlines for {t}?",
+    ]
+    out: List[Dict[str, str]] = []
+    domains = sorted(domains)
+    for i in range(n):
+        domain = domains[i % len(domains)]
+        topic = rng.choice(TOPICS[domain])
+        out.append({"domain": domain, "question": rng.choice(templates).format(t=topic)})
+    return out
+
+
+def percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    ordered = sorted(samples_ms)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        "p50": round(pick(0.50), 3),
+        "p95": round(pick(0.95), 3),
+        "p99": round(pick(0.99), 3),
+        "mean": round(statistics.fmean(ordered), 3),
+    }
@@ -0,0 +1,300 @@
+"""End-to-end load test of /api/v1/chat/: a generated corpus in a temporary index, a stub Ollama server, concurrent authenticated clients.
+
+    python -m benchmarks.loadtest --requests 500 --concurrency 32 --out runs/baseline.json
+    python -m benchmarks.loadtest --requests 500 --concurrency 32 --stream --compare runs/baseline.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.corpus import percentiles, sample_questions, synthetic_policy
+
+DOMAINS = ("HR", "IT", "FINANCE")
+_SAMPLE = re.compile(r'^(\w+)_bucket\{(.*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_corpus(root: pathlib.Path, files: int, sections: int) -> int:
+    # data/<DOMAIN>/<n>.md, one handbook per file with its own seed.
+    total = 0
+    for domain in DOMAINS:
+        (root / domain).mkdir(parents=True, exist_ok=True)
+        for i in range(files):
+            text = synthetic_policy(domain, sections, seed=i)
+            (root / domain / f"handbook-{i:02d}.md").write_text(text, encoding="utf-8")
+            total += len(text)
+    return total
+
+
+def start(cmd: List[str], env: Dict[str, str], log: pathlib.Path) -> subprocess.Popen:
+    return subprocess.Popen(cmd, env=env, stdout=log.open("w"), stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def read_histograms(text: str, name: str) -> Dict[str, Dict[float, float]]:
+    # Cumulative bucket counts per stage, summed over domain/method/outcome.
+    out: Dict[str, Dict[float, float]] = defaultdict(lambda: defaultdict(float))
+    for line in text.splitlines():
+        m = _SAMPLE.match(line)
+        if not m or m.group(1) != name:
+            continue
+        labels = dict(_LABEL.findall(m.group(2)))
+        le = float("inf") if labels["le"] == "+Inf" else float(labels["le"])
+        out[labels.get("stage", "request")][le] += float(m.group(3))
+    return out
+
+
+def quantile(buckets: Dict[float, float], q: float) -> float:
+    # Linear interpolation inside the bucket, as Prometheus' histogram_quantile does.
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if total <= 0:
+        return 0.0
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * ((rank - below) / (count - below) if count > below else 0.0)
+        lower, below = bound, count
+    return lower
+
+
+def stage_report(before: str, after: str) -> Dict[str, Dict[str, float]]:
+    # Difference of two scrapes, so start-up and warm-up traffic is left out.
+    old = read_histograms(before, "rag_stage_seconds")
+    new = read_histograms(after, "rag_stage_seconds")
+    out: Dict[str, Dict[str, float]] = {}
+    for stage, buckets in sorted(new.items()):
+        delta = {le: v - old.get(stage, {}).get(le, 0.0) for le, v in buckets.items()}
+        count = delta[float("inf")]
+        if count <= 0:
+            continue
+        out[stage] = {"count": int(count), **{f"p{int(q * 100)}_ms": round(quantile(delta, q) * 1000, 2) for q in (0.5, 0.95, 0.99)}}
+    return out
+
+
+def outcome_report(before: str, after: str) -> Dict[str, int]:
+    counts: Counter = Counter()
+    for text, sign in ((after, 1), (before, -1)):
+        for line in text.splitlines():
+            if line.startswith("rag_requests_total{"):
+                labels = dict(_LABEL.findall(line[line.index("{"):line.rindex("}")]))
+                counts[labels.get("outcome", "")] += sign * int(float(line.rsplit(" ", 1)[1]))
+    return {k: v for k, v in sorted(counts.items()) if v}
+
+
+async def login(client: httpx.AsyncClient, users: int) -> List[str]:
+    tokens = []
+    for i in range(users):
+        creds = {"email": f"load{i}@example.com", "password": "loadtest-password"}
+        await client.post("/api/v1/auth/register", json=creds)
+        r = await client.post("/api/v1/auth/login", json=creds)
+        r.raise_for_status()
+        tokens.append(r.json()["access_token"])
+    return tokens
+
+
+async def one_request(client: httpx.AsyncClient, token: str, question: str, stream: bool) -> Tuple[int, float, float | None]:
+    headers = {"Authorization": f"Bearer {token}"}
+    t = time.perf_counter()
+    if not stream:
+        r = await client.post("/api/v1/chat/", json={"question": question}, headers=headers)
+        return r.status_code, (time.perf_counter() - t) * 1000, None
+    ttft = None
+    async with client.stream("POST", "/api/v1/chat/stream", json={"question": question}, headers=headers) as r:
+        async for line in r.aiter_lines():
+            if ttft is None and line in ("event: token", "event: done"):
+                ttft = (time.perf_counter() - t) * 1000
+    return r.status_code, (time.perf_counter() - t) * 1000, ttft
+
+
+async def drive(base_url: str, args: argparse.Namespace) -> Dict[str, object]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        tokens = await login(client, args.users)
+        questions = [q["question"] for q in sample_questions(args.requests + args.warmup, seed=args.seed, domains=DOMAINS)]
+        # Warm-up requests are not counted; they fill connection pools and lazy singletons.
+        await asyncio.gather(*(one_request(client, tokens[0], q, args.stream) for q in questions[:args.warmup]))
+        before = (await client.get("/metrics")).text
+
+        sem = asyncio.Semaphore(args.concurrency)
+        results: List[Tuple[int, float, float | None]] = []
+
+        async def worker(i: int, question: str):
+            async with sem:
+                try:
+                    results.append(await one_request(client, tokens[i % len(tokens)], question, args.stream))
+                except httpx.HTTPError:
+                    results.append((0, 0.0, None))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i, q) for i, q in enumerate(questions[args.warmup:])))
+        elapsed = time.perf_counter() - started
+        after = (await client.get("/metrics")).text
+
+    ok = [r for r in results if r[0] == 200]
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests_per_sec": round(len(results) / elapsed, 2),
+        "ok_per_sec": round(len(ok) / elapsed, 2),
+        "status_codes": dict(sorted(Counter(str(r[0]) for r in results).items())),
+        "latency_ms": percentiles([r[1] for r in ok]),
+        "ttft_ms": percentiles([r[2] for r in ok if r[2] is not None]) if args.stream else None,
+        "outcomes": outcome_report(before, after),
+        "stages": stage_report(before, after),
+    }
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object]) -> Dict[str, object]:
+    def delta(new: float, old: float) -> str:
+        return f"{new} ({(new - old) / old * 100:+.1f}%)" if old else str(new)
+
+    out: Dict[str, object] = {"requests_per_sec": delta(current["requests_per_sec"], baseline["requests_per_sec"])}
+    for key in ("p50", "p95", "p99"):
+        out[f"latency_{key}_ms"] = delta(current["latency_ms"][key], baseline["latency_ms"][key])
+    for stage, row in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if old:
+            out[f"{stage}_p95_ms"] = delta(row["p95_ms"], old["p95_ms"])
+    return out
+
+
+def main(args: argparse.Namespace) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        env = dict(os.environ)
+        env.update({
+            "POLICY_DIR": str(root / "data"),
+            "CHROMA_DIR": str(root / "chroma"),
+            "DATABASE_URL": f"sqlite:///{root}/load.db",
+            "LLM_BACKEND": "ollama",
+            "METRICS_ENABLED": "true",
+            "POLICY_WATCH_ENABLED": "false",
+            "ANSWER_CACHE_ENABLED": str(args.answer_cache).lower(),
+        })
+        for key in ("POLICY_DIR", "CHROMA_DIR", "DATABASE_URL"):
+            setattr(settings, key, env[key])
+
+        corpus_bytes = write_corpus(root / "data", args.files, args.sections)
+        from app.init_db import init
+        from app.rag.ingest import ingest
+
+        init()
+        report = ingest()
+        procs: List[subprocess.Popen] = []
+        try:
+            if args.ollama_host:
+                env["OLLAMA_HOST"] = args.ollama_host
+            else:
+                stub_port = free_port()
+                env["OLLAMA_HOST"] = f"http://127.0.0.1:{stub_port}"
+                procs.append(start([
+                    sys.executable, "-m", "benchmarks.stub_ollama", "--port", str(stub_port),
+                    "--latency-ms", str(args.llm_latency_ms), "--tokens-per-sec", str(args.tokens_per_sec),
+                    "--answer-tokens", str(args.answer_tokens),
+                ], env, root / "stub.log"))
+                wait_ready(f"{env['OLLAMA_HOST']}/api/tags", procs[-1], 30)
+
+            port = free_port()
+            procs.append(start([
+                sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                "--log-level", "warning",
+            ], env, root / "api.log"))
+            startup = wait_ready(f"http://127.0.0.1:{port}/ready", procs[-1], args.startup_timeout)
+            result = asyncio.run(drive(f"http://127.0.0.1:{port}", args))
+        finally:
+            for proc in procs:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "stream": args.stream,
+            "answer_cache": args.answer_cache,
+            "llm": args.ollama_host or {
+                "stub_latency_ms": args.llm_latency_ms,
+                "tokens_per_sec": args.tokens_per_sec,
+                "answer_tokens": args.answer_tokens,
+            },
+            "embedding_model": settings.EMBEDDING_MODEL,
+        },
+        "corpus": {
+            "domains": len(DOMAINS),
+            "files": args.files * len(DOMAINS),
+            "megabytes": round(corpus_bytes / 1e6, 2),
+            "chunks": report.chunks_added,
+            "ingest_seconds": round(report.elapsed_seconds, 2),
+        },
+        "startup_seconds": round(startup, 2),
+        **result,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="requests sent before measuring")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream and report time to first token")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the answer cache on (off measures the full pipeline)")
+    parser.add_argument("--files", type=int, default=4, help="handbooks per domain")
+    parser.add_argument("--sections", type=int, default=150, help="sections per handbook")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="stub Ollama delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0, help="stub Ollama token rate")
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--ollama-host", default="", help="use a real Ollama server instead of the stub")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="", help="write the result JSON here")
+    parser.add_argument("--compare", default="", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    result = main(args)
+    if args.compare:
+        result["compared_to"] = {"file": args.compare, **compare(result, json.loads(pathlib.Path(args.compare).read_text()))}
+    text = json.dumps(result, indent=2)
+    if args.out:
+        pathlib.Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        pathlib.Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
@@ -0,0 +1,91 @@
+"""Stand-in for the Ollama HTTP API with a fixed first-token latency and token rate, for load tests without a GPU.
+
+    python -m benchmarks.stub_ollama --port 11435 --latency-ms 200 --tokens-per-sec 40 --answer-tokens 60
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+_WORDS = "Per the policy employees must submit the request through the portal and notify their manager".split()
+
+
+def create_app(latency_ms: float = 200.0, tokens_per_sec: float = 40.0, answer_tokens: int = 60) -> Starlette:
+    state = {"requests": 0, "active": 0, "max_active": 0}
+
+    def reply(model: str, content: str, done: bool, count: int = 0) -> Dict[str, object]:
+        out: Dict[str, object] = {
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": content},
+            "done": done,
+        }
+        if done:
+            out.update(done_reason="stop", eval_count=count)
+        return out
+
+    async def tokens(n: int) -> AsyncIterator[str]:
+        await asyncio.sleep(latency_ms / 1000)
+        step = 1.0 / tokens_per_sec if tokens_per_sec > 0 else 0.0
+        for i in range(n):
+            if i:
+                await asyncio.sleep(step)
+            yield _WORDS[i % len(_WORDS)] + " "
+
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        n = int((body.get("options") or {}).get("num_predict") or answer_tokens)
+        state["requests"] += 1
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+
+        if not body.get("stream", True):
+            try:
+                parts: List[str] = [t async for t in tokens(n)]
+            finally:
+                state["active"] -= 1
+            return JSONResponse(reply(model, "".join(parts).strip(), True, n))
+
+        async def lines() -> AsyncIterator[bytes]:
+            try:
+                async for t in tokens(n):
+                    yield (json.dumps(reply(model, t, False)) + "\n").encode()
+                yield (json.dumps(reply(model, "", True, n)) + "\n").encode()
+            finally:
+                state["active"] -= 1
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def tags(request: Request):
+        return JSONResponse({"models": [{"name": "stub", "model": "stub"}]})
+
+    async def stats(request: Request):
+        return JSONResponse(state)
+
+    return Starlette(routes=[
+        Route("/api/chat", chat, methods=["POST"]),
+        Route("/api/tags", tags),
+        Route("/stub/stats", stats),
+    ])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.tokens_per_sec, args.answer_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
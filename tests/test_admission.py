@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+
+def test_requests_beyond_queue_are_shed_immediately():
+    from app.core.admission import AdmissionController, AdmissionRejected
+
+    limiter = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5, retry_after=7)
+
+    async def run():
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire()
+        assert exc.value.retry_after == 7
+        limiter.release()
+        await queued
+        assert limiter.active == 1
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["admitted"] == 2
+    assert stats["rejected_queue_full"] == 1
+    assert stats["max_queue_depth"] == 1
+
+
+def test_queue_wait_times_out_and_frees_its_place():
+    from app.core.admission import AdmissionController, AdmissionRejected
+
+    limiter = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=0.05, retry_after=1)
+
+    async def run():
+        async with limiter.slot():
+            with pytest.raises(AdmissionRejected):
+                await limiter.acquire()
+            assert limiter.queue_depth == 0
+        assert limiter.active == 0
+
+    asyncio.run(run())
+    assert limiter.stats()["rejected_timeout"] == 1
+
+
+def test_streams_get_the_unscaled_limit_when_generation_is_batched(monkeypatch):
+    from app.api.v1 import chat
+
+    monkeypatch.setattr(chat, "_llm_limiter", None)
+    monkeypatch.setattr(chat, "_stream_limiter", None)
+    monkeypatch.setattr(chat.settings, "LLM_BACKEND", "transformers")
+    monkeypatch.setattr(chat.settings, "GEN_BATCHING_ENABLED", True)
+    monkeypatch.setattr(chat.settings, "GEN_BATCH_MAX_SIZE", 8)
+    monkeypatch.setattr(chat.settings, "LLM_MAX_CONCURRENCY_TRANSFORMERS", 1)
+
+    assert chat._get_llm_limiter().max_concurrency == 8
+    assert chat._get_stream_limiter().max_concurrency == 1
+
+    monkeypatch.setattr(chat.settings, "LLM_BACKEND", "ollama")
+    assert chat._get_stream_limiter() is chat._get_llm_limiter()
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def _vec(*xs):
+    v = np.array(xs, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    from app.rag.answer_cache import AnswerCache
+
+    cache = AnswerCache()
+    cache.put("How many sick days?", {"answer": "10 days"})
+
+    hit = cache.get("  how many SICK days ")
+    assert hit == ({"answer": "10 days"}, "exact")
+
+
+def test_semantic_hit_respects_threshold():
+    from app.rag.answer_cache import AnswerCache
+
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.put("how many sick days", {"answer": "10 days"}, embedding=_vec(1, 0, 0))
+
+    assert cache.get("sick leave allowance?", _vec(1, 0.1, 0))[1] == "semantic"
+    assert cache.get("vpn setup", _vec(0, 1, 0)) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_version_change_invalidates_everything():
+    from app.rag.answer_cache import AnswerCache
+
+    cache = AnswerCache()
+    cache.put("sick days", {"answer": "10"}, embedding=_vec(1, 0), version="v1")
+    assert cache.get("sick days", version="v1") is not None
+
+    assert cache.get("sick days", _vec(1, 0), version="v2") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_lru_eviction_and_ttl():
+    from app.rag.answer_cache import AnswerCache
+
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", {"answer": "1"})
+    cache.put("b", {"answer": "2"})
+    cache.get("a")
+    cache.put("c", {"answer": "3"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    expired = AnswerCache(ttl_seconds=-1)
+    expired.put("a", {"answer": "1"})
+    assert expired.get("a") is None
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.security import create_access_token
+from app.core.user_cache import CurrentUser, UserCache
+
+
+def _setup(monkeypatch, db_user=None):
+    from app.api.v1 import auth
+
+    loads = []
+
+    def load_user(user_id):
+        loads.append(user_id)
+        return db_user
+
+    monkeypatch.setattr(auth, "user_cache", UserCache(ttl_seconds=60))
+    monkeypatch.setattr(auth, "_load_user", load_user)
+    return auth, loads
+
+
+def _resolve(auth, token):
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(auth.get_current_user(creds))
+
+
+def test_token_claims_resolve_user_without_database(monkeypatch):
+    auth, loads = _setup(monkeypatch)
+    token = create_access_token(7, claims={"email": "a@example.com", "name": "Ann", "active": True})
+
+    user = _resolve(auth, token)
+    _resolve(auth, token)
+
+    assert user == CurrentUser(id=7, email="a@example.com", full_name="Ann", is_active=True)
+    assert loads == []
+    assert auth.user_cache.stats()["hits"] == 1
+
+
+def test_invalidated_user_is_rechecked_in_database(monkeypatch):
+    auth, loads = _setup(monkeypatch, db_user=CurrentUser(id=7, email="a@example.com", full_name="Ann", is_active=False))
+    token = create_access_token(7, claims={"email": "a@example.com", "name": "Ann", "active": True})
+    _resolve(auth, token)
+
+    auth.user_cache.invalidate(7)
+    for _ in range(2):
+        with pytest.raises(HTTPException) as err:
+            _resolve(auth, token)
+        assert err.value.status_code == 403
+
+    assert loads == [7]
+
+
+def test_claims_older_than_the_ttl_are_rechecked_in_database(monkeypatch):
+    import time
+
+    import jwt
+    from app.core.config import settings
+
+    auth, loads = _setup(monkeypatch, db_user=CurrentUser(id=7, email="a@example.com", full_name="Ann", is_active=False))
+    claims = {"sub": "7", "email": "a@example.com", "name": "Ann", "active": True}
+    token = jwt.encode({**claims, "iat": int(time.time()) - 120, "exp": int(time.time()) + 600}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    with pytest.raises(HTTPException) as err:
+        _resolve(auth, token)
+
+    assert err.value.status_code == 403
+    assert loads == [7]
+
+
+def test_updating_a_user_row_invalidates_the_cached_user(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.core import user_cache as mod
+    from app.db.base import Base
+    from app.models.user import User
+
+    cache = UserCache(ttl_seconds=60)
+    monkeypatch.setattr(mod, "user_cache", cache)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = User(email="a@example.com", full_name="Ann", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        cache.put(CurrentUser(id=user_id, email=user.email, full_name=user.full_name, is_active=True))
+
+        user.is_active = False
+        db.commit()
+
+    assert cache.get(user_id) is None
+    assert not cache.claims_trusted(user_id, int(time.time()) - 1)
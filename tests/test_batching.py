@@ -0,0 +1,64 @@
+import asyncio
+
+
+def test_micro_batcher_groups_concurrent_submissions():
+    from app.rag.batching import MicroBatcher
+
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(double, max_size=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+    stats = batcher.stats.snapshot()
+    assert stats["batches"] == 1
+    assert stats["max_batch_size"] == 5
+
+
+def test_micro_batcher_propagates_errors_to_every_caller():
+    from app.rag.batching import MicroBatcher
+
+    def boom(items):
+        raise RuntimeError("encoder down")
+
+    batcher = MicroBatcher(boom, max_size=4, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_retrieval_batcher_issues_one_query_per_domain():
+    from app.rag.batching import RetrievalBatcher
+    from app.rag.vectorstore import RetrievedChunk
+
+    class DummyStore:
+        def __init__(self):
+            self.calls = []
+
+        def search_many(self, embeddings, k, domain=None, queries=None):
+            self.calls.append((len(embeddings), domain))
+            return [[RetrievedChunk(content=f"{domain}-{i}", metadata={}, score=1.0)] for i in range(len(embeddings))]
+
+    store = DummyStore()
+    batcher = RetrievalBatcher(embedder=None, store=store, max_size=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.search([0.1], 6, "HR"),
+            batcher.search([0.2], 6, "IT"),
+            batcher.search([0.3], 6, "HR"),
+        )
+
+    out = asyncio.run(run())
+    assert [r[0].content for r in out] == ["HR-0", "IT-0", "HR-1"]
+    assert sorted(store.calls, key=str) == [(1, "IT"), (2, "HR")]
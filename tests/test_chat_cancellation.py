@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+
+class DummyRequest:
+    def __init__(self, disconnected=False):
+        self.disconnected = disconnected
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def _slow_call(state):
+    async def call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+    return call()
+
+
+def test_generation_is_cancelled_on_timeout():
+    from app.api.v1.chat import _until_disconnect
+
+    state = {}
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await _until_disconnect(_slow_call(state), DummyRequest(), timeout=0.05)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert state.get("cancelled")
+
+
+def test_generation_is_cancelled_when_client_disconnects():
+    from fastapi import HTTPException
+    from app.api.v1.chat import _until_disconnect
+
+    state = {}
+
+    async def run():
+        with pytest.raises(HTTPException) as exc:
+            await _until_disconnect(_slow_call(state), DummyRequest(disconnected=True), timeout=5)
+        await asyncio.sleep(0)
+        return exc.value.status_code
+
+    assert asyncio.run(run()) == 499
+    assert state.get("cancelled")
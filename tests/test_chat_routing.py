@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import numpy as np
+
+from app.rag.vectorstore import RetrievedChunk
+
+
+class FakeClassifier:
+    domains = ["HR", "IT"]
+
+    def classify(self, q, q_emb=None):
+        return "HR", 0.52, "embeddings"
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.searched = []
+
+    async def embed(self, q):
+        return np.ones(4, dtype=np.float32)
+
+    async def search(self, q_emb, k, domain=None, query=None):
+        self.searched.append(domain)
+        return [
+            RetrievedChunk("VPN needs MFA.", {"domain": "IT", "heading": "VPN"}, 0.71),
+            RetrievedChunk("Leave is 20 days.", {"domain": "HR", "heading": "Leave"}, 0.40),
+            RetrievedChunk("VPN clients are managed.", {"domain": "IT", "heading": "Clients"}, 0.65),
+        ]
+
+
+class FakeStore:
+    def content_version(self):
+        return "v1"
+
+
+def _retrieve(monkeypatch, route_by_retrieval):
+    from app.api.v1 import chat
+
+    batcher = FakeBatcher()
+    monkeypatch.setattr(chat.settings, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(chat.settings, "ROUTE_BY_RETRIEVAL", route_by_retrieval)
+    monkeypatch.setattr(chat, "_classifier", FakeClassifier())
+    monkeypatch.setattr(chat, "_batcher", batcher)
+    monkeypatch.setattr(chat, "_store", FakeStore())
+    monkeypatch.setattr(chat, "_index_version", "v1")
+    return asyncio.run(chat._retrieve("how do I connect remotely?", time.time())), batcher
+
+
+def test_low_confidence_asks_for_clarification_by_default(monkeypatch):
+    ret, batcher = _retrieve(monkeypatch, route_by_retrieval=False)
+
+    assert ret.needs_clarification
+    assert batcher.searched == []
+
+
+def test_low_confidence_routes_by_unfiltered_retrieval(monkeypatch):
+    ret, batcher = _retrieve(monkeypatch, route_by_retrieval=True)
+
+    assert batcher.searched == [None]
+    assert (ret.domain, ret.route) == ("IT", "retrieval")
+    assert [r.metadata["domain"] for r in ret.results] == ["IT", "IT"]
+    assert round(ret.conf, 2) == round(1.36 / 1.76, 2)
+
+
+def test_ingest_between_store_open_and_first_request_triggers_a_reload(monkeypatch, tmp_path):
+    from app.api.v1 import chat
+
+    monkeypatch.setattr(chat.settings, "CHROMA_DIR", str(tmp_path))
+    monkeypatch.setattr(chat.settings, "VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(chat.settings, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(chat, "_store", None)
+    monkeypatch.setattr(chat, "_index_version", None)
+    monkeypatch.setattr(chat, "_classifier", FakeClassifier())
+    monkeypatch.setattr(chat, "_batcher", FakeBatcher())
+    reloads = []
+    monkeypatch.setattr(chat, "_reload_index", reloads.append)
+
+    (tmp_path / "policies.version").write_text("v1", encoding="utf-8")
+    chat._get_store()  # warm-up builds the store at v1
+    chat._get_store().bump_content_version("v2")  # an ingest lands before the first request
+
+    asyncio.run(chat._retrieve("how do I connect remotely?", time.time()))
+    assert chat._index_version == "v1"
+    assert reloads == ["v2"]
@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.admission import AdmissionController
+from app.rag.context import PackedContext
+from app.rag.vectorstore import RetrievedChunk
+from app.schemas.chat import ChatResponse
+
+QUESTION = "How many vacation days do I get?"
+
+
+class FakeGenerator:
+    def __init__(self, tokens=("You get ", "20 days."), forever=False):
+        self.tokens = tokens
+        self.forever = forever
+        self.calls = 0
+        self.closed = False
+
+    def pack_context(self, question, blocks):
+        return PackedContext(blocks=list(blocks), prompt_tokens=12, sentences_kept=1, sentences_dropped=0)
+
+    async def astream(self, question, blocks):
+        self.calls += 1
+        try:
+            for token in self.tokens:
+                yield token
+            while self.forever:
+                await asyncio.sleep(0.01)
+                yield "more "
+        finally:
+            self.closed = True
+
+
+def _retrieved(chat, q):
+    top = [RetrievedChunk("Employees get 20 vacation days.", {"source": "hr_policy.md", "heading": "Leave"}, 0.8, "c1")]
+    return chat._Retrieved(
+        q=q, t0=0.0, domain="HR", conf=0.9, method="embedding", route="rag",
+        q_emb=np.ones(4, dtype=np.float32), version="v1", results=top, top=top,
+    )
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    from app.api.v1 import chat
+    from app.api.v1.auth import get_current_user
+    from app.main import app
+
+    async def retrieve(q, t0, timer=None):
+        return _retrieved(chat, q)
+
+    limiter = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=1, retry_after=1)
+    monkeypatch.setattr(chat, "_retrieve", retrieve)
+    monkeypatch.setattr(chat, "_llm_limiter", limiter)
+    monkeypatch.setattr(chat, "_generator", FakeGenerator())
+    monkeypatch.setattr(chat.settings, "LLM_BACKEND", "ollama")
+    monkeypatch.setattr(chat.settings, "ANSWER_CACHE_ENABLED", False)
+    app.dependency_overrides[get_current_user] = lambda: object()
+    yield chat
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def _events(body):
+    out = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        out.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return out
+
+
+def test_stream_sends_meta_tokens_then_done(chat):
+    from app.main import app
+
+    r = TestClient(app).post("/api/v1/chat/stream", json={"question": QUESTION})
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert [name for name, _ in events] == ["meta", "token", "token", "done"]
+    assert events[0][1]["citations"][0]["source"] == "hr_policy.md"
+    assert [data["text"] for name, data in events if name == "token"] == ["You get ", "20 days."]
+    assert events[-1][1]["answer"] == "You get 20 days."
+    assert chat._llm_limiter.active == 0
+
+
+def test_cached_or_clarification_answers_skip_generation(chat, monkeypatch):
+    from app.main import app
+
+    async def short_circuit(q, t0, timer=None):
+        return ChatResponse(domain="HR", confidence=0.2, needs_clarification=True, clarification="Which policy?", latency_ms=1)
+
+    monkeypatch.setattr(chat, "_retrieve", short_circuit)
+    r = TestClient(app).post("/api/v1/chat/stream", json={"question": QUESTION})
+
+    events = _events(r.text)
+    assert [name for name, _ in events] == ["done"]
+    assert events[0][1]["clarification"] == "Which policy?"
+    assert chat._generator.calls == 0
+    assert chat._llm_limiter.stats()["admitted"] == 0
+
+
+def test_client_disconnect_mid_stream_releases_the_llm_slot(chat, monkeypatch):
+    from app.main import app
+
+    gen = FakeGenerator(forever=True)
+    monkeypatch.setattr(chat, "_generator", gen)
+    body = json.dumps({"question": QUESTION}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/v1/chat/stream", "raw_path": b"/api/v1/chat/stream", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+
+    async def run():
+        got_token = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if not sent:
+                sent.append(True)
+                return {"type": "http.request", "body": body, "more_body": False}
+            await got_token.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and b"event: token" in message.get("body", b""):
+                assert chat._llm_limiter.active == 1
+                got_token.set()
+
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+    asyncio.run(run())
+    assert gen.closed
+    assert chat._llm_limiter.active == 0
+    assert chat._llm_limiter.stats()["admitted"] == 1
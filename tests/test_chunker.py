@@ -0,0 +1,47 @@
+from app.rag.chunker import chunk_markdown, split_markdown
+
+
+def word_count(texts):
+    return [len(t.split()) for t in texts]
+
+
+def test_split_markdown_sections_by_heading():
+    text = "Preamble.\n# Leave\nTwenty days.\n## Sick\nTen days."
+
+    parts = split_markdown(text)
+
+    assert [p["heading"] for p in parts] == ["", "Leave", "Sick"]
+    assert parts[1]["content"] == "# Leave\nTwenty days."
+
+
+def test_headings_accept_any_whitespace_after_the_hashes():
+    text = "Preamble.\r\n# Leave\r\nTwenty days.\r\n##\u00a0Sick\r\nTen days.\r\n#\fForms\r\n#NoSpace\r\n#\r\nEnd."
+
+    parts = split_markdown(text)
+
+    assert [p["heading"] for p in parts] == ["", "Leave", "Sick", "Forms"]
+    assert parts[1]["content"] == "# Leave\nTwenty days."
+    assert parts[3]["content"] == "#\fForms\n#NoSpace\n#\nEnd."
+
+
+def test_chunk_markdown_keeps_heading_path():
+    text = "# Handbook\nIntro.\n## Leave\n### Sick\nTen days.\n## Payroll\nMonthly."
+
+    paths = [p["heading_path"] for p in chunk_markdown(text, word_count)]
+
+    assert paths == ["Handbook", "Handbook > Leave", "Handbook > Leave > Sick", "Handbook > Payroll"]
+
+
+def test_token_windows_snap_to_sentences_and_overlap():
+    sentences = [f"Rule {i} applies to everyone." for i in range(20)]
+    text = "# Rules\n" + " ".join(sentences)
+
+    parts = chunk_markdown(text, word_count, max_tokens=20, overlap_tokens=5)
+
+    assert len(parts) > 1
+    for p in parts:
+        assert len(p["content"].split()) <= 20
+        assert p["content"].endswith(".")
+    # Each window starts with the last sentence of the previous one.
+    for prev, cur in zip(parts, parts[1:]):
+        assert cur["content"].startswith(prev["content"].rsplit(". ", 1)[-1])
@@ -1,16 +1,36 @@
 from unittest.mock import patch
+import numpy as np
 
 
-def test_keyword_classification_hr():
-    from app.rag import classifier as mod
+AXES = ["hr", "it", "finance"]
+
+
+class DummyEmbedder:
+    # One axis per policy text, so each domain gets a distinct centroid.
+    def encode(self, texts):
+        out = np.zeros((len(texts), 4), dtype=np.float32)
+        for i, t in enumerate(texts):
+            out[i, AXES.index(t) if t in AXES else 3] = 1.0
+        return out
+
+    def encode_one(self, text):
+        return self.encode([text])[0]
+
 
-    class DummyModel:
-        def encode(self, *args, **kwargs):
-            return [0]
+def _make_classifier(mod, tmp_path, domains=("HR", "IT")):
+    policies = []
+    for d in domains:
+        path = tmp_path / f"{d.lower()}_policy.md"
+        path.write_text(d.lower(), encoding="utf-8")
+        policies.append({"domain": d, "path": str(path)})
+    with patch.object(mod, "get_embedding_service", return_value=DummyEmbedder()):
+        return mod.DomainClassifier(policies)
 
-    with patch.object(mod, "SentenceTransformer", return_value=DummyModel()):
-        with patch.object(mod.util, "cos_sim", return_value=[[0.0]]):
-            clf = mod.DomainClassifier()
+
+def test_keyword_classification_hr(tmp_path):
+    from app.rag import classifier as mod
+
+    clf = _make_classifier(mod, tmp_path)
 
     domain, conf, method = clf.classify("sick leave policy and annual leave")
     assert domain == "HR"
@@ -18,16 +38,10 @@ def test_keyword_classification_hr():
     assert method in {"keywords", "embeddings"}
 
 
-def test_keyword_classification_it():
+def test_keyword_classification_it(tmp_path):
     from app.rag import classifier as mod
 
-    class DummyModel:
-        def encode(self, *args, **kwargs):
-            return [0]
-
-    with patch.object(mod, "SentenceTransformer", return_value=DummyModel()):
-        with patch.object(mod.util, "cos_sim", return_value=[[0.0]]):
-            clf = mod.DomainClassifier()
+    clf = _make_classifier(mod, tmp_path)
 
     domain, conf, method = clf.classify("password policy for laptop encryption")
     assert domain == "IT"
@@ -35,4 +49,79 @@ def test_keyword_classification_it():
     assert method in {"keywords", "embeddings"}
 
 
+def test_embedding_classification_uses_precomputed_vector(tmp_path):
+    from app.rag import classifier as mod
+
+    clf = _make_classifier(mod, tmp_path)
+    q_emb = np.array([0.0, 1.0, 0.0, 0.0], dtype=np.float32)
+
+    with patch.object(clf.embedder, "encode_one", side_effect=AssertionError("re-encoded")):
+        domain, conf, method = clf.classify("who do I ask about this?", q_emb)
+    assert domain == "IT"
+    assert method == "embeddings"
+
+
+def test_discovered_domains_beyond_hr_and_it(tmp_path):
+    from app.rag import classifier as mod
+
+    clf = _make_classifier(mod, tmp_path, domains=("HR", "IT", "FINANCE"))
+    q_emb = np.array([0.0, 0.0, 1.0, 0.0], dtype=np.float32)
+
+    assert clf.domains == ["FINANCE", "HR", "IT"]
+    domain, conf, method = clf.classify("how are invoices approved?", q_emb)
+    assert (domain, method) == ("FINANCE", "embeddings")
+    assert conf >= 0.55
+
+
+class FakeStore:
+    def __init__(self, tmp_path, rows):
+        self.version_path = tmp_path / "policies.version"
+        self.collection_name = "policies"
+        self.rows = rows
+        self.fetches = 0
+
+    def content_version(self):
+        return "v1"
+
+    def get_embeddings(self):
+        self.fetches += 1
+        metas = [{"domain": d} for d, _ in self.rows]
+        return metas, np.array([v for _, v in self.rows], dtype=np.float32)
+
+
+def test_chunk_vote_classifier_uses_cached_matrix(tmp_path):
+    from app.rag import classifier as mod
+
+    rows = [
+        ("IT", [0.0, 1.0, 0.0, 0.0]),
+        ("HR", [1.0, 0.0, 0.0, 0.0]),
+        ("HR", [0.8, 0.6, 0.0, 0.0]),
+        ("FINANCE", [0.0, 0.0, 1.0, 0.0]),
+    ]
+    store = FakeStore(tmp_path, rows)
+    with patch.object(mod, "get_embedding_service", return_value=DummyEmbedder()):
+        clf = mod.DomainClassifier(store=store)
+        again = mod.DomainClassifier(store=store)
+
+    assert store.fetches == 1
+    assert clf.domains == again.domains == ["FINANCE", "HR", "IT"]
+    clf.top_k = 2
+    domain, conf, method = clf.classify_embedding(np.array([0.9, 0.4, 0.0, 0.0], dtype=np.float32))
+    assert (domain, method) == ("HR", "chunks")
+    assert conf == 0.95
+
+
+def test_chunk_matrix_falls_back_to_memory_when_the_cache_write_fails(tmp_path, monkeypatch):
+    from pathlib import Path
+    from app.rag import classifier as mod
+
+    def lost_race(self, target):
+        raise FileNotFoundError(str(self))
+
+    monkeypatch.setattr(Path, "replace", lost_race)
+    store = FakeStore(tmp_path, [("HR", [1.0, 0.0]), ("IT", [0.0, 1.0])])
+
+    domains, ends, matrix = mod.load_chunk_matrix(store)
 
+    assert domains == ["HR", "IT"] and ends.tolist() == [1, 2] and matrix.shape == (2, 2)
+    assert not list(tmp_path.glob("*tmp*"))
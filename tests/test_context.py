@@ -0,0 +1,31 @@
+from app.rag.context import pack_context
+from app.rag.generator import SYSTEM_PROMPT, AnswerGenerator
+
+
+def word_count(texts):
+    return [len(t.split()) for t in texts]
+
+
+def test_pack_context_keeps_matching_sentences_within_budget():
+    blocks = [
+        "## Leave\nStaff get twenty days. Leave requests go to the portal. Parking is free.",
+        "## Sick\nBring a note after three days. Sick leave is paid.",
+    ]
+
+    out, kept, dropped = pack_context("How do I request leave?", blocks, word_count, max_tokens=16)
+
+    assert out == ["## Leave\nLeave requests go to the portal.", "## Sick\nSick leave is paid."]
+    assert sum(word_count(out)) <= 16
+    assert (kept, dropped) == (2, 3)
+
+
+def test_ollama_prompt_sends_system_prompt_once():
+    gen = AnswerGenerator.__new__(AnswerGenerator)
+    gen.backend = "ollama"
+    gen._count_tokens = word_count
+
+    prompt = gen.build_prompt("Leave?", ["Twenty days."])
+
+    assert SYSTEM_PROMPT not in prompt
+    assert [m["content"] for m in gen._messages(prompt)].count(SYSTEM_PROMPT) == 1
+    assert gen.prompt_tokens("Leave?", ["Twenty days."]) == sum(word_count([prompt, SYSTEM_PROMPT]))
@@ -0,0 +1,102 @@
+import threading
+
+from app.rag.generator import SYSTEM_PREFIX, AnswerGenerator
+
+
+class FakeTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, text, add_special_tokens=True):
+        return {"input_ids": ([1] if add_special_tokens else []) + [len(w) for w in text.split()]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(int(i)) for i in ids)
+
+
+class FakeModel:
+    def __init__(self):
+        self.prefills = 0
+        self.calls = []
+
+    def __call__(self, input_ids, use_cache=True):
+        self.prefills += 1
+        return type("Out", (), {"past_key_values": {"tokens": input_ids.shape[1]}})()
+
+    def generate(self, input_ids, attention_mask, **kwargs):
+        import torch
+
+        self.calls.append((input_ids[0].tolist(), kwargs.get("past_key_values")))
+        return torch.cat([input_ids, torch.tensor([[7]])], dim=1)
+
+
+def _generator(monkeypatch, enabled=True):
+    from app.rag import generator as mod
+
+    monkeypatch.setattr(mod.settings, "PREFIX_CACHE_ENABLED", enabled)
+    gen = AnswerGenerator.__new__(AnswerGenerator)
+    gen.backend = "transformers"
+    gen.tokenizer = FakeTokenizer()
+    gen.hf_model = FakeModel()
+    gen.max_new, gen.temp = 4, 0.2
+    gen._prefix_ids, gen._prefix_cache, gen._prefix_lock = None, None, threading.Lock()
+    return gen
+
+
+def test_system_prefix_is_prefilled_once_and_copied_per_request(monkeypatch):
+    gen = _generator(monkeypatch)
+
+    answers = [gen.generate(q, ["Twenty days."]) for q in ("Leave?", "Sick leave?")]
+
+    prefix_ids = gen.tokenizer(SYSTEM_PREFIX)["input_ids"]
+    assert answers == ["7", "7"]
+    assert gen.hf_model.prefills == 1
+    for ids, cache in gen.hf_model.calls:
+        assert ids[:len(prefix_ids)] == prefix_ids
+        assert cache == {"tokens": len(prefix_ids)} and cache is not gen._prefix_cache
+
+
+def test_prefix_cache_can_be_disabled(monkeypatch):
+    gen = _generator(monkeypatch, enabled=False)
+
+    gen.generate("Leave?", ["Twenty days."])
+
+    assert gen.hf_model.prefills == 0
+    assert gen.hf_model.calls[0][1] is None
+
+
+def test_batched_generation_matches_single_requests(monkeypatch, tmp_path):
+    # A tiny random Llama with a word-level vocab: left padding, the attention mask and the
+    # per-row output split must give every row what it would get generated on its own.
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+    from app.rag import generator as mod
+
+    monkeypatch.setattr(mod.settings, "PREFIX_CACHE_ENABLED", True)
+    torch.manual_seed(0)
+    words = sorted({w for w in (SYSTEM_PREFIX + " Context Question Answer annual leave days VPN MFA").split()})
+    vocab = {w: i for i, w in enumerate(["<pad>", "<unk>", "<s>", "</s>"] + words)}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tok = PreTrainedTokenizerFast(tokenizer_object=backend, pad_token="<pad>", unk_token="<unk>", bos_token="<s>", eos_token="</s>")
+    tok.padding_side = "left"
+    config = LlamaConfig(vocab_size=len(vocab), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=4, pad_token_id=0, bos_token_id=2, eos_token_id=3)
+    gen = AnswerGenerator.__new__(AnswerGenerator)
+    gen.backend = "transformers"
+    gen.tokenizer = tok
+    gen.hf_model = LlamaForCausalLM(config).eval()
+    gen.max_new, gen.temp = 6, 0.2
+    gen._prefix_ids, gen._prefix_cache, gen._prefix_lock = None, None, threading.Lock()
+
+    prompts = [
+        gen.build_prompt("annual leave days?", ["Twenty annual leave days."]),
+        gen.build_prompt("VPN?", ["Use MFA for VPN. Use MFA for VPN. Use MFA for VPN."]),
+        gen.build_prompt("leave?", []),
+    ]
+    single = [gen._generate_one(p) for p in prompts]
+    stops = [threading.Event() for _ in prompts]
+
+    assert gen.generate_batch(prompts, stops) == single
+    assert gen._generate_batch_items(list(zip(prompts[:2], stops[:2]))) == single[:2]
+    assert all(single)
@@ -0,0 +1,167 @@
+from unittest.mock import patch
+
+import numpy as np
+
+
+def word_count(texts):
+    return [len(t.split()) for t in texts]
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(len(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class FakeStore:
+    max_batch_size = 100
+
+    def __init__(self):
+        self.docs = {}
+        self.added = []
+        self.batches = []
+        self.versions = 0
+        self.embedder = FakeEmbedder()
+
+    def add(self, ids, texts, metadatas, embeddings=None):
+        assert len(embeddings) == len(ids)
+        self.added.extend(ids)
+        self.batches.append(len(ids))
+        self.docs.update({i: m for i, m in zip(ids, metadatas)})
+
+    def delete(self, ids):
+        for i in ids:
+            self.docs.pop(i, None)
+
+    def get_ids(self, where=None):
+        conds = where["$and"] if where else []
+        return {i for i, m in self.docs.items() if all(m[k] == v for c in conds for k, v in c.items())}
+
+    def bump_content_version(self, version=None):
+        self.versions += 1
+        self.version = version
+
+
+def _use_dirs(mod, tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(mod.settings, "CHROMA_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(mod.settings, "POLICY_DIR", str(data))
+    monkeypatch.setattr(mod, "get_token_counter", lambda: word_count)
+    monkeypatch.setattr(mod.settings, "HYBRID_SEARCH_ENABLED", False)
+    return data
+
+
+def _run(mod, store, **kwargs):
+    with patch.object(mod, "PolicyVectorStore", return_value=store):
+        return mod.ingest(**kwargs)
+
+
+def test_incremental_ingest_skips_unchanged_and_deletes_stale(tmp_path, monkeypatch):
+    from app.rag import ingest as mod
+
+    data = _use_dirs(mod, tmp_path, monkeypatch)
+    hr = data / "hr_policy.md"
+    hr.write_text("# Leave\nTwenty days.\n\n# Sick\nTen days.", encoding="utf-8")
+    (data / "IT").mkdir()
+    (data / "IT" / "vpn.md").write_text("# VPN\nUse MFA.", encoding="utf-8")
+    store = FakeStore()
+
+    first = _run(mod, store)
+    assert (first.files_added, first.chunks_added) == (2, 3)
+
+    second = _run(mod, store)
+    assert (second.files_skipped, second.chunks_added, second.chunks_deleted) == (2, 0, 0)
+    assert store.versions == 1
+
+    hr.write_text("# Leave\nTwenty days.\n\n# Sick\nTwelve days.", encoding="utf-8")
+    store.added.clear()
+    third = _run(mod, store)
+    assert (third.files_updated, third.files_skipped) == (1, 1)
+    assert (third.chunks_added, third.chunks_deleted, third.chunks_unchanged) == (1, 1, 2)
+    assert len(store.added) == 1
+    assert len(store.docs) == 3
+
+
+def test_removed_policy_file_deletes_its_chunks(tmp_path, monkeypatch):
+    from app.rag import ingest as mod
+
+    data = _use_dirs(mod, tmp_path, monkeypatch)
+    (data / "hr_policy.md").write_text("# Leave\nTwenty days.", encoding="utf-8")
+    (data / "it_policy.md").write_text("# VPN\nUse MFA.", encoding="utf-8")
+    store = FakeStore()
+    _run(mod, store)
+
+    (data / "hr_policy.md").unlink()
+    report = _run(mod, store, changed=[])
+    assert (report.files_deleted, report.chunks_deleted, report.files_skipped) == (1, 1, 1)
+    assert {m["domain"] for m in store.docs.values()} == {"IT"}
+
+
+def test_full_ingest_still_deletes_chunks_of_removed_files(tmp_path, monkeypatch):
+    from app.rag import ingest as mod
+
+    data = _use_dirs(mod, tmp_path, monkeypatch)
+    (data / "hr_policy.md").write_text("# Leave\nTwenty days.", encoding="utf-8")
+    (data / "it_policy.md").write_text("# VPN\nUse MFA.", encoding="utf-8")
+    store = FakeStore()
+    _run(mod, store)
+
+    (data / "hr_policy.md").unlink()
+    store.added.clear()
+    report = _run(mod, store, full=True)
+    assert (report.files_deleted, report.chunks_deleted, report.chunks_added) == (1, 1, 1)
+    assert {m["domain"] for m in store.docs.values()} == {"IT"}
+    assert len(store.added) == 1
+
+
+def test_lexical_index_is_built_before_the_version_is_published(tmp_path, monkeypatch):
+    from app.rag import ingest as mod
+
+    data = _use_dirs(mod, tmp_path, monkeypatch)
+    monkeypatch.setattr(mod.settings, "HYBRID_SEARCH_ENABLED", True)
+    built = []
+    monkeypatch.setattr(mod, "load_lexical_index", lambda store, version=None: built.append((store.versions, version)))
+    (data / "hr_policy.md").write_text("# Leave\nTwenty days.", encoding="utf-8")
+    store = FakeStore()
+
+    _run(mod, store)
+    assert built == [(0, store.version)]
+
+
+def test_bulk_ingest_embeds_and_upserts_in_bounded_batches(tmp_path, monkeypatch):
+    from app.rag import ingest as mod
+
+    data = _use_dirs(mod, tmp_path, monkeypatch)
+    sections = "\n\n".join(f"# Section {i}\nRule number {i}." for i in range(7))
+    (data / "HR").mkdir()
+    for name in ("a.md", "b.md"):
+        (data / "HR" / name).write_text(sections.replace("Rule", name), encoding="utf-8")
+    store = FakeStore()
+    ticks = []
+
+    report = _run(mod, store, workers=1, embed_batch=2, upsert_batch=5, progress=lambda r: ticks.append(r.chunks_added))
+    assert report.chunks_added == 14
+    assert store.batches == [5, 5, 4]
+    assert store.embedder.calls == [2, 2, 1, 2, 2, 1, 2, 2]
+    assert len(ticks) == 3
+    assert report.chunks_per_sec > 0
+
+
+def test_discovery_finds_domain_folders_and_legacy_files(tmp_path):
+    from app.rag.discovery import discover_domains, discover_policies
+
+    (tmp_path / "FINANCE" / "travel").mkdir(parents=True)
+    (tmp_path / "FINANCE" / "travel" / "per-diem.md").write_text("x", encoding="utf-8")
+    (tmp_path / "FINANCE" / "notes.txt").write_text("x", encoding="utf-8")
+    (tmp_path / "hr_policy.md").write_text("x", encoding="utf-8")
+
+    found = {p["source"]: (p["domain"], p["slug"]) for p in discover_policies(str(tmp_path))}
+    assert found == {
+        "FINANCE/travel/per-diem.md": ("FINANCE", "travel-per-diem"),
+        "hr_policy.md": ("HR", "hr_policy"),
+    }
+    assert discover_domains(str(tmp_path)) == ["FINANCE", "HR"]
@@ -0,0 +1,30 @@
+from app.rag.keywords import KeywordMatcher, load_domain_keywords
+
+
+def test_matches_whole_words_phrases_and_plurals():
+    matcher = KeywordMatcher({
+        "HR": {"leave": 1.0, "per diem": 2.0, "policy": 0.25},
+        "IT": {"data": 1.0, "device": 1.0},
+    })
+
+    assert matcher.score("Where is the metadata catalogue?") == {}
+    assert matcher.score("cleave the wood") == {}
+    assert matcher.score("Per  Diem rates and leaves") == {"HR": 3.0}
+    assert matcher.score("lost devices and data policies") == {"IT": 2.0, "HR": 0.25}
+
+
+def test_hyphenated_and_spaced_phrases_match_each_other():
+    matcher = KeywordMatcher({"HR": {"per diem": 1.0}, "IT": {"e-mail": 1.0}})
+
+    assert matcher.score("What is the per-diem rate?") == {"HR": 1.0}
+    assert matcher.score("Per diem for e mail training") == {"HR": 1.0, "IT": 1.0}
+    assert matcher.score("perdiem") == {}
+
+
+def test_default_keywords_file_loads():
+    keywords = load_domain_keywords()
+
+    assert {"HR", "IT"} <= set(keywords)
+    assert KeywordMatcher(keywords).score("VPN password reset") == {"IT": 2.0}
+    # A generic word adds less than a specific one, so "policy" no longer ties with "VPN".
+    assert KeywordMatcher(keywords).score("What is the VPN policy?") == {"IT": 1.0, "HR": 0.25}
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from app.rag.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    "hr-1": ("Annual leave is twenty days per year.", "HR"),
+    "hr-2": ("Submit form HR-F017 to claim travel expenses.", "HR"),
+    "it-1": ("VPN access requires MFA on every device.", "IT"),
+    "it-2": ("Reset your password through the service desk.", "IT"),
+}
+
+
+def _index():
+    ids = list(DOCS)
+    return LexicalIndex.build("v1", ids, [DOCS[i][0] for i in ids], [DOCS[i][1] for i in ids])
+
+
+def test_tokenize_keeps_codes_and_their_parts():
+    assert tokenize("Where is form HR-F017?") == ["form", "hr-f017", "hr", "f017"]
+
+
+def test_bm25_ranks_exact_terms_and_filters_domain(tmp_path):
+    index = _index()
+
+    assert index.search("HR-F017 form")[0][0] == "hr-2"
+    assert [cid for cid, _ in index.search("password reset", domain="IT")] == ["it-2"]
+    assert index.search("password reset", domain="HR") == []
+    assert index.search("password", domain="FINANCE") == []
+
+    index.save(tmp_path / "lexical.v1")
+    loaded = LexicalIndex.load(tmp_path / "lexical.v1")
+    assert loaded.search("MFA vpn") == index.search("MFA vpn")
+
+
+def test_rrf_prefers_items_ranked_by_both_lists():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "c"]]) == ["b", "a", "c"]
+
+
+def test_hybrid_search_scores_lexical_only_hits_by_cosine(monkeypatch):
+    from app.rag.vectorstore import PolicyVectorStore
+
+    class DummyCollection:
+        def query(self, query_embeddings, n_results, where=None):
+            return {
+                "ids": [["hr-1"]],
+                "documents": [[DOCS["hr-1"][0]]],
+                "metadatas": [[{"domain": "HR"}]],
+                "distances": [[0.4]],
+            }
+
+        def get(self, ids, include):
+            return {
+                "ids": ids,
+                "documents": [DOCS[i][0] for i in ids],
+                "metadatas": [{"domain": DOCS[i][1]} for i in ids],
+                "embeddings": [[3.0, 4.0] for _ in ids],
+            }
+
+    with patch("chromadb.PersistentClient") as client:
+        client.return_value.get_or_create_collection.return_value = DummyCollection()
+        store = PolicyVectorStore()
+    monkeypatch.setattr(store, "lexical_index", _index)
+
+    hits = store.hybrid_search_many([[1.0, 0.0]], ["form HR-F017"], k=2, domain="HR")[0]
+
+    assert [h.id for h in hits] == ["hr-1", "hr-2"]
+    assert hits[0].score == 0.6
+    assert round(hits[1].score, 2) == 0.6
@@ -0,0 +1,45 @@
+import threading
+
+from app.core.metrics import MetricsRegistry, StageTimer
+
+
+def test_histograms_merge_thread_shards_and_render_cumulative_buckets():
+    reg = MetricsRegistry(buckets=(0.01, 0.1))
+
+    def work():
+        for _ in range(1000):
+            reg.observe("stage_seconds", 0.05, stage="search")
+            reg.inc("requests_total", outcome="success")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    reg.observe("stage_seconds", 0.005, stage="search")
+
+    text = reg.render()
+    assert 'stage_seconds_bucket{stage="search",le="0.01"} 1' in text
+    assert 'stage_seconds_bucket{stage="search",le="0.1"} 4001' in text
+    assert 'stage_seconds_bucket{stage="search",le="+Inf"} 4001' in text
+    assert 'stage_seconds_count{stage="search"} 4001' in text
+    assert 'requests_total{outcome="success"} 4000' in text
+    assert "# TYPE stage_seconds histogram" in text
+
+
+def test_stage_timer_records_once_with_request_labels():
+    reg = MetricsRegistry()
+    timer = StageTimer()
+    with timer.stage("embed"):
+        pass
+    timer.add("generate", 0.2)
+    timer.domain, timer.method = "HR", "keywords"
+
+    timer.finish(reg, outcome="timeout")
+    timer.finish(reg, outcome="success")
+
+    labels = {"domain": "HR", "method": "keywords", "outcome": "timeout"}
+    assert reg.counter("rag_requests_total", **labels) == 1
+    assert reg.histogram("rag_stage_seconds", stage="generate", **labels) == {"count": 1, "sum": 0.2}
+    assert reg.histogram("rag_stage_seconds", stage="embed", **labels)["count"] == 1
+    assert reg.counter("rag_requests_total", domain="HR", method="keywords", outcome="success") == 0
@@ -0,0 +1,119 @@
+import numpy as np
+
+from app.core.config import settings
+
+
+def _store(monkeypatch, tmp_path, dtype="float32"):
+    from app.rag.numpy_store import NumpyVectorStore
+    from app.rag.vectorstore import PolicyVectorStore
+
+    monkeypatch.setattr(settings, "CHROMA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(settings, "VECTOR_DTYPE", dtype)
+    store = PolicyVectorStore()
+    assert isinstance(store, NumpyVectorStore)
+    return store
+
+
+def _corpus(n=300, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    domains = ["HR", "IT", "FINANCE"]
+    ids = [f"c{i}" for i in range(n)]
+    metas = [{"domain": domains[i % 3], "source": f"{domains[i % 3].lower()}.md"} for i in range(n)]
+    return ids, [f"text {i}" for i in range(n)], metas, vectors
+
+
+def test_numpy_store_matches_brute_force(monkeypatch, tmp_path):
+    import app.rag.numpy_store as mod
+
+    monkeypatch.setattr(mod, "BLOCK_ROWS", 64)  # several blocks per query
+    store = _store(monkeypatch, tmp_path)
+    ids, texts, metas, vectors = _corpus()
+    store.add(ids, texts, metas, embeddings=vectors)
+    store.bump_content_version()
+
+    queries = vectors[:5] + 0.1
+    for domain in (None, "IT"):
+        keep = [i for i, m in enumerate(metas) if domain is None or m["domain"] == domain]
+        expected = []
+        for q in queries / np.linalg.norm(queries, axis=1, keepdims=True):
+            scores = vectors[keep] @ q
+            expected.append([ids[keep[j]] for j in np.argsort(-scores)[:7]])
+        hits = store.search_many_by_vectors(queries, k=7, domain=domain)
+        assert [[h.id for h in row] for row in hits] == expected
+        assert all(h.metadata["domain"] == domain for row in hits for h in row if domain)
+    assert hits[0][0].content == texts[int(hits[0][0].id[1:])]
+    assert store.search_by_vector(vectors[0], k=3, domain="LEGAL") == []
+
+
+def test_numpy_store_persists_and_applies_updates(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path, dtype="float16")
+    ids, texts, metas, vectors = _corpus(n=30)
+    store.add(ids, texts, metas, embeddings=vectors)
+    store.bump_content_version()
+    assert store.get_ids(where={"$and": [{"source": "hr.md"}, {"domain": "HR"}]}) == {f"c{i}" for i in range(0, 30, 3)}
+
+    store.delete(["c0", "c3"])
+    store.add(["c1"], ["changed"], [metas[1]], embeddings=vectors[1:2])
+    store.bump_content_version()
+
+    reopened = store.reopen()
+    assert reopened.count() == 28
+    assert np.load(next(tmp_path.glob("policies.numpy.*/vectors.npy")), mmap_mode="r").dtype == np.float16
+    top = reopened.search_by_vector(vectors[1], k=1)[0]
+    assert (top.id, top.content) == ("c1", "changed")
+    assert abs(top.score - 1.0) < 1e-3
+    assert "c0" not in reopened.get_ids()
+    got_ids, docs, _, vecs = reopened.get_by_ids(["c1", "missing"])
+    assert got_ids == ["c1"] and docs == ["changed"] and vecs.shape == (1, 16)
+
+
+def test_publishing_keeps_the_previous_snapshot_for_workers_opening_it(monkeypatch, tmp_path):
+    from app.rag.numpy_store import _Snapshot
+
+    store = _store(monkeypatch, tmp_path)
+    ids, texts, metas, vectors = _corpus(n=6)
+    published = []
+    for i in range(3):
+        store.add(ids[i:i + 1], texts[i:i + 1], metas[i:i + 1], embeddings=vectors[i:i + 1])
+        store.bump_content_version()
+        published.append(store._snapshot.path)
+
+    # A worker that read the pointer just before the last swap can still open its target.
+    assert len(_Snapshot(published[1])) == 2
+    assert not published[0].exists()
+    assert sorted(p.name for p in tmp_path.glob("policies.numpy.*") if p.is_dir()) == sorted(p.name for p in published[1:])
+
+
+def test_reopen_follows_the_pointer_when_its_snapshot_just_vanished(monkeypatch, tmp_path):
+    import shutil
+
+    store = _store(monkeypatch, tmp_path)
+    ids, texts, metas, vectors = _corpus(n=6)
+    store.add(ids[:1], texts[:1], metas[:1], embeddings=vectors[:1])
+    store.bump_content_version()
+    gone = store._snapshot.path
+    store.add(ids[1:2], texts[1:2], metas[1:2], embeddings=vectors[1:2])
+    store.bump_content_version()
+    current = store._pointed_name()
+    names = iter([gone.name, current])
+    monkeypatch.setattr(type(store), "_pointed_name", lambda self: next(names))
+    shutil.rmtree(gone)
+
+    assert store.reopen().count() == 2
+
+
+def test_backend_missing_a_storage_method_cannot_be_built(monkeypatch, tmp_path):
+    import pytest
+    from app.rag.numpy_store import NumpyVectorStore
+    from app.rag.vectorstore import PolicyVectorStore
+
+    class Partial(PolicyVectorStore):
+        search_many_by_vectors = NumpyVectorStore.search_many_by_vectors
+
+    monkeypatch.setattr(settings, "CHROMA_DIR", str(tmp_path))
+    with pytest.raises(TypeError, match="get_by_ids"):
+        Partial()
+    assert isinstance(_store(monkeypatch, tmp_path), NumpyVectorStore)
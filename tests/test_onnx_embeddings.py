@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+SENTENCES = [
+    "How many days of annual leave do I get?",
+    "Reset my VPN password",
+    "Who approves overtime for contractors?",
+    "Laptop encryption is required for all staff devices.",
+]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    # A small random BERT with a word-level vocab, so the test needs no download.
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    path = tmp_path_factory.mktemp("tiny-bert")
+    words = sorted({w.strip("?.").lower() for s in SENTENCES for w in s.split()})
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words
+    (path / "vocab.txt").write_text("\n".join(vocab), encoding="utf-8")
+    BertTokenizerFast(vocab_file=str(path / "vocab.txt")).save_pretrained(str(path))
+    config = BertConfig(vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2, num_attention_heads=4, intermediate_size=128)
+    BertModel(config).save_pretrained(str(path))
+    transformer = models.Transformer(str(path), max_seq_length=32)
+    st = SentenceTransformer(modules=[transformer, models.Pooling(transformer.get_word_embedding_dimension())])
+    st.save(str(path / "st"))
+    return str(path / "st")
+
+
+@pytest.mark.parametrize("backend,min_cosine", [("onnx", 0.9999), ("onnx-int8", 0.98)])
+def test_onnx_vectors_match_torch(monkeypatch, tmp_path, tiny_model, backend, min_cosine):
+    from app.rag.embeddings import EmbeddingService
+
+    monkeypatch.setattr("app.rag.onnx_embeddings.settings.EMBEDDING_ONNX_DIR", str(tmp_path))
+    reference = EmbeddingService(tiny_model, backend="torch").encode(SENTENCES)
+    vectors = EmbeddingService(tiny_model, backend=backend).encode(SENTENCES)
+
+    assert vectors.shape == reference.shape
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    assert (vectors * reference).sum(axis=1).min() >= min_cosine
+
+
+def test_onnx_process_counts_tokens_without_torch(tmp_path, tiny_model):
+    import os
+    import subprocess
+    import sys
+
+    from transformers import AutoTokenizer
+    from app.rag.onnx_embeddings import export_onnx
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.rag.onnx_embeddings.settings.EMBEDDING_ONNX_DIR", str(tmp_path))
+        export_onnx(tiny_model, quantize=False)
+    expected = [len(ids) for ids in AutoTokenizer.from_pretrained(tiny_model)(SENTENCES, add_special_tokens=False)["input_ids"]]
+    code = (
+        "import json, sys\n"
+        "from app.rag.embeddings import get_embedding_service, get_token_counter\n"
+        f"get_embedding_service().encode({SENTENCES!r})\n"
+        f"print(json.dumps([get_token_counter()({SENTENCES!r}), 'torch' in sys.modules]))\n"
+    )
+    env = {**os.environ, "EMBEDDING_BACKEND": "onnx", "EMBEDDING_MODEL": tiny_model, "EMBEDDING_ONNX_DIR": str(tmp_path)}
+    out = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True).stdout
+
+    counts, torch_loaded = json.loads(out.strip().splitlines()[-1])
+    assert counts == expected
+    assert not torch_loaded
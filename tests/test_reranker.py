@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from app.rag.reranker import CrossEncoderReranker
+from app.rag.vectorstore import RetrievedChunk
+
+
+class FakeCrossEncoder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(len(pairs))
+        time.sleep(self.delay)
+        return [float("mfa" in text.lower()) for _, text in pairs]
+
+
+def _chunks():
+    return [
+        RetrievedChunk("Laptops are encrypted.", {}, 0.8, "it-1"),
+        RetrievedChunk("VPN requires MFA.", {}, 0.7, "it-2"),
+        RetrievedChunk("Passwords rotate yearly.", {}, 0.6, "it-3"),
+    ]
+
+
+def test_rerank_scores_in_one_pass_and_caches_pairs():
+    reranker = CrossEncoderReranker(model_name="fake")
+    reranker._model = FakeCrossEncoder()
+
+    first = asyncio.run(reranker.rerank("Do I need MFA?", _chunks(), budget_ms=1000))
+    again = asyncio.run(reranker.rerank("do I need mfa", _chunks(), budget_ms=1000))
+
+    assert [c.id for c in first] == ["it-2", "it-1", "it-3"]
+    assert [c.id for c in again] == [c.id for c in first]
+    assert reranker._model.calls == [3]
+    assert reranker.stats()["cache_hits"] == 3
+
+
+def test_rerank_over_budget_keeps_retrieval_order():
+    reranker = CrossEncoderReranker(model_name="fake")
+    reranker._model = FakeCrossEncoder(delay=0.2)
+
+    out = asyncio.run(reranker.rerank("Do I need MFA?", _chunks(), budget_ms=20))
+
+    assert [c.id for c in out] == ["it-1", "it-2", "it-3"]
+    assert reranker.stats()["fallbacks"] == 1
+
+
+def test_rerank_skips_while_a_timed_out_pass_is_still_running():
+    reranker = CrossEncoderReranker(model_name="fake")
+    reranker._model = FakeCrossEncoder(delay=0.3)
+
+    async def run():
+        slow = await reranker.rerank("Do I need MFA?", _chunks(), budget_ms=20)
+        # The first pass is still scoring: this request must not queue a second one.
+        other = await reranker.rerank("Is VPN required?", _chunks(), budget_ms=1000)
+        await asyncio.sleep(0.4)
+        late = await reranker.rerank("Is VPN required?", _chunks(), budget_ms=1000)
+        return slow, other, late
+
+    slow, other, late = asyncio.run(run())
+
+    assert [c.id for c in slow] == [c.id for c in other] == ["it-1", "it-2", "it-3"]
+    assert [c.id for c in late] == ["it-2", "it-1", "it-3"]
+    assert reranker._model.calls == [3, 3]
+    assert reranker.stats()["skipped_busy"] == 1
@@ -14,7 +14,7 @@ def test_vectorstore_search_filters_domain():
                 }
             return {"documents": [[]], "metadatas": [[]], "distances": [[]]}
 
-    with patch("app.rag.vectorstore.chromadb.PersistentClient") as client:
+    with patch("chromadb.PersistentClient") as client:
         client.return_value.get_or_create_collection.return_value = DummyCollection()
         store = PolicyVectorStore()
 
@@ -34,7 +34,7 @@ def test_vectorstore_returns_scores_and_metadata():
                 "distances": [[0.1]],
             }
 
-    with patch("app.rag.vectorstore.chromadb.PersistentClient") as client:
+    with patch("chromadb.PersistentClient") as client:
         client.return_value.get_or_create_collection.return_value = DummyCollection()
         store = PolicyVectorStore()
 
@@ -45,3 +45,63 @@ def test_vectorstore_returns_scores_and_metadata():
     assert item.metadata.get("source") == "it_policy.md"
     assert 0.0 <= item.score <= 1.0
 
+
+
+def test_vector_search_matches_text_search():
+    from app.rag.vectorstore import PolicyVectorStore
+
+    result = {
+        "documents": [["Example content"]],
+        "metadatas": [[{"domain": "HR", "source": "hr_policy.md", "heading": "Leave"}]],
+        "distances": [[0.25]],
+    }
+
+    class DummyCollection:
+        def query(self, query_texts=None, query_embeddings=None, n_results=5, where=None):
+            return result
+
+    with patch("chromadb.PersistentClient") as client:
+        client.return_value.get_or_create_collection.return_value = DummyCollection()
+        store = PolicyVectorStore()
+
+    with patch.object(store.embedder, "encode", side_effect=AssertionError("re-encoded")):
+        by_vec = store.search_by_vector([0.1, 0.2, 0.3], k=1, domain="HR")
+    assert by_vec == store.search("leave", k=1, domain="HR")
+    assert by_vec[0].score == 0.75
+
+
+def test_search_many_by_vectors_splits_results_per_query():
+    from app.rag.vectorstore import PolicyVectorStore
+
+    class DummyCollection:
+        def query(self, query_embeddings, n_results, where=None):
+            assert len(query_embeddings) == 2
+            return {
+                "documents": [["a"], ["b"]],
+                "metadatas": [[{"domain": "IT"}], [{"domain": "IT"}]],
+                "distances": [[0.1], [0.4]],
+            }
+
+    with patch("chromadb.PersistentClient") as client:
+        client.return_value.get_or_create_collection.return_value = DummyCollection()
+        store = PolicyVectorStore()
+
+    out = store.search_many_by_vectors([[0.1, 0.2], [0.3, 0.4]], k=1, domain="IT")
+    assert [r[0].content for r in out] == ["a", "b"]
+    assert store.search_many_by_vectors([], k=1) == []
+
+
+def test_chroma_reopen_stops_the_system_retired_by_the_previous_reload():
+    from unittest.mock import MagicMock
+
+    from app.rag.vectorstore import PolicyVectorStore
+
+    with patch("chromadb.PersistentClient", side_effect=lambda path: MagicMock()):
+        first = PolicyVectorStore()
+        second = first.reopen()
+        assert not first.client._system.stop.called  # may still serve in-flight searches
+        third = second.reopen()
+
+    assert first.client._system.stop.called
+    assert not second.client._system.stop.called
+    assert third._retired is second.client._system
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+
+class FakeEmbedder:
+    def encode_one(self, text):
+        return np.ones(4, dtype=np.float32)
+
+
+class FakeStore:
+    built = 0
+    opened_version = "v1"
+
+    def __init__(self):
+        time.sleep(0.05)
+        FakeStore.built += 1
+
+    def lexical_index(self):
+        return None
+
+    def search_many(self, embeddings, k, domain=None, queries=None):
+        return [[]]
+
+
+class FailingGenerator:
+    loaded_tokenizer = False
+
+    def count_tokens(self, texts):
+        FailingGenerator.loaded_tokenizer = True
+        return [1 for _ in texts]
+
+    def warmup(self):
+        raise ConnectionError("ollama down")
+
+
+def _fake_components(monkeypatch):
+    from app.api.v1 import chat
+
+    FakeStore.built = 0
+    FailingGenerator.loaded_tokenizer = False
+    monkeypatch.setattr(chat, "_store", None)
+    monkeypatch.setattr(chat, "_classifier", None)
+    monkeypatch.setattr(chat, "PolicyVectorStore", FakeStore)
+    monkeypatch.setattr(chat, "DomainClassifier", lambda store: object())
+    monkeypatch.setattr(chat, "get_embedding_service", FakeEmbedder)
+    monkeypatch.setattr(chat, "_generator", FailingGenerator())
+    monkeypatch.setattr(chat.settings, "RERANK_ENABLED", False)
+    return chat
+
+
+def test_concurrent_first_requests_build_the_store_once(monkeypatch):
+    chat = _fake_components(monkeypatch)
+
+    threads = [threading.Thread(target=chat._get_classifier) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert FakeStore.built == 1
+
+
+def test_ready_after_warm_up_even_if_llm_warm_up_fails(monkeypatch):
+    _fake_components(monkeypatch)
+    from app.main import app
+
+    with TestClient(app) as client:
+        for _ in range(50):
+            r = client.get("/ready")
+            if r.status_code == 200:
+                break
+            assert r.json()["status"] == "warming_up"
+            time.sleep(0.05)
+        assert client.get("/health").json() == {"status": "ok"}
+
+    startup = r.json()["startup"]
+    assert r.status_code == 200
+    assert set(startup["components"]) == {"embeddings", "vector_store", "tokenizer", "classifier", "retrieval"}
+    assert "ollama down" in startup["errors"]["llm"]
+    assert FakeStore.built == 1
+    assert FailingGenerator.loaded_tokenizer